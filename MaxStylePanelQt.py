@@ -7,12 +7,24 @@
 import os
 import sys
 import json
+import math
+import random
 import hashlib
 import threading
 import tempfile
+import shutil
+import time
+import atexit
+import sqlite3
+from types import MappingProxyType
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.filepost import encode_multipart_formdata
 from PySide6 import QtWidgets, QtCore, QtGui
 from PySide6.QtCore import QThread, Signal
 from PySide6.QtGui import QDesktopServices
@@ -30,54 +42,92 @@ API_ENDPOINTS = {
     "work_list": "/api/work/list",
     "work_details": "/api/work/details",
     "work_cancel": "/api/workFlow/cancel",
-    "work_delete": "/api/work/delete"
+    "work_delete": "/api/work/delete",
+    "work_events": "/api/work/events",    # 任务进度推送（Server-Sent Events）
+    "work_wait": "/api/work/wait",        # 任务进度长轮询
+    "workflow_catalog": "/api/workFlow/catalog"  # 工作流目录（选项、参数、默认值和提示词预设）
 }
 
-# 工作类型映射（按Tab分类）
-WORK_TYPE_MAP = {
-    # 室内设计
-    "室内设计-彩平图": 100,
-    "室内设计-毛坯房出图": 101,
-    "室内设计-线稿出图": 102,
-    "室内设计-白模渲染": 103,
-    "室内设计-多风格（白模）": 104,
-    "室内设计-多风格（线稿）": 105,
-    "室内设计-风格转换": 106,
-    "室内设计-360出图": 107,
-    # 建筑规划
-    "建筑规划-彩平图": 200,
-    "建筑规划-现场出图": 201,
-    "建筑规划-线稿出图": 202,
-    "建筑规划-白模透视（精确）": 203,
-    "建筑规划-白模透视（体块）": 204,
-    "建筑规划-白模鸟瞰（精确）": 205,
-    "建筑规划-白模鸟瞰（体块）": 206,
-    "建筑规划-白天变夜景": 207,
-    "建筑规划-亮化工程": 208,
-    # 景观设计
-    "景观设计-彩平图": 300,
-    "景观设计-现场出图": 301,
-    "景观设计-现场（局部）参考局部": 302,
-    "景观设计-线稿出图": 303,
-    "景观设计-白模（透视）": 304,
-    "景观设计-白模（鸟瞰）": 305,
-    "景观设计-白天转夜景": 306,
-    "景观设计-亮化工程": 307,
-    # 图像处理
-    "图像处理-指定换材质": 400,
-    "图像处理-修改局部": 401,
-    "图像处理-AI去除万物": 402,
-    "图像处理-AI去水印": 403,
-    "图像处理-增加物体": 404,
-    "图像处理-增加物体（指定物体）": 405,
-    "图像处理-替换（产品）": 406,
-    "图像处理-替换（背景天花）": 407,
-    "图像处理-扩图": 408,
-    "图像处理-洗图": 409,
-    "图像处理-图像增强": 410,
-    "图像处理-溶图（局部）": 411,
-    "图像处理-放大出图": 412,
-    "图像处理-老照片修复": 413
+# HTTP连接池配置（所有API请求共用一个长连接客户端）
+HTTP_POOL_CONNECTIONS = 4   # 缓存的主机连接池数量
+HTTP_POOL_MAXSIZE = 8       # 每个主机最多保持的连接数
+HTTP_POOL_BLOCK = True      # 达到单主机上限时排队等待，而不是新建临时连接
+
+# 上传缓存配置（相同内容的图片不再重复上传）
+UPLOAD_CACHE_TTL = 24 * 3600     # 缓存的文件URL有效期（秒）
+UPLOAD_CACHE_MAX_ENTRIES = 256   # 最多缓存的条目数，超出后淘汰最久未使用的
+UPLOAD_MAX_CONCURRENCY = 3       # 同时上传的图片数量上限
+UPLOAD_CHUNK_SIZE = 64 * 1024    # 上传时每次发送的字节数（用于统计上传进度）
+UPLOAD_CACHE_CHECK_TIMEOUT = 5   # 使用缓存的文件URL前确认服务器上文件仍然存在的超时时间（秒）
+CACHE_INDEX_SAVE_DELAY = 5.0     # 缓存命中只更新了使用时间时，延迟多久再写回索引文件（秒）
+
+# 结果图片下载与显示配置
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 结果图片磁盘缓存上限，超出后淘汰最久未使用的
+RESULT_DOWNLOAD_CHUNK_SIZE = 64 * 1024      # 下载结果图片时每次读取的字节数
+RESULT_PREVIEW_INTERVAL = 0.3               # 下载过程中生成预览图的最小间隔（秒）
+RESULT_PREVIEW_MIN_BYTES = 32 * 1024        # 至少收到这么多数据后才尝试生成预览图
+RESULT_PREVIEW_MAX_SIDE = 512               # 预览图最大边长（按缩小后的尺寸解码，速度更快）
+RESULT_GALLERY_CONCURRENCY = 3              # 多张结果图片同时下载的数量上限
+RESULT_THUMBNAIL_SIZE = 96                  # 结果图库缩略图的最大边长
+THUMBNAIL_DECODE_WORKERS = 2                # 后台解码缩略图的线程数
+THUMBNAIL_CACHE_MAX_ENTRIES = 64            # 内存中缓存的缩略图数量，超出后淘汰最久未使用的
+VIEWER_TILE_SIZE = 512                      # 大图查看器的图块边长
+VIEWER_TILE_CACHE_BYTES = 128 * 1024 * 1024 # 大图查看器图块和已解码分辨率层共用的内存上限
+VIEWER_LEVEL_CACHE_COUNT = 2                # 同时保留的已解码分辨率层数（不含总览图），只用于不能按区域解码的格式
+VIEWER_OVERVIEW_MAX_SIDE = 1024             # 总览图（最低分辨率层）的最大边长
+VIEWER_MAX_ZOOM = 8.0                       # 大图查看器的最大放大倍数
+
+# 历史记录配置
+HISTORY_PAGE_SIZE = 60                      # 历史列表每次从本地库读取的条数（滚动到底部时再读下一页）
+HISTORY_SYNC_PAGE_SIZE = 50                 # 同步时每次请求作品列表的条数
+HISTORY_SYNC_MAX_PAGES = 200                # 单次同步最多请求的页数
+HISTORY_THUMBNAIL_SIZE = 128                # 历史列表缩略图的最大边长
+HISTORY_THUMBNAIL_CONCURRENCY = 3           # 同时加载的历史缩略图数量
+HISTORY_THUMBNAIL_CACHE_MAX_ENTRIES = 300   # 历史列表在内存中保留的缩略图数量
+HISTORY_THUMBNAIL_DISK_BYTES = 32 * 1024 * 1024  # 历史缩略图磁盘缓存上限（与结果图片缓存分开），超出后淘汰最久未使用的
+HISTORY_THUMBNAIL_QUALITY = 85              # 历史缩略图保存为JPEG时的质量
+HISTORY_SEARCH_DELAY = 300                  # 输入搜索文字后延迟多久刷新列表（毫秒）
+
+# 任务监控配置
+TASK_MONITOR_DEADLINE = 60 * 60      # 单个任务最长监控时间（秒，按实际经过时间计算）
+TASK_MONITOR_MAX_FAILURES = 3        # 连续查询失败多少次后停止监控
+TASK_POLL_INITIAL_INTERVAL = 1.0     # 状态变化后的查询间隔（秒）
+TASK_POLL_MAX_INTERVAL = 15.0        # 查询间隔上限（秒）
+TASK_POLL_BACKOFF_FACTOR = 1.6       # 状态不变时每次查询间隔的增长倍数
+TASK_POLL_JITTER = 0.2               # 查询间隔的随机抖动比例，避免多个客户端同时请求
+TASK_POLL_QUEUE_SECONDS = 2.0        # 排队时前面每有一个任务，查询间隔增加的秒数
+TASK_POLL_NEAR_DONE_INTERVAL = 2.0   # 进度达到80%后的最大查询间隔（秒），保证及时发现完成
+TASK_PUSH_ENABLED = True             # 优先使用服务器推送获取任务进度，不支持时退回轮询
+TASK_PUSH_SAFETY_INTERVAL = 30.0     # 推送通道连接时的兜底轮询间隔（秒）
+TASK_PUSH_LONGPOLL_TIMEOUT = 25      # 长轮询每次最多等待的时间（秒）
+TASK_PUSH_RECONNECT_MAX = 30.0       # 推送通道断开后重连间隔上限（秒）
+TASK_MONITOR_COALESCE_WINDOW = 1.0   # 这段时间内即将到期的任务合并到同一次批量查询（秒）
+TASK_BATCH_PROBE_MISSES = 3          # 批量查询连续几次都找不到任何任务后，才认定服务器不支持批量查询
+TASK_CANCEL_CONFIRM_TIMEOUT = 15.0   # 请求取消后等待服务器确认任务已取消的最长时间（秒）
+TASK_CANCEL_CONFIRM_INTERVAL = 1.0   # 确认取消状态时的查询间隔（秒）
+WORKFLOW_REJECTED_HTTP_STATUSES = (400, 401, 403, 409, 429, 503)  # 立即生成返回这些HTTP状态码时服务器没有创建任务
+WORKFLOW_SUBMIT_UNCERTAIN_MESSAGE = "提交结果不明确（网络错误或超时），服务器可能已经创建了任务，请先在历史记录中确认再重新提交"
+JOB_RESUME_MAX_AGE = 24 * 3600       # 重新打开面板时只恢复监控这段时间内提交的未完成任务（秒）
+JOB_JOURNAL_RETENTION = 30 * 24 * 3600  # 已结束任务在任务日志中保留的时间（秒）
+BATCH_MAX_ACTIVE_JOBS = 2            # 批量生成时同时在服务器上进行的任务数上限（服务器按账号限制并发任务）
+BATCH_SUBMIT_RETRY_DELAY = 5.0       # 服务器拒绝提交后重新提交的等待时间（秒，服务器返回Retry-After时以其为准）
+BATCH_SUBMIT_MAX_RETRIES = 3         # 单个批量任务被服务器明确拒绝后的最多重试次数（结果不明确的提交不重试）
+PROMPT_MATRIX_MAX_JOBS = 48          # 提示词矩阵一次最多生成的任务数
+PROMPT_MATRIX_MAX_PARALLEL = 8       # 提示词矩阵可设置的同时进行任务数上限
+TASK_STATUS_TEXT = {
+    0: "待处理",
+    10: "运行中",
+    20: "已完成",
+    30: "失败",
+    40: "已取消"
+}
+
+# 上传前图片预处理配置（按workType设置最大边长和编码格式，None表示保持原图不处理）
+UPLOAD_IMAGE_DEFAULT_PROFILE = {"max_side": 2048, "format": "JPEG", "quality": 90}
+UPLOAD_IMAGE_PROFILES = {
+    107: {"max_side": 4096, "format": "JPEG", "quality": 92},  # 室内设计-360出图
+    410: None,                                                 # 图像处理-图像增强（保持原分辨率）
+    412: None,                                                 # 图像处理-放大出图（保持原分辨率）
 }
 
 # =========================
@@ -88,22 +138,3381 @@ login_dialog = None
 main_panel_instance = None
 
 # =========================
-# 自动登录功能
+# HTTP客户端（连接池 + keep-alive）
+# =========================
+class ApiHttpClient(object):
+    """全局共享的HTTP客户端，复用TCP连接，避免每次轮询都重新握手"""
+
+    def __init__(self, base_url=API_BASE_URL, pool_connections=HTTP_POOL_CONNECTIONS,
+                 pool_maxsize=HTTP_POOL_MAXSIZE, pool_block=HTTP_POOL_BLOCK):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+        self._retry_after_until = 0.0
+
+    def build_url(self, endpoint):
+        """endpoint可以是完整URL，也可以是API_ENDPOINTS中的相对路径"""
+        if endpoint.startswith("http://") or endpoint.startswith("https://"):
+            return endpoint
+        return f"{self.base_url}{endpoint}"
+
+    def request(self, method, endpoint, **kwargs):
+        response = self.session.request(method, self.build_url(endpoint), **kwargs)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after:
+            self._retry_after_until = max(self._retry_after_until, time.monotonic() + retry_after)
+        return response
+
+    def retry_after_remaining(self):
+        """服务器通过Retry-After要求等待的剩余秒数"""
+        return max(0.0, self._retry_after_until - time.monotonic())
+
+    def get(self, endpoint, **kwargs):
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint, **kwargs):
+        return self.request("POST", endpoint, **kwargs)
+
+    def head(self, endpoint, **kwargs):
+        return self.request("HEAD", endpoint, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def parse_retry_after(value):
+    """解析Retry-After头（秒数或HTTP日期），返回秒数；无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """获取全局HTTP客户端（首次调用时创建）"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = ApiHttpClient()
+    return _http_client
+
+def configure_http_client(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                          pool_block=HTTP_POOL_BLOCK, base_url=API_BASE_URL):
+    """按新的连接池参数重建全局HTTP客户端"""
+    global _http_client
+    with _http_client_lock:
+        old_client = _http_client
+        _http_client = ApiHttpClient(base_url, pool_connections, pool_maxsize, pool_block)
+    if old_client:
+        old_client.close()
+    return _http_client
+
+def request_login(username, password, timeout=30):
+    """调用登录接口（手机号+密码），返回requests响应对象"""
+    params = {
+        "type": "10",  # 手机号+密码登录
+        "userPhone": username,
+        "password": password
+    }
+    headers = {
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+    return get_http_client().post(API_ENDPOINTS['login'], data=params, headers=headers, timeout=timeout)
+
+# =========================
+# 网络线程池（HTTP请求不在Qt界面线程中执行）
+# =========================
+NETWORK_MAX_THREADS = 6  # 同时进行的网络请求上限
+
+class _NetworkTask(QtCore.QRunnable):
+    """在线程池中执行一次网络调用，结果通过NetworkExecutor回到界面线程"""
+
+    def __init__(self, executor, fn, args, kwargs, on_success, on_error):
+        super(_NetworkTask, self).__init__()
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_success = on_success
+        self.on_error = on_error
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            import traceback
+            print(f"❌ 后台网络任务异常: {str(e)}\n{traceback.format_exc()}")
+            self.executor.run_in_gui_thread(self.on_error, str(e))
+        else:
+            self.executor.run_in_gui_thread(self.on_success, result)
+
+
+class NetworkExecutor(QtCore.QObject):
+    """统一管理后台网络线程，回调一律在界面线程中执行"""
+    _dispatch = Signal(object, object)
+
+    def __init__(self, max_threads=NETWORK_MAX_THREADS, parent=None):
+        super(NetworkExecutor, self).__init__(parent)
+        # 使用独立线程池，避免占用3ds Max自身的全局线程池
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+        self._dispatch.connect(self._on_dispatch, QtCore.Qt.QueuedConnection)
+
+    def submit(self, fn, *args, on_success=None, on_error=None, **kwargs):
+        """在后台线程执行fn(*args, **kwargs)，完成后在界面线程回调on_success/on_error"""
+        self.pool.start(_NetworkTask(self, fn, args, kwargs, on_success, on_error))
+
+    def run_in_gui_thread(self, callback, *args):
+        """从任意线程把回调投递到界面线程执行"""
+        if callback is not None:
+            self._dispatch.emit(callback, args)
+
+    @QtCore.Slot(object, object)
+    def _on_dispatch(self, callback, args):
+        try:
+            callback(*args)
+        except RuntimeError as e:
+            # 回调所属的控件可能已经被销毁（例如面板已关闭）
+            print(f"⚠️ 网络回调执行失败: {str(e)}")
+
+
+_network_executor = None
+_network_executor_lock = threading.Lock()
+
+def get_network_executor():
+    """获取全局网络线程池（回调始终在界面线程执行，即使首次调用发生在后台线程）"""
+    global _network_executor
+    if _network_executor is None:
+        with _network_executor_lock:
+            if _network_executor is None:
+                executor = NetworkExecutor()
+                app = QtCore.QCoreApplication.instance()
+                if app is not None and executor.thread() != app.thread():
+                    executor.moveToThread(app.thread())
+                _network_executor = executor
+    return _network_executor
+
+# =========================
+# 取消标记（后台上传、下载在每个数据块之间检查）
+# =========================
+class TaskCancelled(Exception):
+    """操作已被用户取消"""
+
+
+class CancelToken(object):
+    """一组后台操作共用的取消标记，可以在任意线程中取消和检查"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        """最多等待timeout秒，期间被取消时提前返回True"""
+        return self._event.wait(timeout)
+
+    def check(self):
+        """已取消时抛出TaskCancelled，中止当前的上传或下载"""
+        if self._event.is_set():
+            raise TaskCancelled("操作已取消")
+
+# =========================
+# 插件数据目录（不依赖3ds Max进程的当前工作目录）
+# =========================
+PLUGIN_DATA_DIR_NAME = "MaxStylePanel"
+
+def get_plugin_dir():
+    """插件脚本所在目录（python.ExecuteFile执行时可能没有__file__）"""
+    script_path = globals().get("__file__")
+    if script_path:
+        return os.path.dirname(os.path.abspath(script_path))
+    return None
+
+def get_plugin_data_dir():
+    """插件数据目录：Windows下为%LOCALAPPDATA%\\MaxStylePanel，其它系统为~/.maxstylepanel"""
+    base_dir = os.environ.get("LOCALAPPDATA")
+    if base_dir:
+        data_dir = os.path.join(base_dir, PLUGIN_DATA_DIR_NAME)
+    else:
+        data_dir = os.path.join(os.path.expanduser("~"), "." + PLUGIN_DATA_DIR_NAME.lower())
+    if not os.path.isdir(data_dir):
+        try:
+            os.makedirs(data_dir)
+        except OSError as e:
+            print(f"⚠️ 创建插件数据目录失败: {str(e)}")
+    return data_dir
+
+def write_json_atomic(path, data):
+    """先写临时文件再替换，避免写到一半时被其它读取方读到损坏的JSON"""
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                     dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class DeferredSave(object):
+    """
+    合并频繁的小改动：schedule()后delay秒内只写一次，flush()立即写入尚未写入的改动
+
+    save在定时线程中调用，需要自己加锁；进程退出时会补写一次
+    """
+
+    def __init__(self, save, delay=CACHE_INDEX_SAVE_DELAY):
+        self._save = save
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def schedule(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        """改动已经随其它写入一起保存时调用"""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def flush(self):
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            self._save()
+
+# =========================
+# 工作流选项注册表（按(Tab, 选项)索引，从插件目录下的JSON文件加载）
+# =========================
+WORKFLOW_REGISTRY_FILE_NAME = "workflow_registry.json"
+WORKFLOW_REGISTRY_VERSION = 1
+WORKFLOW_LAYOUTS = ("single", "multi", "blend")   # 单上传区+提示词 / 多上传区+多提示词 / 双上传区溶图
+WORKFLOW_PARAM_NAMES = (
+    "workName", "workNameOne", "workNameTwo", "workStrong", "workStrongOne", "workWeight",
+    "workWeightOne", "workStart", "workEnd", "workPixel", "workIsVertical", "workEnhance"
+)
+
+WorkflowOption = namedtuple("WorkflowOption", [
+    "tab",        # Tab名称
+    "name",       # 选项名称（下拉栏显示的文字）
+    "work_type",  # 接口的workType
+    "params",     # 需要提交的参数名
+    "prompts",    # 默认提示词（多提示词选项有多个）
+    "advanced",   # 高级参数默认值（只读映射）
+    "layout",     # 表单布局，见WORKFLOW_LAYOUTS
+    "controls"    # 是否显示控制强度滑块和高级参数
+])
+
+
+class WorkflowRegistry(object):
+    """
+    工作流选项注册表，创建时校验并建立索引，之后只读
+    
+    配置分三级：全局defaults → Tab的defaults → 选项本身，后者覆盖前者，advanced逐项合并
+    """
+    
+    def __init__(self, data, source=None):
+        self.source = source
+        self.version = data.get("version")
+        if self.version != WORKFLOW_REGISTRY_VERSION:
+            raise ValueError(f"不支持的注册表版本: {self.version}（需要{WORKFLOW_REGISTRY_VERSION}）")
+        defaults = data.get("defaults", {})
+        options = {}
+        by_work_type = {}
+        tab_options = {}
+        for tab in data.get("tabs", []):
+            tab_name = tab["name"]
+            tab_defaults = tab.get("defaults", {})
+            names = []
+            for entry in tab.get("options", []):
+                option = self._compile(tab_name, entry, defaults, tab_defaults)
+                key = (tab_name, option.name)
+                if key in options:
+                    raise ValueError(f"重复的工作流选项: {tab_name}-{option.name}")
+                if option.work_type in by_work_type:
+                    raise ValueError(f"重复的workType: {option.work_type}")
+                options[key] = option
+                by_work_type[option.work_type] = option
+                names.append(option.name)
+            tab_options[tab_name] = tuple(names)
+        self._options = MappingProxyType(options)
+        self._by_work_type = MappingProxyType(by_work_type)
+        self._tab_options = MappingProxyType(tab_options)
+        self.default_params = tuple(defaults.get("params", ()))
+    
+    @staticmethod
+    def _compile(tab_name, entry, defaults, tab_defaults):
+        def setting(name, fallback):
+            for level in (entry, tab_defaults, defaults):
+                if name in level:
+                    return level[name]
+            return fallback
+        advanced = dict(defaults.get("advanced", {}))
+        advanced.update(tab_defaults.get("advanced", {}))
+        advanced.update(entry.get("advanced", {}))
+        layout = setting("layout", "single")
+        if layout not in WORKFLOW_LAYOUTS:
+            raise ValueError(f"未知的表单布局: {tab_name}-{entry.get('name')}: {layout}")
+        params = tuple(setting("params", ()))
+        unknown = [name for name in params if name not in WORKFLOW_PARAM_NAMES]
+        if unknown:
+            raise ValueError(f"未知的参数: {tab_name}-{entry.get('name')}: {unknown}")
+        return WorkflowOption(
+            tab=tab_name,
+            name=entry["name"],
+            work_type=int(entry["workType"]),
+            params=params,
+            prompts=tuple(setting("prompts", ())),
+            advanced=MappingProxyType(advanced),
+            layout=layout,
+            controls=bool(setting("controls", False))
+        )
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), source=path)
+    
+    def tabs(self):
+        return tuple(self._tab_options)
+    
+    def options(self, tab):
+        """Tab下的选项名称（按配置顺序）"""
+        return self._tab_options.get(tab, ())
+    
+    def get(self, tab, option):
+        return self._options.get((tab, option))
+    
+    def by_work_type(self, work_type):
+        return self._by_work_type.get(work_type)
+    
+    def __len__(self):
+        return len(self._options)
+
+
+WORKFLOW_FIXED_PARAMS = (
+    "workOriginAvatar", "workReferenceAvatar", "workExtendAvatar", "workExtendAvatarOne",
+    "workId", "workFlowId", "workMask", "workMaskOne"
+)
+WORKFLOW_PROMPT_PARAMS = ("workName", "workNameOne", "workNameTwo")
+WORKFLOW_ADVANCED_PARAMS = (   # (高级参数名, 对应的请求参数, 缺省值)
+    ("控制强度", ("workStrong", "workStrongOne"), 0.5),
+    ("参考图权重", ("workWeight",), 0.8),
+    ("参考图权重2", ("workWeightOne",), 0.8),
+    ("控制开始时间", ("workStart",), 0.0),
+    ("控制结束时间", ("workEnd",), 1.0),
+    ("像素值", ("workPixel",), 0),
+    ("是否竖屏", ("workIsVertical",), False),
+    ("增强细节", ("workEnhance",), 0)
+)
+
+def build_workflow_params(workflow, prompts=None, advanced=None):
+    """
+    按注册表配置生成立即生成请求的参数（图片URL留空，上传完成后再填入）
+    
+    prompts为None时使用选项的默认提示词；advanced按高级参数名覆盖选项的默认值；
+    workflow为None时按注册表的默认参数和workType=100生成
+    """
+    values = dict(workflow.advanced) if workflow else {}
+    values.update(advanced or {})
+    if prompts is None:
+        prompts = workflow.prompts if workflow else ()
+    prompts = list(prompts)
+    required = workflow.params if workflow else get_workflow_registry().default_params
+    params = {"workOriginAvatar": "", "workType": workflow.work_type if workflow else 100}
+    params.update((name, "") for name in WORKFLOW_FIXED_PARAMS if name not in params)
+    for index, name in enumerate(WORKFLOW_PROMPT_PARAMS):
+        if name in required:
+            params[name] = prompts[index] if index < len(prompts) else ("默认提示词" if index == 0 else "")
+    for label, names, fallback in WORKFLOW_ADVANCED_PARAMS:
+        for name in names:
+            if name in required:
+                params[name] = values.get(label, fallback)
+    return params
+
+
+def find_workflow_registry_file():
+    """在插件脚本目录、3ds Max用户宏目录和当前目录中查找注册表文件"""
+    search_dirs = [get_plugin_dir()]
+    try:
+        import pymxs
+        rt = pymxs.runtime
+        search_dirs.append(rt.getDir(rt.Name("userMacros")))
+        search_dirs.append(os.path.join(rt.getDir(rt.Name("userScripts")), "MaxStylePanel"))
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"⚠️ 获取3ds Max脚本目录失败: {str(e)}")
+    search_dirs.append(os.getcwd())
+    for directory in search_dirs:
+        if directory:
+            path = os.path.join(directory, WORKFLOW_REGISTRY_FILE_NAME)
+            if os.path.exists(path):
+                return path
+    return None
+
+def load_workflow_registry(path=None):
+    """加载工作流注册表，找不到或格式错误时返回空注册表（界面不显示任何选项）"""
+    path = path or find_workflow_registry_file()
+    if not path:
+        print(f"❌ 找不到工作流配置文件: {WORKFLOW_REGISTRY_FILE_NAME}")
+        return WorkflowRegistry({"version": WORKFLOW_REGISTRY_VERSION})
+    try:
+        registry = WorkflowRegistry.load(path)
+        print(f"✅ 已加载工作流配置: {path}（{len(registry)}个选项）")
+        return registry
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"❌ 加载工作流配置失败: {path}, {str(e)}")
+        return WorkflowRegistry({"version": WORKFLOW_REGISTRY_VERSION})
+
+# =========================
+# 服务器工作流目录（磁盘缓存 + ETag条件请求，启动时先用缓存，后台刷新）
+# =========================
+WORKFLOW_CATALOG_CACHE_NAME = "workflow_catalog.json"
+WORKFLOW_CATALOG_TIMEOUT = 10   # 请求工作流目录的超时时间（秒）
+
+class WorkflowCatalogCache(object):
+    """服务器下发的工作流目录及其ETag，保存在插件数据目录中，离线时也能直接使用"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """返回{"base_url", "etag", "checked", "catalog"}，没有缓存或文件损坏时返回None"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return None
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 读取工作流目录缓存失败: {str(e)}")
+                return None
+            if not isinstance(entry, dict) or not isinstance(entry.get("catalog"), dict):
+                return None
+            return entry
+
+    def save(self, base_url, etag, catalog):
+        with self._lock:
+            try:
+                write_json_atomic(self.path, {
+                    "base_url": base_url,
+                    "etag": etag,
+                    "checked": time.time(),
+                    "catalog": catalog
+                })
+            except Exception as e:
+                print(f"⚠️ 保存工作流目录缓存失败: {str(e)}")
+
+
+_workflow_catalog_cache = None
+_workflow_catalog_cache_lock = threading.Lock()
+
+def get_workflow_catalog_cache():
+    """获取全局工作流目录缓存"""
+    global _workflow_catalog_cache
+    if _workflow_catalog_cache is None:
+        with _workflow_catalog_cache_lock:
+            if _workflow_catalog_cache is None:
+                path = os.path.join(get_plugin_data_dir(), WORKFLOW_CATALOG_CACHE_NAME)
+                _workflow_catalog_cache = WorkflowCatalogCache(path)
+    return _workflow_catalog_cache
+
+def load_cached_workflow_catalog():
+    """用上次从服务器获取的工作流目录建立注册表，没有可用缓存时返回None"""
+    cache = get_workflow_catalog_cache()
+    entry = cache.load()
+    if not entry:
+        return None
+    try:
+        registry = WorkflowRegistry(entry["catalog"], source=cache.path)
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"⚠️ 工作流目录缓存无效: {str(e)}")
+        return None
+    print(f"✅ 已加载缓存的工作流目录（{len(registry)}个选项）")
+    return registry
+
+def refresh_workflow_catalog(timeout=WORKFLOW_CATALOG_TIMEOUT):
+    """
+    后台线程：向服务器确认工作流目录是否有更新，有更新时替换全局注册表
+    
+    带上次的ETag发送If-None-Match，目录未变化时服务器只返回304；
+    返回True表示注册表已替换，False表示没有变化或服务器不提供工作流目录
+    """
+    client = get_http_client()
+    cache = get_workflow_catalog_cache()
+    entry = cache.load()
+    if entry and entry.get("base_url") != client.base_url:
+        entry = None  # 换了服务器，缓存的ETag不能用来做条件请求
+    headers = get_credential_store().auth_headers()
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    response = client.get(API_ENDPOINTS["workflow_catalog"], headers=headers, timeout=timeout)
+    if response.status_code == 304 and entry:
+        print("♻️ 工作流目录未变化")
+        cache.save(client.base_url, entry.get("etag"), entry["catalog"])
+        if get_workflow_registry().source == cache.path:
+            return False
+        # 启动时缓存无效或被忽略，用确认过的缓存替换当前注册表
+        catalog = entry["catalog"]
+    elif response.status_code == 200:
+        try:
+            body = response.json()
+        except ValueError as e:
+            print(f"❌ 工作流目录JSON解析失败: {str(e)}")
+            return False
+        if "code" in body:
+            if body.get("code") != 0:
+                print(f"⚠️ 获取工作流目录失败: {body.get('msg', '未知错误')}")
+                return False
+            body = body.get("data")
+        catalog = body
+    else:
+        print(f"⚠️ 服务器未提供工作流目录，状态码: {response.status_code}")
+        return False
+    try:
+        registry = WorkflowRegistry(catalog, source=cache.path)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"❌ 服务器工作流目录无效，继续使用当前配置: {str(e)}")
+        return False
+    if response.status_code == 200:
+        cache.save(client.base_url, response.headers.get("ETag"), catalog)
+    set_workflow_registry(registry)
+    print(f"✅ 工作流目录已更新（{len(registry)}个选项）")
+    return True
+
+# 导入时加载并建立索引，之后按(Tab, 选项)直接查找；
+# 优先使用上次从服务器获取的目录，没有时使用随插件安装的配置文件
+_workflow_registry = load_cached_workflow_catalog() or load_workflow_registry()
+
+def get_workflow_registry():
+    """获取全局工作流选项注册表"""
+    return _workflow_registry
+
+def set_workflow_registry(registry):
+    """替换全局工作流选项注册表（注册表只读，替换引用即可，读取方不需要加锁）"""
+    global _workflow_registry
+    _workflow_registry = registry
+
+# =========================
+# 性能计时（记录面板打开等耗时，便于跨版本对比）
+# =========================
+TIMING_LOG_NAME = "timings.jsonl"
+TIMING_LOG_MAX_BYTES = 256 * 1024   # 计时日志超过这个大小后轮换为.old文件
+
+_timing_hooks = []
+_plugin_build_id = None
+
+def add_timing_hook(callback):
+    """注册计时回调callback(name, seconds, info)，例如把面板打开耗时上报到统计服务"""
+    if callback not in _timing_hooks:
+        _timing_hooks.append(callback)
+
+def remove_timing_hook(callback):
+    if callback in _timing_hooks:
+        _timing_hooks.remove(callback)
+
+def get_plugin_build_id():
+    """插件脚本内容的短哈希，用来区分不同版本的计时记录"""
+    global _plugin_build_id
+    if _plugin_build_id is None:
+        script_path = globals().get("__file__")
+        try:
+            with open(script_path, 'rb') as f:
+                _plugin_build_id = hashlib.sha256(f.read()).hexdigest()[:12]
+        except (OSError, TypeError):
+            _plugin_build_id = "unknown"
+    return _plugin_build_id
+
+def record_timing(name, seconds, **info):
+    """记录一次耗时：打印、追加到插件数据目录下的计时日志，并通知已注册的计时回调"""
+    print(f"⏱️ {name}: {seconds * 1000:.1f} ms {info if info else ''}")
+    entry = {"name": name, "ms": round(seconds * 1000, 1), "time": time.time(), "build": get_plugin_build_id()}
+    entry.update(info)
+    try:
+        log_path = os.path.join(get_plugin_data_dir(), TIMING_LOG_NAME)
+        if os.path.exists(log_path) and os.path.getsize(log_path) > TIMING_LOG_MAX_BYTES:
+            os.replace(log_path, log_path + ".old")
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️ 写入计时日志失败: {str(e)}")
+    for hook in list(_timing_hooks):
+        try:
+            hook(name, seconds, info)
+        except Exception as e:
+            print(f"⚠️ 计时回调执行失败: {str(e)}")
+
+# =========================
+# 自动登录功能（内存中的登录凭据缓存）
+# =========================
+AUTO_LOGIN_FILE_NAME = "auto_login.json"
+CREDENTIAL_MTIME_CHECK_INTERVAL = 1.0  # 两次检查文件修改时间的最小间隔（秒）
+
+class CredentialStore(object):
+    """登录凭据只从磁盘读取一次，写入时原子落盘，文件被外部修改时自动重新加载"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = None
+        self._mtime = None
+        self._last_check = 0.0
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _ensure_loaded(self):
+        """按时间间隔检查文件修改时间，只有文件变化时才重新解析JSON"""
+        now = time.monotonic()
+        if self._data is not None and now - self._last_check < CREDENTIAL_MTIME_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        mtime = self._file_mtime()
+        if self._data is not None and mtime == self._mtime:
+            return
+        data = {}
+        if mtime is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                print(f"📖 已加载登录凭据: {self.path}")
+            except Exception as e:
+                print(f"读取自动登录信息失败: {str(e)}")
+                data = {}
+        self._data = data if isinstance(data, dict) else {}
+        self._mtime = mtime
+
+    def exists(self):
+        with self._lock:
+            self._ensure_loaded()
+            return self._mtime is not None
+
+    def data(self):
+        """返回完整凭据数据的副本"""
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._data)
+
+    def get_login_info(self):
+        """只要有用户名就返回数据，不检查auto_login字段"""
+        data = self.data()
+        if "username" in data:
+            return data
+        return None
+
+    def token(self):
+        return self.data().get("token")
+
+    def auth_headers(self, content_type="application/x-www-form-urlencoded"):
+        """返回带Bearer token的请求头；content_type为None时不设置Content-Type"""
+        headers = {}
+        if content_type:
+            headers["Content-Type"] = content_type
+        token = self.token()
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def update(self, **fields):
+        """合并字段并立即写回磁盘"""
+        with self._lock:
+            self._ensure_loaded()
+            data = dict(self._data)
+            data.update(fields)
+            write_json_atomic(self.path, data)
+            self._data = data
+            self._mtime = self._file_mtime()
+            self._last_check = time.monotonic()
+            return dict(data)
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._data = {}
+            self._mtime = None
+            self._last_check = time.monotonic()
+
+    def invalidate(self):
+        """强制下次访问时重新检查文件"""
+        with self._lock:
+            self._last_check = 0.0
+
+
+_credential_store = None
+_credential_store_lock = threading.Lock()
+
+def _migrate_legacy_auto_login(target_path):
+    """旧版本把auto_login.json写在当前工作目录或脚本目录，首次运行时迁移到数据目录"""
+    if os.path.exists(target_path):
+        return
+    candidates = [os.path.join(os.getcwd(), AUTO_LOGIN_FILE_NAME)]
+    plugin_dir = get_plugin_dir()
+    if plugin_dir:
+        candidates.append(os.path.join(plugin_dir, AUTO_LOGIN_FILE_NAME))
+    for legacy_path in candidates:
+        if os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    write_json_atomic(target_path, json.load(f))
+                print(f"✅ 已迁移旧的自动登录文件: {legacy_path} -> {target_path}")
+            except Exception as e:
+                print(f"⚠️ 迁移旧的自动登录文件失败: {str(e)}")
+            return
+
+def get_credential_store():
+    """获取全局登录凭据缓存"""
+    global _credential_store
+    if _credential_store is None:
+        with _credential_store_lock:
+            if _credential_store is None:
+                path = os.path.join(get_plugin_data_dir(), AUTO_LOGIN_FILE_NAME)
+                _migrate_legacy_auto_login(path)
+                _credential_store = CredentialStore(path)
+    return _credential_store
+
+def get_auto_login_info():
+    """获取自动登录信息（从内存缓存读取）"""
+    return get_credential_store().get_login_info()
+
+# =========================
+# 上传缓存（按内容哈希复用已上传图片的URL）
+# =========================
+UPLOAD_CACHE_FILE_NAME = "upload_cache.json"
+
+class UploadCache(object):
+    """以"服务器地址 + 图片内容SHA256"为键缓存上传后返回的fileUrl，带过期时间和LRU容量上限"""
+
+    def __init__(self, path, ttl=UPLOAD_CACHE_TTL, max_entries=UPLOAD_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries = None
+        self._deferred_save = DeferredSave(self._flush_last_used)
+
+    @staticmethod
+    def make_key(base_url, content):
+        digest = hashlib.sha256(content).hexdigest()
+        return f"{base_url.rstrip('/')}|{digest}"
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 读取上传缓存失败: {str(e)}")
+                entries = {}
+        self._entries = entries if isinstance(entries, dict) else {}
+
+    def _save(self):
+        self._deferred_save.cancel()
+        try:
+            write_json_atomic(self.path, self._entries)
+        except Exception as e:
+            print(f"⚠️ 保存上传缓存失败: {str(e)}")
+
+    def _flush_last_used(self):
+        with self._lock:
+            if self._entries is not None:
+                self._save()
+
+    def get(self, key):
+        """命中且未过期时返回URL，并刷新最近使用时间（使用时间延迟写盘）"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            now = time.time()
+            if now - entry.get("created", 0) > self.ttl:
+                del self._entries[key]
+                self._save()
+                return None
+            entry["last_used"] = now
+            self._deferred_save.schedule()
+            return entry.get("url")
+
+    def put(self, key, url):
+        with self._lock:
+            self._load()
+            now = time.time()
+            self._entries[key] = {"url": url, "created": now, "last_used": now}
+            if len(self._entries) > self.max_entries:
+                oldest = sorted(self._entries, key=lambda k: self._entries[k].get("last_used", 0))
+                for stale_key in oldest[:len(self._entries) - self.max_entries]:
+                    del self._entries[stale_key]
+            self._save()
+
+    def invalidate_urls(self, urls):
+        """服务器拒绝了某些URL时删除对应条目，返回删除的条目数"""
+        urls = set(u for u in urls if u)
+        with self._lock:
+            self._load()
+            stale_keys = [k for k, v in self._entries.items() if v.get("url") in urls]
+            for key in stale_keys:
+                del self._entries[key]
+            if stale_keys:
+                self._save()
+            return len(stale_keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+
+_upload_cache = None
+_upload_cache_lock = threading.Lock()
+
+def get_upload_cache():
+    """获取全局上传缓存"""
+    global _upload_cache
+    if _upload_cache is None:
+        with _upload_cache_lock:
+            if _upload_cache is None:
+                _upload_cache = UploadCache(os.path.join(get_plugin_data_dir(), UPLOAD_CACHE_FILE_NAME))
+    return _upload_cache
+
+# =========================
+# 结果图片缓存（磁盘LRU，按URL索引）
 # =========================
+RESULT_CACHE_DIR_NAME = "results"
+RESULT_CACHE_INDEX_NAME = "index.json"
+_RESULT_CONTENT_TYPE_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp"
+}
+
+class ResultCache(object):
+    """
+    下载过的结果图片保存在插件数据目录中，每个URL对应一个唯一文件名
+    
+    索引记录ETag、大小和SHA256，读取时校验文件完整性；总大小超出上限时按最近使用时间淘汰
+    """
+
+    def __init__(self, directory, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, RESULT_CACHE_INDEX_NAME)
+        self._lock = threading.RLock()
+        self._entries = None
+        self._verified = set()  # 本次运行中已校验过哈希的文件
+        self._deferred_save = DeferredSave(self._flush_last_used)
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        entries = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 读取结果缓存索引失败: {str(e)}")
+                entries = {}
+        self._entries = entries if isinstance(entries, dict) else {}
+
+    def _save(self):
+        self._deferred_save.cancel()
+        try:
+            write_json_atomic(self.index_path, self._entries)
+        except Exception as e:
+            print(f"⚠️ 保存结果缓存索引失败: {str(e)}")
+
+    def _flush_last_used(self):
+        with self._lock:
+            if self._entries is not None:
+                self._save()
+
+    @staticmethod
+    def file_name_for(url, content_type=None):
+        """根据URL生成唯一文件名，扩展名优先取URL中的，其次取Content-Type"""
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if ext not in _RESULT_CONTENT_TYPE_EXTENSIONS.values() and ext != ".jpeg":
+            ext = _RESULT_CONTENT_TYPE_EXTENSIONS.get((content_type or "").split(";")[0].strip(), ".png")
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ext
+
+    def _entry_path(self, entry):
+        return os.path.join(self.directory, entry["file"])
+
+    def _is_valid(self, entry, verified):
+        """校验文件存在、大小一致；未校验过的文件再做SHA256校验（不持有锁调用）"""
+        path = self._entry_path(entry)
+        try:
+            if os.path.getsize(path) != entry.get("size"):
+                return False
+        except OSError:
+            return False
+        if verified:
+            return True
+        sha = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+        except OSError:
+            return False
+        return sha.hexdigest() == entry.get("sha256")
+
+    def _remove(self, url):
+        entry = self._entries.pop(url, None)
+        if entry:
+            path = self._entry_path(entry)
+            self._verified.discard(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get(self, url):
+        """命中且文件完整时返回本地路径并刷新使用时间（使用时间延迟写盘），否则返回None"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(url)
+            if not entry:
+                return None
+            entry = dict(entry)
+            path = self._entry_path(entry)
+            verified = path in self._verified
+        # 哈希校验可能要读完整个大文件，不能占着锁
+        valid = self._is_valid(entry, verified)
+        with self._lock:
+            current = self._entries.get(url)
+            if not current or current.get("sha256") != entry.get("sha256"):
+                # 校验期间条目被重新下载或淘汰了，重新下载的文件写入时已校验过
+                if current and self._entry_path(current) in self._verified:
+                    return self._entry_path(current)
+                return None
+            if not valid:
+                print(f"⚠️ 结果缓存文件损坏，重新下载: {url}")
+                self._remove(url)
+                self._save()
+                return None
+            self._verified.add(path)
+            current["last_used"] = time.time()
+            self._deferred_save.schedule()
+            return path
+
+    def get_entry(self, url):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(url)
+            return dict(entry) if entry else None
+
+    def put(self, url, data, etag=None, content_type=None):
+        """保存下载好的图片数据，返回本地路径"""
+        with self._lock:
+            self._load()
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return self._commit(url, temp_path, len(data), hashlib.sha256(data).hexdigest(), etag, content_type)
+
+    def _commit(self, url, temp_path, size, sha256, etag=None, content_type=None):
+        """把写好的临时文件移动到最终位置并登记到索引"""
+        with self._lock:
+            self._load()
+            file_name = self.file_name_for(url, content_type)
+            path = os.path.join(self.directory, file_name)
+            try:
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            now = time.time()
+            self._entries[url] = {
+                "file": file_name,
+                "size": size,
+                "sha256": sha256,
+                "etag": etag,
+                "content_type": content_type,
+                "created": now,
+                "last_used": now
+            }
+            self._verified.add(path)
+            self._evict()
+            self._save()
+            return path
+
+    def touch(self, url):
+        with self._lock:
+            self._load()
+            if url in self._entries:
+                self._entries[url]["last_used"] = time.time()
+                self._deferred_save.schedule()
+
+    def _evict(self):
+        total = sum(e.get("size", 0) for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for url in sorted(self._entries, key=lambda u: self._entries[u].get("last_used", 0)):
+            if total <= self.max_bytes or len(self._entries) <= 1:
+                break
+            total -= self._entries[url].get("size", 0)
+            print(f"🧹 淘汰结果缓存: {url}")
+            self._remove(url)
+
+    def fetch(self, url, revalidate=False, timeout=30, progress_callback=None, preview_callback=None,
+              cancel_token=None):
+        """
+        后台线程：返回结果图片的本地路径，未缓存时边下载边写入缓存文件
+        
+        revalidate为True时带If-None-Match向服务器确认缓存是否仍然有效；
+        progress_callback(received, total)报告下载字节数（total未知时为0），
+        preview_callback(QImage)在下载过程中用已收到的部分数据解码出低分辨率预览图；
+        cancel_token取消后在下一个数据块处抛出TaskCancelled，未下载完的临时文件会被删除
+        """
+        if cancel_token:
+            cancel_token.check()
+        path = self.get(url)
+        if path and not revalidate:
+            print(f"♻️ 命中结果图片缓存: {path}")
+            return path
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        entry = self.get_entry(url) if path else None
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        response = get_http_client().get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            if response.status_code == 304 and path:
+                self.touch(url)
+                return path
+            if response.status_code != 200:
+                print(f"❌ 下载图片失败，状态码: {response.status_code}")
+                return None
+            return self._download(url, response, progress_callback, preview_callback, cancel_token)
+        finally:
+            response.close()
+
+    def _download(self, url, response, progress_callback=None, preview_callback=None, cancel_token=None):
+        """分块下载到临时文件，同时计算SHA256、报告进度并生成渐进预览"""
+        with self._lock:
+            self._load()
+        total = int(response.headers.get("Content-Length") or 0)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        sha = hashlib.sha256()
+        received = 0
+        last_preview = 0.0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=RESULT_DOWNLOAD_CHUNK_SIZE):
+                    if cancel_token:
+                        cancel_token.check()
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    sha.update(chunk)
+                    received += len(chunk)
+                    if progress_callback:
+                        progress_callback(received, total)
+                    now = time.monotonic()
+                    if preview_callback and received >= RESULT_PREVIEW_MIN_BYTES and \
+                       now - last_preview >= RESULT_PREVIEW_INTERVAL and (not total or received < total):
+                        last_preview = now
+                        f.flush()
+                        preview = decode_scaled_image(temp_path)
+                        if preview is not None:
+                            preview_callback(preview)
+            if total and received != total:
+                raise Exception(f"下载不完整: {received}/{total} 字节")
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return self._commit(url, temp_path, received, sha.hexdigest(), response.headers.get("ETag"),
+                            response.headers.get("Content-Type"))
+
+
+def decode_scaled_image(path, max_side=RESULT_PREVIEW_MAX_SIDE, max_height=None):
+    """
+    按缩小后的尺寸解码图片文件，返回QImage；数据不足以解码时返回None
+    
+    图片缩放到max_side x max_height（默认与max_side相同）以内，比目标小的图片保持原尺寸；
+    可以在后台线程调用，也用于解码仍在下载中的文件
+    """
+    max_height = max_height or max_side
+    reader = QtGui.QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if not size.isValid():
+        return None
+    if size.width() > max_side or size.height() > max_height:
+        reader.setScaledSize(size.scaled(max_side, max_height, QtCore.Qt.KeepAspectRatio))
+    image = reader.read()
+    return None if image.isNull() else image
+
+
+def parse_result_urls(data):
+    """
+    从任务详情数据中取出全部结果图片URL
+    
+    workUrl可能是JSON数组字符串或单个URL；没有workUrl时使用resultImages
+    """
+    if not data:
+        return []
+    work_url = data.get("workUrl")
+    if work_url:
+        work_url = work_url.strip()
+        if work_url.startswith('[') and work_url.endswith(']'):
+            try:
+                return [url for url in json.loads(work_url) if url]
+            except ValueError as e:
+                print(f"❌ 解析图片URL失败: {str(e)}")
+                print(f"📋 原始URL: {work_url}")
+                return []
+        return [work_url]
+    return [url for url in data.get("resultImages") or [] if url]
+
+
+def download_result_images(urls, item_callback=None, preview_index=0, cancel_token=None):
+    """
+    后台线程：并发下载多张结果图片到缓存并解码缩略图，返回本地路径列表（失败的为None）
+    
+    每张图片完成后调用item_callback(index, path, thumbnail, preview)，
+    只有preview_index对应的图片额外解码一张预览尺寸的图，其余图片都不做全尺寸解码；
+    cancel_token取消后中止正在下载的图片，尚未开始的图片不再下载
+    """
+    def fetch_one(index, url):
+        try:
+            path = get_result_cache().fetch(url, cancel_token=cancel_token)
+        except TaskCancelled:
+            return None
+        except Exception as e:
+            print(f"❌ 下载结果图片{index + 1}失败: {str(e)}")
+            path = None
+        thumbnail = preview = None
+        if path:
+            thumbnail = get_thumbnail_service().decode(path, RESULT_THUMBNAIL_SIZE)
+            if index == preview_index:
+                preview = decode_scaled_image(path)
+        if item_callback:
+            item_callback(index, path, thumbnail, preview)
+        return path
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), RESULT_GALLERY_CONCURRENCY))) as pool:
+        futures = [pool.submit(fetch_one, index, url) for index, url in enumerate(urls)]
+        paths = [future.result() for future in futures]
+    if cancel_token:
+        cancel_token.check()
+    return paths
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """获取全局结果图片缓存"""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(os.path.join(get_plugin_data_dir(), RESULT_CACHE_DIR_NAME))
+    return _result_cache
+
+# =========================
+# 缩略图解码服务
+# =========================
+class ThumbnailService(object):
+    """
+    在后台线程按目标尺寸解码图片，结果按(路径, 修改时间, 文件大小, 目标尺寸)缓存在内存中
+    
+    界面控件通过request()获取缩略图，回调在界面线程执行并收到QImage（解码失败时为None）
+    """
+    
+    def __init__(self, max_entries=THUMBNAIL_CACHE_MAX_ENTRIES, max_workers=THUMBNAIL_DECODE_WORKERS):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+    
+    @staticmethod
+    def make_key(path, width, height):
+        """文件不存在时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, int(width), int(height))
+    
+    def _cached(self, key):
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+            return image
+    
+    def _store(self, key, image):
+        with self._lock:
+            self._cache[key] = image
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+    
+    def decode(self, path, width, height=None):
+        """在当前线程解码（供已经在后台线程中的代码使用），命中缓存时直接返回"""
+        height = height or width
+        key = self.make_key(path, width, height)
+        if key is None:
+            return None
+        image = self._cached(key)
+        if image is None:
+            image = decode_scaled_image(path, width, height)
+            if image is not None:
+                self._store(key, image)
+        return image
+    
+    def request(self, path, width, height, callback):
+        """界面线程：异步获取缩略图，命中缓存时立即回调；同一缩略图的并发请求只解码一次"""
+        key = self.make_key(path, width, height)
+        if key is None:
+            callback(None)
+            return
+        image = self._cached(key)
+        if image is not None:
+            callback(image)
+            return
+        with self._lock:
+            if key in self._pending:
+                self._pending[key].append(callback)
+                return
+            self._pending[key] = [callback]
+        self._pool.submit(self._decode_pending, key, path, width, height)
+    
+    def _decode_pending(self, key, path, width, height):
+        try:
+            image = decode_scaled_image(path, width, height)
+        except Exception as e:
+            print(f"❌ 解码缩略图失败: {path}, {str(e)}")
+            image = None
+        if image is not None:
+            self._store(key, image)
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+        executor = get_network_executor()
+        for callback in callbacks:
+            executor.run_in_gui_thread(callback, image)
+
+
+_thumbnail_service = None
+_thumbnail_service_lock = threading.Lock()
+
+def get_thumbnail_service():
+    """获取全局缩略图解码服务"""
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        with _thumbnail_service_lock:
+            if _thumbnail_service is None:
+                _thumbnail_service = ThumbnailService()
+    return _thumbnail_service
+
+# =========================
+# 上传进度
+# =========================
+class _ProgressBody(object):
+    """分块发送的请求体，每发送一块就回调一次已发送字节数"""
+
+    def __init__(self, data, callback=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        self._data = data
+        self._callback = callback
+        self._chunk_size = chunk_size
+        self._offset = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._chunk_size
+        chunk = self._data[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        if chunk and self._callback:
+            self._callback(self._offset, len(self._data))
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self._chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class UploadProgressTracker(object):
+    """汇总多个并发上传的字节进度，映射到进度条的[start, end]区间"""
+
+    def __init__(self, callback, start, end, status_text="上传图像..."):
+        self._callback = callback
+        self._start = start
+        self._end = end
+        self._status_text = status_text
+        self._lock = threading.Lock()
+        self._sent = {}
+        self._total = {}
+        self._last_value = None
+
+    def add(self, name, total):
+        with self._lock:
+            self._sent[name] = 0
+            self._total[name] = max(total, 1)
+
+    def update(self, name, sent, total=None):
+        with self._lock:
+            if total is not None:
+                self._total[name] = max(total, 1)
+            self._sent[name] = min(sent, self._total.get(name, sent))
+            total_bytes = sum(self._total.values()) or 1
+            ratio = sum(self._sent.values()) / float(total_bytes)
+            value = self._start + int((self._end - self._start) * ratio)
+            if value == self._last_value:
+                return
+            self._last_value = value
+        if self._callback:
+            self._callback(value, f"{self._status_text} {int(ratio * 100)}%")
+
+    def finish(self, name):
+        with self._lock:
+            total = self._total.get(name, 1)
+        self.update(name, total)
+
+# =========================
+# API请求
+# =========================
+def api_request(endpoint, params, method="POST", headers=None, rejected_statuses=()):
+    """
+    发送API请求（参数放在URL中），成功返回解析后的JSON，失败返回None
+    
+    HTTP状态码在rejected_statuses中时返回{"code": 状态码, "msg": ..., "httpStatus": 状态码}，
+    让调用方区分服务器明确拒绝和结果不明确（超时、网络错误）的请求
+    """
+    try:
+        # 构建请求URL
+        url = get_http_client().build_url(endpoint)
+        
+        if headers is None:
+            headers = get_credential_store().auth_headers()
+        
+        if method.upper() == "GET":
+            # GET请求：参数在URL中
+            query_params = []
+            for key, value in params.items():
+                if value is not None and value != "":
+                    query_params.append(f"{key}={value}")
+            
+            if query_params:
+                url += "?" + "&".join(query_params)
+            
+            print(f"🌐 发送GET请求到: {url}")
+            response = get_http_client().get(url, headers=headers, timeout=30)
+        else:
+            # POST请求：参数在URL中
+            query_params = []
+            for key, value in params.items():
+                if value is not None and value != "":
+                    query_params.append(f"{key}={value}")
+            
+            if query_params:
+                url += "?" + "&".join(query_params)
+            
+            print(f"🌐 发送POST请求到: {url}")
+            response = get_http_client().post(url, headers=headers, timeout=30)
+        
+        print(f"📥 响应状态码: {response.status_code}")
+        print(f"📥 响应内容: {response.text}")
+        
+        if response.status_code == 200:
+            try:
+                return response.json()
+            except json.JSONDecodeError as e:
+                print(f"❌ JSON解析失败: {str(e)}")
+                print(f"📋 原始响应: {response.text}")
+                return None
+        else:
+            print(f"❌ API请求HTTP错误: {response.status_code}")
+            print(f"📋 错误响应: {response.text}")
+            if response.status_code in rejected_statuses:
+                return {"code": response.status_code, "msg": f"服务器拒绝请求（HTTP {response.status_code}）",
+                        "httpStatus": response.status_code}
+            return None
+            
+    except Exception as e:
+        print(f"❌ API请求异常: {str(e)}")
+        return None
+
+def fetch_task_status(task_id, flow_id=None):
+    """查询任务状态"""
+    try:
+        print(f"🔍 查询任务状态: {task_id}")
+        
+        # 根据API文档，使用GET请求，需要id和flowId参数
+        params = {"id": task_id}
+        if flow_id:
+            params["flowId"] = flow_id
+        
+        response = api_request(API_ENDPOINTS["work_status"], params, method="GET")
+        
+        if response and response.get("code") == 0:
+            print(f"✅ 任务状态查询成功")
+            return response
+        elif response:
+            print(f"⚠️ 任务状态查询返回错误: {response.get('msg', '未知错误')}")
+            return None
+        else:
+            print(f"❌ 查询任务状态失败，无响应")
+            return None
+            
+    except Exception as e:
+        print(f"❌ 查询任务状态异常: {str(e)}")
+        return None
+
+def fetch_task_details(task_id):
+    """获取任务详情"""
+    try:
+        print(f"📋 获取任务详情: {task_id}")
+        
+        # 根据API文档，使用GET请求，参数为id
+        params = {"id": task_id}
+        response = api_request(API_ENDPOINTS["work_details"], params, method="GET")
+        
+        if response and response.get("code") == 0:
+            print(f"✅ 任务详情获取成功:")
+            print(f"📥 详情数据: {json.dumps(response, ensure_ascii=False, indent=2)}")
+            
+            # 获取结果图片URL
+            result_data = response.get("data", {})
+            result_images = parse_result_urls(result_data)
+            if result_images:
+                print(f"🖼️ 生成结果图片:")
+                for i, img_url in enumerate(result_images):
+                    print(f"  图片{i+1}: {img_url}")
+            else:
+                print("⚠️ 未找到结果图片")
+            
+            return response
+        else:
+            error_msg = response.get("msg", "未知错误") if response else "网络错误"
+            print(f"❌ 获取任务详情失败: {error_msg}")
+            return None
+            
+    except Exception as e:
+        print(f"❌ 获取任务详情异常: {str(e)}")
+        return None
+
+def fetch_work_list(task_ids):
+    """
+    批量查询作品列表，返回作品数据列表；请求失败返回None
+    
+    服务器不支持按id过滤时会忽略ids参数，调用方只使用其中匹配的条目
+    """
+    params = {"ids": ",".join(str(t) for t in task_ids), "pageNum": 1, "pageSize": max(len(task_ids), 20)}
+    return _parse_work_list(api_request(API_ENDPOINTS["work_list"], params, method="GET"))
+
+WorkPage = namedtuple("WorkPage", ["items", "has_more", "total"])
+
+def fetch_work_page(page_num, page_size=HISTORY_SYNC_PAGE_SIZE):
+    """
+    按页查询当前用户的作品列表（新作品在前），返回WorkPage，请求失败返回None
+    
+    has_more和total取自分页对象中的hasMore/hasNextPage和total字段，服务器没有返回时为None
+    """
+    params = {"pageNum": page_num, "pageSize": page_size}
+    response = api_request(API_ENDPOINTS["work_list"], params, method="GET")
+    items = _parse_work_list(response)
+    if items is None:
+        return None
+    data = response.get("data")
+    has_more = total = None
+    if isinstance(data, dict):
+        for key in ("hasMore", "hasNextPage"):
+            if isinstance(data.get(key), bool):
+                has_more = data[key]
+                break
+        try:
+            total = int(data["total"]) if data.get("total") is not None else None
+        except (TypeError, ValueError):
+            total = None
+    return WorkPage(items, has_more, total)
+
+def _parse_work_list(response):
+    """从作品列表接口的响应中取出作品数据列表，兼容data直接是列表或分页对象的格式"""
+    if not response or response.get("code") != 0:
+        return None
+    data = response.get("data")
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for key in ("list", "records", "rows", "items"):
+            if isinstance(data.get(key), list):
+                return data[key]
+    return []
+
+def cancel_remote_task(task_id, flow_id=None, timeout=TASK_CANCEL_CONFIRM_TIMEOUT):
+    """
+    后台线程：请求服务器取消任务，并查询任务状态直到确认变为已取消(40)
+    
+    返回任务的最终状态码：40表示已取消，20/30表示取消前任务已经结束；
+    取消请求失败且任务仍在进行，或超时仍未确认时返回None
+    """
+    print(f"🛑 请求服务器取消任务: {task_id}")
+    params = {"id": task_id}
+    if flow_id:
+        params["flowId"] = flow_id
+    response = api_request(API_ENDPOINTS["work_cancel"], params, method="POST")
+    accepted = bool(response) and response.get("code") == 0
+    if not accepted:
+        error_msg = response.get("msg", "未知错误") if response else "网络错误"
+        print(f"❌ 取消任务请求失败: {error_msg}")
+    deadline = time.monotonic() + timeout
+    while True:
+        status_response = fetch_task_status(task_id, flow_id)
+        task_data = (status_response or {}).get("data") or {}
+        work_status = task_data.get("workStatus")
+        if work_status in (20, 30, 40):
+            print(f"✅ 任务{task_id}最终状态: {TASK_STATUS_TEXT.get(work_status)}")
+            return work_status
+        # 取消请求没有被接受时只确认一次任务是否已经结束
+        if not accepted or time.monotonic() + TASK_CANCEL_CONFIRM_INTERVAL > deadline:
+            print(f"⚠️ 未能确认任务{task_id}已取消，当前状态: {work_status}")
+            return None
+        time.sleep(TASK_CANCEL_CONFIRM_INTERVAL)
+
+# =========================
+# 任务日志（SQLite，记录每次提交及其状态变化，面板或3ds Max重启后继续监控未完成的任务）
+# =========================
+JOB_JOURNAL_FILE_NAME = "jobs.sqlite3"
+JOB_UNFINISHED_STATES = ("submitted", "running", "cancelling")
+JOB_FINAL_STATES = {20: "finished", 30: "failed", 40: "cancelled"}  # 任务结束时的状态码 -> 日志状态
+
+class JobJournal(object):
+    """
+    本地任务日志，每次提交和状态变化立即写入磁盘
+    
+    jobs表保存每个任务的当前状态（batch标记批量队列提交的任务），job_events表按时间记录状态变化；
+    写入失败只打印警告，不影响任务监控
+    """
+
+    def __init__(self, path, retention=JOB_JOURNAL_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    work_id TEXT PRIMARY KEY,
+                    flow_id TEXT,
+                    tab TEXT,
+                    option TEXT,
+                    work_type INTEGER,
+                    params TEXT,
+                    state TEXT NOT NULL,
+                    status INTEGER,
+                    result_urls TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    batch INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created);
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    work_id TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    status INTEGER,
+                    message TEXT,
+                    at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS job_events_work_id ON job_events (work_id);
+            """)
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "batch" not in columns:
+                # 旧版本创建的任务日志没有batch列
+                with conn:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN batch INTEGER NOT NULL DEFAULT 0")
+            self._conn = conn
+            self._compact()
+        return self._conn
+
+    def _compact(self):
+        """删除超过保留时间的已结束任务及其状态记录"""
+        cutoff = time.time() - self.retention
+        placeholders = ",".join("?" * len(JOB_UNFINISHED_STATES))
+        with self._conn:
+            self._conn.execute(f"DELETE FROM jobs WHERE updated < ? AND state NOT IN ({placeholders})",
+                               (cutoff,) + JOB_UNFINISHED_STATES)
+            self._conn.execute("DELETE FROM job_events WHERE work_id NOT IN (SELECT work_id FROM jobs)")
+
+    def _write(self, statements):
+        with self._lock:
+            try:
+                conn = self._connect()
+                with conn:
+                    for sql, args in statements:
+                        conn.execute(sql, args)
+            except sqlite3.Error as e:
+                print(f"⚠️ 写入任务日志失败: {str(e)}")
+
+    def record_submitted(self, work_id, flow_id=None, tab=None, option=None, work_type=None, params=None,
+                         batch=False):
+        """记录一次成功提交的任务；batch为True表示由批量队列提交"""
+        now = time.time()
+        self._write([
+            ("INSERT OR REPLACE INTO jobs (work_id, flow_id, tab, option, work_type, params, state, "
+             "created, updated, batch) VALUES (?, ?, ?, ?, ?, ?, 'submitted', ?, ?, ?)",
+             (str(work_id), flow_id, tab, option, work_type,
+              json.dumps(params, ensure_ascii=False) if params is not None else None, now, now, int(batch))),
+            ("INSERT INTO job_events (work_id, state, at) VALUES (?, 'submitted', ?)", (str(work_id), now))
+        ])
+
+    def update(self, work_id, state, status=None, result_urls=None, message=None):
+        """记录任务状态变化；日志中没有的任务（例如外部直接监控的任务）不会新增记录"""
+        now = time.time()
+        self._write([
+            ("UPDATE jobs SET state = ?, status = COALESCE(?, status), "
+             "result_urls = COALESCE(?, result_urls), updated = ? WHERE work_id = ?",
+             (state, status, json.dumps(result_urls) if result_urls is not None else None, now, str(work_id))),
+            ("INSERT INTO job_events (work_id, state, status, message, at) "
+             "SELECT work_id, ?, ?, ?, ? FROM jobs WHERE work_id = ?",
+             (state, status, message, now, str(work_id)))
+        ])
+
+    def unfinished(self, max_age=JOB_RESUME_MAX_AGE):
+        """返回max_age秒内提交且尚未结束的任务（按提交时间排序）"""
+        placeholders = ",".join("?" * len(JOB_UNFINISHED_STATES))
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    f"SELECT work_id, flow_id, tab, option, work_type, state, status, created, batch FROM jobs "
+                    f"WHERE state IN ({placeholders}) AND created >= ? ORDER BY created",
+                    JOB_UNFINISHED_STATES + (time.time() - max_age,)).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️ 读取任务日志失败: {str(e)}")
+                return []
+        return [dict(row) for row in rows]
+
+    def get(self, work_id):
+        with self._lock:
+            try:
+                row = self._connect().execute("SELECT * FROM jobs WHERE work_id = ?", (str(work_id),)).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ 读取任务日志失败: {str(e)}")
+                return None
+        return dict(row) if row else None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_job_journal = None
+_job_journal_lock = threading.Lock()
+
+def get_job_journal():
+    """获取全局任务日志"""
+    global _job_journal
+    if _job_journal is None:
+        with _job_journal_lock:
+            if _job_journal is None:
+                _job_journal = JobJournal(os.path.join(get_plugin_data_dir(), JOB_JOURNAL_FILE_NAME))
+    return _job_journal
+
+# =========================
+# 历史记录（从/api/work/list增量同步到本地SQLite，按时间倒序分页查询）
+# =========================
+HISTORY_DB_FILE_NAME = "history.sqlite3"
+_HISTORY_TIME_FIELDS = ("createTime", "createdAt", "gmtCreate", "workTime")
+
+def parse_work_time(value):
+    """解析作品的创建时间（毫秒/秒时间戳或"YYYY-MM-DD HH:MM:SS"），无法解析时返回None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        timestamp = float(value)
+        return timestamp / 1000.0 if timestamp > 1e11 else timestamp
+    text = str(value).replace("T", " ").split(".")[0].rstrip("Z")
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    return None
+
+def history_record_from_work(item):
+    """把作品列表中的一项转换为历史记录，缺少作品ID时返回None"""
+    if not isinstance(item, dict):
+        return None
+    work_id = item.get("id", item.get("workId"))
+    if work_id is None:
+        return None
+    created = None
+    for field in _HISTORY_TIME_FIELDS:
+        created = parse_work_time(item.get(field))
+        if created is not None:
+            break
+    try:
+        work_type = int(item.get("workType")) if item.get("workType") is not None else None
+    except (TypeError, ValueError):
+        work_type = None
+    return {
+        "work_id": str(work_id),
+        "work_type": work_type,
+        "status": item.get("workStatus"),
+        "prompt": item.get("workName") or "",
+        "created": created if created is not None else time.time(),
+        "result_urls": parse_result_urls(item)
+    }
+
+
+class HistoryStore(object):
+    """
+    本地历史记录库
+    
+    works表按(创建时间, 作品ID)倒序建索引，并分别按workType、状态建索引；
+    分页使用上一页最后一条的(创建时间, 作品ID)作为游标，翻到多深都只扫描一页的数据。
+    提示词是中文短句，FTS5默认分词器不会切分中文，所以提示词搜索在时间索引上用LIKE过滤
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS works (
+                    work_id TEXT PRIMARY KEY,
+                    work_type INTEGER,
+                    status INTEGER,
+                    prompt TEXT NOT NULL DEFAULT '',
+                    created REAL NOT NULL,
+                    result_urls TEXT,
+                    synced REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS works_created ON works (created DESC, work_id DESC);
+                CREATE INDEX IF NOT EXISTS works_type ON works (work_type, created DESC, work_id DESC);
+                CREATE INDEX IF NOT EXISTS works_status ON works (status, created DESC, work_id DESC);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert(self, records):
+        """
+        写入一批历史记录，返回(新增或有变化的条数, 本地已有且已结束、内容未变化的条数)
+        """
+        changed = unchanged_final = 0
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for record in records:
+                    urls = json.dumps(record["result_urls"])
+                    row = conn.execute("SELECT status, prompt, result_urls FROM works WHERE work_id = ?",
+                                       (record["work_id"],)).fetchone()
+                    if row and row["status"] == record["status"] and row["prompt"] == record["prompt"] \
+                       and row["result_urls"] == urls:
+                        if record["status"] in JOB_FINAL_STATES:
+                            unchanged_final += 1
+                        continue
+                    conn.execute(
+                        "INSERT OR REPLACE INTO works (work_id, work_type, status, prompt, created, result_urls, synced) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (record["work_id"], record["work_type"], record["status"], record["prompt"],
+                         record["created"], urls, now))
+                    changed += 1
+        return changed, unchanged_final
+
+    def page(self, cursor=None, limit=HISTORY_PAGE_SIZE, work_type=None, status=None, since=None, text=None):
+        """
+        按创建时间倒序查询一页历史记录
+        
+        cursor为上一页最后一条记录的(创建时间, 作品ID)，None表示第一页；
+        work_type/status/since(时间戳)/text(提示词包含的文字)为None时不过滤
+        """
+        clauses = []
+        args = []
+        if work_type is not None:
+            clauses.append("work_type = ?")
+            args.append(work_type)
+        if status is not None:
+            clauses.append("status = ?")
+            args.append(status)
+        if since is not None:
+            clauses.append("created >= ?")
+            args.append(since)
+        if text:
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("prompt LIKE ? ESCAPE '\\'")
+            args.append(f"%{escaped}%")
+        if cursor is not None:
+            clauses.append("(created < ? OR (created = ? AND work_id < ?))")
+            args.extend([cursor[0], cursor[0], cursor[1]])
+        sql = "SELECT work_id, work_type, status, prompt, created, result_urls FROM works"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created DESC, work_id DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, args).fetchall()
+        records = []
+        for row in rows:
+            record = dict(row)
+            record["result_urls"] = json.loads(record["result_urls"] or "[]")
+            records.append(record)
+        return records
+
+    def count(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM works").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_history_store = None
+_history_store_lock = threading.Lock()
+
+def get_history_store():
+    """获取全局历史记录库"""
+    global _history_store
+    if _history_store is None:
+        with _history_store_lock:
+            if _history_store is None:
+                _history_store = HistoryStore(os.path.join(get_plugin_data_dir(), HISTORY_DB_FILE_NAME))
+    return _history_store
+
+def sync_work_history(store=None, page_size=HISTORY_SYNC_PAGE_SIZE, max_pages=HISTORY_SYNC_MAX_PAGES):
+    """
+    后台线程：把服务器作品列表增量同步到本地历史库，返回新增或更新的条数；第一页就请求失败时返回None
+    
+    列表按新作品在前返回，遇到整页都是本地已有且已结束的作品时停止；
+    第一次同步还没有翻到最后一页时不提前停止，直到把更早的作品也补齐。
+    服务器可能把pageSize限制得比请求的小，所以不能用"不满一页"判断最后一页，
+    只按hasMore/total或返回空页判断
+    """
+    store = store or get_history_store()
+    backfilled = store.get_meta("backfilled") == "1"
+    changed = 0
+    fetched = 0
+    for page_num in range(1, max_pages + 1):
+        page = fetch_work_page(page_num, page_size)
+        if page is None:
+            print(f"❌ 同步历史记录失败（第{page_num}页）")
+            return None if page_num == 1 else changed
+        records = [record for record in (history_record_from_work(item) for item in page.items) if record]
+        page_changed, unchanged_final = store.upsert(records)
+        changed += page_changed
+        fetched += len(page.items)
+        if not page.items or page.has_more is False or (page.total is not None and fetched >= page.total):
+            store.set_meta("backfilled", "1")
+            break
+        if backfilled and records and unchanged_final == len(records):
+            break
+    print(f"✅ 历史记录同步完成，新增或更新{changed}条")
+    return changed
+
+# =========================
+# 任务管理器（进程内统一监控所有进行中的任务）
+# =========================
+class PollingPolicy(object):
+    """
+    任务状态查询间隔策略：指数退避 + 随机抖动 + 上限
+    
+    状态变化时回到初始间隔；排队时按前面的等待人数（workCurrent）放慢查询；
+    服务器给出的提示（响应中的pollInterval/retryAfter或Retry-After头）优先；
+    超过截止时间（按实际经过时间）后停止监控。可以继承后传给TaskManager.track替换默认策略
+    """
+
+    def __init__(self, initial=TASK_POLL_INITIAL_INTERVAL, maximum=TASK_POLL_MAX_INTERVAL,
+                 factor=TASK_POLL_BACKOFF_FACTOR, jitter=TASK_POLL_JITTER,
+                 queue_seconds=TASK_POLL_QUEUE_SECONDS, near_done_interval=TASK_POLL_NEAR_DONE_INTERVAL,
+                 deadline=TASK_MONITOR_DEADLINE):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.queue_seconds = queue_seconds
+        self.near_done_interval = near_done_interval
+        self.deadline = deadline
+
+    def _with_jitter(self, interval):
+        if self.jitter:
+            interval *= random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        return max(0.1, interval)
+
+    def _server_hint(self, task_data):
+        """响应数据中的建议查询间隔（秒）"""
+        for key in ("pollInterval", "retryAfter"):
+            value = task_data.get(key)
+            if value:
+                try:
+                    return float(value)
+                except (TypeError, ValueError):
+                    pass
+        return None
+
+    def next_interval(self, task, task_data, progress):
+        """查询成功后计算下次查询间隔（秒）"""
+        interval = min(self.maximum, self.initial * (self.factor ** task.backoff_level))
+        
+        work_status = task_data.get("workStatus", 0)
+        work_current = task_data.get("workCurrent", 0) or 0
+        if work_status == 0 and work_current > 0:
+            # 排队中：前面等待的人越多，查询越慢
+            interval = max(interval, min(self.maximum, work_current * self.queue_seconds))
+        elif work_status == 10 and progress >= 80:
+            # 即将完成：限制最大间隔，不拖慢完成检测
+            interval = min(interval, self.near_done_interval)
+        
+        interval = self._with_jitter(interval)
+        hint = self._server_hint(task_data)
+        if hint:
+            interval = max(interval, hint)
+        return max(interval, get_http_client().retry_after_remaining())
+
+    def failure_interval(self, task):
+        """查询失败后计算下次查询间隔（秒）"""
+        interval = min(self.maximum, self.initial * (self.factor ** task.consecutive_failures))
+        return max(self._with_jitter(interval), get_http_client().retry_after_remaining())
+
+    def expired(self, task):
+        return self.deadline is not None and time.monotonic() - task.started > self.deadline
+
+
+class TrackedTask(QtCore.QObject):
+    """单个被监控任务的状态，信号只发给提交该任务的面板"""
+    progressChanged = Signal(str, int, str)     # 任务ID, 进度, 状态文本
+    finished = Signal(str, object, object)      # 任务ID, 任务状态数据, 任务详情
+    failed = Signal(str, str)                   # 任务ID, 错误信息
+    cancelled = Signal(str, object)             # 任务ID, 服务器确认的最终状态码（未确认时为None）
+
+    def __init__(self, task_id, flow_id=None, policy=None, parent=None):
+        super(TrackedTask, self).__init__(parent)
+        self.task_id = task_id
+        self.flow_id = flow_id
+        self.policy = policy or PollingPolicy()
+        self.started = time.monotonic()
+        self.attempts = 0
+        self.consecutive_failures = 0
+        self.last_state = None
+        self.backoff_level = 0
+        self.next_poll = 0.0
+        self.in_flight = False
+        self.journal_status = None  # 最近一次写入任务日志的状态码
+        self.owner = None           # 当前显示该任务进度和结果的面板
+        self._owner_slots = ()
+
+    def _signals(self):
+        return (self.progressChanged, self.finished, self.failed, self.cancelled)
+
+    def bind(self, owner, on_progress, on_finished, on_failed, on_cancelled):
+        """
+        把任务的信号交给owner（例如重新打开的面板），之前的owner不再收到该任务的信号
+
+        owner被销毁时自动解除绑定
+        """
+        self.unbind()
+        self.owner = owner
+        self._owner_slots = (on_progress, on_finished, on_failed, on_cancelled)
+        for signal, slot in zip(self._signals(), self._owner_slots):
+            signal.connect(slot)
+        owner.destroyed.connect(self._on_owner_destroyed)
+
+    def unbind(self):
+        owner, slots = self.owner, self._owner_slots
+        self.owner = None
+        self._owner_slots = ()
+        for signal, slot in zip(self._signals(), slots):
+            try:
+                signal.disconnect(slot)
+            except (RuntimeError, TypeError):
+                pass  # owner已经销毁，连接已被Qt断开
+        if owner is not None:
+            try:
+                owner.destroyed.disconnect(self._on_owner_destroyed)
+            except (RuntimeError, TypeError):
+                pass
+
+    def _on_owner_destroyed(self, *args):
+        # Qt在owner销毁时已经断开了到它的连接，这里只清除引用
+        self.owner = None
+        self._owner_slots = ()
+
+
+TaskStatusUpdate = namedtuple("TaskStatusUpdate", ["outcome", "work_status", "progress", "status_text"])
+
+def task_needs_details(task_data):
+    """已完成，或进度很高但状态还是运行中（可能是API状态更新延迟）时需要获取任务详情"""
+    work_status = task_data.get("workStatus", 0)
+    return work_status == 20 or (work_status == 10 and task_data.get("workNumber", 100) >= 80)
+
+def interpret_task_status(task, task_data, task_details=None):
+    """
+    解释一次任务状态查询的结果，并更新task的连续失败次数和退避级别（TaskManager和wait_for_task共用）
+    
+    task需要有policy、started、consecutive_failures、last_state、backoff_level字段，task_data为None表示查询失败；
+    outcome为"finished"（已完成）、"failed"（失败或已取消）、"expired"（超过监控截止时间）、
+    "lost"（连续查询失败次数过多）、"retry"（本次查询失败）或None（仍在进行）
+    """
+    if task_data is None:
+        task.consecutive_failures += 1
+        outcome = "lost" if task.consecutive_failures >= TASK_MONITOR_MAX_FAILURES else "retry"
+        return TaskStatusUpdate(outcome, None, 0, None)
+    task.consecutive_failures = 0
+    
+    work_status = task_data.get("workStatus", 0)
+    work_number = task_data.get("workNumber", 100)
+    status_text = TASK_STATUS_TEXT.get(work_status, f"未知状态({work_status})")
+    
+    # 使用API返回的总进度值
+    if work_status == 20:  # 已完成
+        progress = 100
+    elif work_status == 10:  # 运行中
+        progress = work_number if work_number > 0 else 0
+    else:
+        progress = 0
+    
+    # 状态或进度变化时回到初始间隔，否则逐步退避
+    current_state = (work_status, progress, task_data.get("workCurrent", 0))
+    if current_state == task.last_state:
+        task.backoff_level += 1
+    else:
+        task.backoff_level = 0
+        task.last_state = current_state
+    
+    if work_status == 20:
+        outcome = "finished"
+    elif work_status == 10 and progress >= 80 and parse_result_urls((task_details or {}).get("data")):
+        # 进度很高但状态还是运行中时，详情里已有图片URL说明任务已完成
+        outcome = "finished"
+    elif work_status in (30, 40):
+        outcome = "failed"
+    elif task.policy.expired(task):
+        outcome = "expired"
+    else:
+        outcome = None
+    return TaskStatusUpdate(outcome, work_status, progress, status_text)
+
+
+class _PushSession(object):
+    """推送通道一次启动的状态，每个后台线程只读写自己的会话，stop()后重新start()不会互相影响"""
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.response = None
+        self.subscribed = frozenset()  # 当前连接实际订阅的任务ID
+        self.resubscribe = False       # 订阅的任务变化后主动断开，需要立即用新的任务ID重连
+        self.connected = False
+        self.transport = None
+        self.reconnect_delay = 1.0
+
+    def close_response(self):
+        response = self.response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+
+class TaskEventStream(object):
+    """
+    任务进度推送通道，在独立的后台线程中保持连接
+    
+    依次尝试Server-Sent Events（/api/work/events）和HTTP长轮询（/api/work/wait），
+    服务器两种都不提供时标记为不可用，由TaskManager继续轮询。订阅的任务ID在请求时发送，
+    订阅的任务增加后SSE连接会断开并立即用新的任务ID重连，长轮询在当前请求返回后使用新的任务ID；
+    收到的任务数据通过on_event回调（在后台线程中调用）交给调用方过滤
+    """
+
+    def __init__(self, on_event):
+        self._on_event = on_event
+        self._task_ids = frozenset()
+        self._thread = None
+        self._session = None
+        self.unavailable = False
+        self.transport = None  # 最近一次启动的连接正在使用（或最后使用）的推送方式
+
+    @property
+    def connected(self):
+        session = self._session
+        return session is not None and session.connected
+
+    def is_subscribed(self, task_id):
+        """推送通道已连接且当前连接订阅了该任务"""
+        session = self._session
+        return session is not None and session.connected and str(task_id) in session.subscribed
+
+    def update_tasks(self, task_ids):
+        self._task_ids = frozenset(task_ids)
+        session = self._session
+        if session is not None and not self._task_ids <= session.subscribed:
+            # 有新任务不在当前连接的订阅中：断开SSE连接让后台线程立即重连
+            session.resubscribe = True
+            session.close_response()
+
+    def start(self):
+        if self.unavailable or (self._thread is not None and self._thread.is_alive()
+                                and self._session is not None):
+            return
+        session = _PushSession()
+        self._session = session
+        self._thread = threading.Thread(target=self._run, args=(session,),
+                                        name="TaskEventStream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止推送通道；阻塞中的长轮询会在请求返回后退出，不会影响之后重新启动的连接"""
+        session, self._session = self._session, None
+        if session is not None:
+            session.stop_event.set()
+            session.close_response()
+
+    def _headers(self, accept):
+        headers = get_credential_store().auth_headers(content_type=None)
+        headers["Accept"] = accept
+        return headers
+
+    def _set_connected(self, session, connected):
+        if connected and not session.connected:
+            print(f"📡 任务进度推送已连接: {session.transport} (订阅{len(session.subscribed)}个任务)")
+            session.reconnect_delay = 1.0
+        session.connected = connected
+
+    def _run(self, session):
+        stop_event = session.stop_event
+        transports = [("sse", self._run_sse), ("longpoll", self._run_longpoll)]
+        while transports and not stop_event.is_set():
+            name, transport = transports[0]
+            session.transport = name
+            if session is self._session:
+                self.transport = name
+            session.resubscribe = False
+            try:
+                supported = transport(session)
+            except Exception as e:
+                if not session.resubscribe and not stop_event.is_set():
+                    print(f"⚠️ 任务进度推送断开({name}): {str(e)}")
+                supported = True
+            session.response = None
+            self._set_connected(session, False)
+            if not supported:
+                print(f"ℹ️ 服务器不支持{name}任务推送")
+                transports.pop(0)
+                continue
+            if session.resubscribe:
+                session.resubscribe = False
+                continue
+            if stop_event.wait(session.reconnect_delay):
+                break
+            session.reconnect_delay = min(session.reconnect_delay * 2, TASK_PUSH_RECONNECT_MAX)
+        if not transports:
+            print("ℹ️ 服务器不提供任务进度推送，使用轮询")
+            self.unavailable = True
+            session.transport = None
+            if session is self._session:
+                self.transport = None
+
+    def _dispatch(self, payload):
+        """解析一条推送数据，可以是单个任务、任务列表或带data字段的响应"""
+        if isinstance(payload, dict) and "workStatus" not in payload and "data" in payload:
+            payload = payload["data"]
+        items = payload if isinstance(payload, list) else [payload]
+        for item in items:
+            if isinstance(item, dict) and "workStatus" in item:
+                self._on_event(item)
+
+    def _run_sse(self, session):
+        stop_event = session.stop_event
+        session.subscribed = self._task_ids
+        response = get_http_client().get(
+            API_ENDPOINTS["work_events"],
+            params={"ids": ",".join(sorted(session.subscribed))},
+            headers=self._headers("text/event-stream"),
+            stream=True,
+            timeout=(10, TASK_PUSH_SAFETY_INTERVAL * 2)
+        )
+        content_type = response.headers.get("Content-Type", "")
+        if response.status_code in (404, 405, 501) or \
+           (response.status_code == 200 and not content_type.startswith("text/event-stream")):
+            response.close()
+            return False
+        if response.status_code != 200:
+            response.close()
+            raise Exception(f"HTTP {response.status_code}")
+        
+        session.response = response
+        self._set_connected(session, True)
+        raw = response.raw
+        buffer = b""
+        data_lines = []
+        while not stop_event.is_set():
+            if not self._task_ids <= session.subscribed:
+                # 连接建立期间又有新任务，update_tasks来不及断开这个连接
+                session.resubscribe = True
+                break
+            # read1返回当前已到达的数据，不等待凑满缓冲区，保证事件到达后立即处理
+            chunk = raw.read1(8192) if hasattr(raw, "read1") else raw.read(1)
+            if not chunk:
+                break
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                line = line.rstrip(b"\r").decode("utf-8", "replace")
+                if not line:
+                    # 空行表示一个事件结束
+                    if data_lines:
+                        try:
+                            self._dispatch(json.loads("\n".join(data_lines)))
+                        except ValueError as e:
+                            print(f"⚠️ 无法解析推送数据: {str(e)}")
+                    data_lines = []
+                elif line.startswith(":"):
+                    continue  # 注释行（服务器心跳）
+                elif line.startswith("data:"):
+                    data_lines.append(line[5:].lstrip(" "))
+                elif line.startswith("retry:"):
+                    try:
+                        session.reconnect_delay = max(0.1, int(line[6:].strip()) / 1000.0)
+                    except ValueError:
+                        pass
+        response.close()
+        return True
+
+    def _run_longpoll(self, session):
+        stop_event = session.stop_event
+        while not stop_event.is_set():
+            if not self._task_ids:
+                stop_event.wait(1.0)
+                continue
+            # 每次请求都用最新的任务ID；请求进行期间新增的任务不在订阅中，由TaskManager正常轮询
+            session.subscribed = self._task_ids
+            response = get_http_client().get(
+                API_ENDPOINTS["work_wait"],
+                params={"ids": ",".join(sorted(session.subscribed)), "timeout": TASK_PUSH_LONGPOLL_TIMEOUT},
+                headers=self._headers("application/json"),
+                timeout=(10, TASK_PUSH_LONGPOLL_TIMEOUT + 10)
+            )
+            if response.status_code in (404, 405, 501):
+                return False
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}")
+            result = response.json()
+            if result.get("code") != 0:
+                raise Exception(result.get("msg", "未知错误"))
+            self._set_connected(session, True)
+            if stop_event.is_set():
+                break
+            if result.get("data"):
+                self._dispatch(result["data"])
+        return True
+
+
+class TaskManager(QtCore.QObject):
+    """
+    统一调度所有进行中任务的状态查询
+    
+    服务器提供推送时任务进度由TaskEventStream实时送达，轮询只作为低频兜底；
+    同一时刻到期的多个任务优先用一次/api/work/list批量查询，列表中找不到的任务
+    再单独调用/api/work/task；查询在网络线程池执行，结果回到界面线程后分发给各任务
+    """
+    taskCountChanged = Signal(int)
+
+    def __init__(self, parent=None):
+        super(TaskManager, self).__init__(parent)
+        self._tasks = {}
+        self._cancelling = {}  # 已停止监控、正在等待服务器确认取消的任务
+        self._batch_supported = None  # None表示尚未确认服务器是否支持批量查询，只在界面线程中读写
+        self._batch_misses = 0
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._poll_due_tasks)
+        self._push = TaskEventStream(self._queue_push_event) if TASK_PUSH_ENABLED else None
+        # 推送线程会通过网络线程池回到界面线程，这里确保线程池在界面线程中创建
+        get_network_executor()
+
+    def track(self, task_id, flow_id=None, policy=None):
+        """开始监控任务，返回TrackedTask供调用方连接信号；policy为None时使用默认PollingPolicy"""
+        task_id = str(task_id)
+        task = self._tasks.get(task_id)
+        if task is None:
+            task = TrackedTask(task_id, flow_id, policy, self)
+            self._tasks[task_id] = task
+            print(f"📊 任务管理器开始监控: {task_id} (进行中任务: {len(self._tasks)})")
+            self._tasks_changed()
+        task.next_poll = time.monotonic() + 0.1  # 立即执行第一次查询
+        self._schedule()
+        return task
+
+    def resume_unfinished(self, on_jobs):
+        """
+        后台读取任务日志中尚未结束的任务，在界面线程中回调on_jobs(jobs)
+        
+        调用方决定由哪个面板继续监控；仍在监控中的任务（例如关闭后重新打开面板）也一并交给调用方，
+        由新的面板接管显示；正在取消的任务直接再次请求取消，不再监控
+        """
+        def on_loaded(jobs):
+            monitor = []
+            for job in jobs:
+                if job["work_id"] in self._cancelling:
+                    continue
+                if job["state"] == "cancelling":
+                    print(f"🛑 继续取消上次未确认的任务: {job['work_id']}")
+                    self.cancel(job["work_id"], job["flow_id"])
+                else:
+                    monitor.append(job)
+            if monitor:
+                print(f"♻️ 恢复监控{len(monitor)}个未完成的任务")
+                on_jobs(monitor)
+        get_network_executor().submit(
+            get_job_journal().unfinished,
+            on_success=on_loaded,
+            on_error=lambda error: print(f"⚠️ 读取任务日志失败: {error}")
+        )
+
+    def untrack(self, task_id):
+        """停止监控任务，仍在进行中的查询结果将被忽略"""
+        task = self._tasks.pop(str(task_id), None)
+        if task is not None:
+            print(f"🛑 停止监控任务: {task_id}")
+            task.deleteLater()
+            self._tasks_changed()
+            self._schedule()
+
+    def cancel(self, task_id, flow_id=None):
+        """
+        取消任务：立即停止本地监控，在后台请求服务器取消并确认状态，完成后发出任务的cancelled信号
+        
+        没有在监控的任务（例如取消时刚好提交成功的任务）也可以取消，调用方连接返回任务的信号即可
+        """
+        task_id = str(task_id)
+        if task_id in self._cancelling:
+            return self._cancelling[task_id]
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self._tasks_changed()
+            self._schedule()
+        else:
+            task = TrackedTask(task_id, flow_id, parent=self)
+        print(f"🛑 取消任务: {task_id}")
+        get_job_journal().update(task_id, "cancelling")
+        self._cancelling[task_id] = task
+        get_network_executor().submit(
+            cancel_remote_task, task.task_id, task.flow_id,
+            on_success=lambda work_status: self._on_cancel_result(task_id, work_status),
+            on_error=lambda error: self._on_cancel_result(task_id, None)
+        )
+        return task
+
+    def _on_cancel_result(self, task_id, work_status):
+        if work_status is not None:
+            # 未确认时保持cancelling状态，下次打开面板时再次请求取消
+            get_job_journal().update(task_id, JOB_FINAL_STATES[work_status], work_status)
+        task = self._cancelling.pop(task_id, None)
+        if task is not None:
+            task.cancelled.emit(task_id, work_status)
+            task.deleteLater()
+
+    def cancelling_count(self):
+        return len(self._cancelling)
+
+    def _tasks_changed(self):
+        """任务增减后更新推送订阅；没有进行中的任务时关闭推送连接"""
+        if self._push is not None:
+            self._push.update_tasks(self._tasks.keys())
+            if self._tasks:
+                self._push.start()
+            else:
+                self._push.stop()
+        self.taskCountChanged.emit(len(self._tasks))
+
+    def is_tracking(self, task_id):
+        return str(task_id) in self._tasks
+
+    def active_count(self):
+        return len(self._tasks)
+
+    def _schedule(self):
+        """按最早到期的任务重新设置定时器"""
+        pending = [t.next_poll for t in self._tasks.values() if not t.in_flight]
+        if not pending:
+            self._timer.stop()
+            return
+        delay = max(0, int((min(pending) - time.monotonic()) * 1000))
+        self._timer.start(delay)
+
+    def _poll_due_tasks(self):
+        # 稍后即将到期的任务也一起查询，尽量合并成一次批量请求
+        horizon = time.monotonic() + TASK_MONITOR_COALESCE_WINDOW
+        due = [t for t in self._tasks.values() if not t.in_flight and t.next_poll <= horizon]
+        if not due:
+            self._schedule()
+            return
+        specs = []
+        for task in due:
+            task.in_flight = True
+            task.attempts += 1
+            specs.append((task.task_id, task.flow_id))
+        print(f"🔄 查询{len(specs)}个任务的进度...")
+        get_network_executor().submit(
+            self._poll_batch, specs, self._batch_supported is not False,
+            on_success=self._on_poll_results,
+            on_error=lambda error: self._on_poll_results(({task_id: (None, None) for task_id, _ in specs}, None))
+        )
+        self._schedule()
+
+    def _poll_batch(self, specs, try_batch=True):
+        """
+        后台线程：查询一批任务的状态，必要时获取任务详情
+        
+        返回({任务ID: (状态数据, 任务详情)}, 批量查询结果)，批量查询结果为True/False表示列表接口
+        是否包含这些任务，没有尝试或请求失败时为None；是否支持批量查询由界面线程判断
+        """
+        statuses = {}
+        batch_matched = None
+        if len(specs) > 1 and try_batch:
+            items = fetch_work_list([task_id for task_id, _ in specs])
+            if items is not None:
+                by_id = dict((str(item.get("id")), item) for item in items if isinstance(item, dict))
+                for task_id, _ in specs:
+                    if task_id in by_id and "workStatus" in by_id[task_id]:
+                        statuses[task_id] = by_id[task_id]
+                batch_matched = bool(statuses)
+        
+        results = {}
+        for task_id, flow_id in specs:
+            task_data = statuses.get(task_id)
+            if task_data is None:
+                status_response = fetch_task_status(task_id, flow_id)
+                task_data = status_response.get("data", {}) if status_response else None
+            task_details = None
+            if task_data is not None and task_needs_details(task_data):
+                task_details = fetch_task_details(task_id)
+            results[task_id] = (task_data, task_details)
+        return results, batch_matched
+
+    def _update_batch_support(self, batch_matched):
+        """界面线程：根据批量查询的结果判断服务器是否支持按id批量查询"""
+        if batch_matched:
+            self._batch_supported = True
+            self._batch_misses = 0
+        elif batch_matched is False and self._batch_supported is None:
+            # 列表接口正常返回却连续几次都没有匹配的任务（刚提交的任务可能还没出现在列表中）
+            self._batch_misses += 1
+            if self._batch_misses >= TASK_BATCH_PROBE_MISSES:
+                print("ℹ️ 作品列表不包含进行中的任务，改为逐个查询")
+                self._batch_supported = False
+
+    def _on_poll_results(self, outcome):
+        """界面线程：把查询结果分发给各个任务"""
+        results, batch_matched = outcome
+        self._update_batch_support(batch_matched)
+        for task_id, (task_data, task_details) in results.items():
+            task = self._tasks.get(task_id)
+            if task is None:
+                print(f"ℹ️ 忽略已停止监控任务的查询结果: {task_id}")
+                continue
+            task.in_flight = False
+            self._handle_result(task, task_data, task_details)
+        self._schedule()
+
+    def _handle_result(self, task, task_data, task_details):
+        update = interpret_task_status(task, task_data, task_details)
+        if task_data is None:
+            print(f"❌ 第{task.attempts}次查询任务状态失败: {task.task_id} (连续失败: {task.consecutive_failures})")
+            task.progressChanged.emit(task.task_id, 0, f"查询失败 ({task.consecutive_failures}/{TASK_MONITOR_MAX_FAILURES})")
+            if update.outcome == "lost":
+                print(f"⚠️ 连续失败{task.consecutive_failures}次，停止监控")
+                self._fail(task, "任务监控失败，请手动检查任务状态")
+                return
+            task.next_poll = time.monotonic() + task.policy.failure_interval(task)
+            return
+        
+        work_status, progress, status_text = update.work_status, update.progress, update.status_text
+        print(f"📈 任务{task.task_id}进度: {progress}% (状态: {status_text})")
+        if work_status != task.journal_status and work_status not in JOB_FINAL_STATES:
+            task.journal_status = work_status
+            get_job_journal().update(task.task_id, "running", work_status)
+        print(f"📊 详细信息: 等待人数{task_data.get('workCurrent', 0)}, API总进度{task_data.get('workNumber', 100)}%, 状态码{work_status}")
+        task.progressChanged.emit(task.task_id, progress, status_text)
+        
+        if update.outcome == "finished":
+            if work_status == 20:
+                print(f"🎉 任务完成！进度: {progress}%")
+            else:
+                print(f"🎉 发现任务已完成！获取到图片URL: {task_details['data'].get('workUrl')}")
+            self._finish(task, task_data, task_details)
+            return
+        if update.outcome == "failed":
+            print(f"❌ 任务失败，状态: {status_text}")
+            self._fail(task, f"任务失败，状态: {status_text}", work_status)
+            return
+        if update.outcome == "expired":
+            print(f"⏰ 监控超时，已监控{int(time.monotonic() - task.started)}秒，查询{task.attempts}次")
+            self._fail(task, "任务监控超时，请手动检查任务状态")
+            return
+        if work_status == 10 and progress >= 80:
+            print(f"⚠️ 进度{progress}%但未获取到图片URL，继续监控...")
+        
+        interval = task.policy.next_interval(task, task_data, progress)
+        if self._push is not None and self._push.is_subscribed(task.task_id) and progress < 80:
+            # 推送通道已连接并订阅了该任务，轮询只作为兜底
+            interval = max(interval, TASK_PUSH_SAFETY_INTERVAL)
+        task.next_poll = time.monotonic() + interval
+        print(f"⏰ 任务{task.task_id}下次查询间隔: {interval:.1f}秒 (退避级别: {task.backoff_level})")
+
+    def _queue_push_event(self, task_data):
+        """推送线程：把收到的任务数据转到界面线程处理"""
+        get_network_executor().run_in_gui_thread(self._on_push_event, task_data)
+
+    def _on_push_event(self, task_data):
+        """界面线程：处理推送的任务进度，需要时先在后台获取任务详情"""
+        task = self._tasks.get(str(task_data.get("id", task_data.get("workId"))))
+        if task is None:
+            return
+        if task_needs_details(task_data):
+            task_id = task.task_id
+            get_network_executor().submit(
+                fetch_task_details, task_id,
+                on_success=lambda details: self._on_push_result(task_id, task_data, details),
+                on_error=lambda error: self._on_push_result(task_id, task_data, None)
+            )
+        else:
+            self._on_push_result(task.task_id, task_data, None)
+
+    def _on_push_result(self, task_id, task_data, task_details):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        print(f"📡 收到任务{task_id}推送: 状态{task_data.get('workStatus')}, 进度{task_data.get('workNumber')}")
+        if task_data.get("workStatus") == 20 and not task_details:
+            # 任务已完成但详情获取失败，交给轮询立即重试
+            task.next_poll = time.monotonic()
+        else:
+            self._handle_result(task, task_data, task_details)
+        self._schedule()
+
+    def _finish(self, task, task_data, task_details):
+        result_urls = parse_result_urls((task_details or {}).get("data"))
+        get_job_journal().update(task.task_id, "finished", 20, result_urls=result_urls)
+        self._tasks.pop(task.task_id, None)
+        self._tasks_changed()
+        task.finished.emit(task.task_id, task_data, task_details)
+        task.deleteLater()
+
+    def _fail(self, task, message, work_status=None):
+        """work_status为None表示只是监控停止（查询失败或超时），任务日志中保持未结束状态"""
+        if work_status is not None:
+            get_job_journal().update(task.task_id, JOB_FINAL_STATES[work_status], work_status, message=message)
+        self._tasks.pop(task.task_id, None)
+        self._tasks_changed()
+        task.failed.emit(task.task_id, message)
+        task.deleteLater()
+
+
+_task_manager = None
+
+def get_task_manager():
+    """获取全局任务管理器（必须在界面线程中首次调用）"""
+    global _task_manager
+    if _task_manager is None:
+        _task_manager = TaskManager()
+    return _task_manager
+
+# =========================
+# 无界面工作流流水线（上传 → 立即生成 → 监控，不依赖任何控件，面板和批处理脚本共用）
+# =========================
+def remote_file_available(url, timeout=UPLOAD_CACHE_CHECK_TIMEOUT):
+    """
+    用HEAD请求确认服务器上的文件仍然存在
+    
+    只有服务器明确回答不存在（404/410）或拒绝访问（403）时返回False；请求失败等无法判断的情况返回True，
+    这样缓存只在确认失效时作废
+    """
+    try:
+        response = get_http_client().head(url, timeout=timeout, allow_redirects=True)
+        response.close()
+    except Exception as e:
+        print(f"⚠️ 无法确认缓存的图片URL是否有效: {str(e)}")
+        return True
+    return response.status_code not in (403, 404, 410)
+
+def upload_image(image_source, use_cache=True, cache_hits=None, progress_callback=None,
+                 filename="viewport_capture.png"):
+    """上传图像到服务器（相同内容命中上传缓存时直接返回已有URL，并记录到cache_hits）
+    
+    image_source可以是文件路径，也可以是已在内存中编码好的图片数据（此时使用filename作为文件名）；
+    progress_callback(sent, total)在发送请求体的线程中调用
+    """
+    try:
+        if isinstance(image_source, bytes):
+            print(f"📤 开始上传内存中的图像: {len(image_source)} 字节")
+            content = image_source
+        else:
+            image_path = image_source
+            print(f"📤 开始上传图像: {image_path}")
+            
+            if not os.path.exists(image_path):
+                print(f"❌ 图像文件不存在: {image_path}")
+                return None
+                
+            print(f"✅ 图像文件存在，开始上传...")
+                
+            with open(image_path, 'rb') as f:
+                content = f.read()
+            filename = os.path.basename(image_path)
+        
+        cache_key = UploadCache.make_key(get_http_client().base_url, content)
+        if use_cache:
+            cached_url = get_upload_cache().get(cache_key)
+            if cached_url and not remote_file_available(cached_url):
+                # 服务器已清理了这张图片，作废缓存后重新上传
+                print(f"♻️ 缓存的图片URL已失效，重新上传: {cached_url}")
+                get_upload_cache().invalidate_urls([cached_url])
+                cached_url = None
+            if cached_url:
+                print(f"♻️ 命中上传缓存，跳过上传: {cached_url}")
+                if cache_hits is not None:
+                    cache_hits.append(cached_url)
+                return cached_url
+        
+        # 自行编码multipart请求体，分块发送以便统计上传进度
+        body, content_type = encode_multipart_formdata(
+            {'file': (filename, content)})
+        headers = get_credential_store().auth_headers(content_type=content_type)
+        if "Authorization" in headers:
+            print("🔐 使用Bearer token认证")
+        
+        upload_url = get_http_client().build_url(API_ENDPOINTS['upload'])
+        print(f"🌐 上传URL: {upload_url}")
+        print(f"📋 请求头: {headers}")
+        
+        response = get_http_client().post(
+            upload_url, 
+            data=_ProgressBody(body, progress_callback),
+            headers=headers,
+            timeout=30
+        )
+        
+        print(f"📥 上传响应状态码: {response.status_code}")
+        
+        if response.status_code == 200:
+            result = response.json()
+            print(f"📋 上传响应内容: {result}")
+            if result.get("code") == 0:
+                # 从正确的路径获取URL
+                image_url = result.get("data", {}).get("fileInfo", {}).get("fileUrl")
+                print(f"✅ 图像上传成功，URL: {image_url}")
+                if image_url:
+                    get_upload_cache().put(cache_key, image_url)
+                return image_url
+            else:
+                print(f"❌ 图像上传失败: {result.get('msg', '未知错误')}")
+        else:
+            print(f"❌ 图像上传HTTP错误: {response.status_code}")
+            print(f"📋 错误响应: {response.text}")
+            
+    except Exception as e:
+        print(f"❌ 图像上传异常: {str(e)}")
+    return None
+
+def upload_workflow_images(original_image, reference_image_path, params, progress_callback=None, use_cache=True,
+                           cancel_token=None):
+    """
+    并发上传主视角图和参考图，把返回的URL写入请求参数，返回命中上传缓存的URL列表
+    
+    progress_callback(进度, 状态文本)在上传线程中调用，进度映射到20~40；
+    cancel_token取消后在下一个数据块处中止上传，并抛出TaskCancelled
+    """
+    cache_hits = []
+    
+    # (请求参数名, QImage/文件路径/编码后的图片数据, 名称, 是否必须)
+    slots = [("workOriginAvatar", original_image, "主视角图像", True)]
+    if reference_image_path and os.path.exists(reference_image_path):
+        slots.append(("workReferenceAvatar", reference_image_path, "参考图像", False))
+    else:
+        print("⚠️ 没有找到参考图像或文件不存在")
+        if not reference_image_path:
+            print("❌ 参考图像路径为空")
+        elif not os.path.exists(reference_image_path):
+            print(f"❌ 参考图像文件不存在: {reference_image_path}")
+    
+    if progress_callback:
+        progress_callback(20, "上传图像...")
+    tracker = UploadProgressTracker(progress_callback, 20, 40, "上传图像...")
+    for key, source, label, required in slots:
+        if isinstance(source, QtGui.QImage):
+            tracker.add(key, source.sizeInBytes())
+        elif isinstance(source, bytes):
+            tracker.add(key, len(source))
+        else:
+            tracker.add(key, os.path.getsize(source) if os.path.exists(source) else 1)
+    
+    def upload_slot(slot):
+        key, source, label, required = slot
+        if cancel_token and cancel_token.cancelled:
+            return None
+        print(f"📤 上传{label}...")
+        # 按workType缩放并重新编码（图像增强、放大出图保持原图）
+        try:
+            data, filename = prepare_upload_image(source, params.get("workType"))
+        except Exception as e:
+            print(f"❌ {label}预处理失败: {str(e)}")
+            tracker.finish(key)
+            return None
+        def on_sent(sent, total):
+            if cancel_token:
+                cancel_token.check()
+            tracker.update(key, sent, total)
+        url = upload_image(data, use_cache=use_cache, cache_hits=cache_hits, filename=filename,
+                           progress_callback=on_sent)
+        tracker.finish(key)
+        return url
+    
+    # 并发上传，全部完成后再发送立即生成请求
+    with ThreadPoolExecutor(max_workers=min(len(slots), UPLOAD_MAX_CONCURRENCY)) as pool:
+        urls = list(pool.map(upload_slot, slots))
+    if cancel_token:
+        cancel_token.check()
+    
+    for (key, source, label, required), url in zip(slots, urls):
+        if url:
+            print(f"✅ {label}上传成功: {url}")
+            params[key] = url
+        elif required:
+            print(f"❌ {label}上传失败")
+            raise Exception(f"{label}上传失败")
+        else:
+            print(f"⚠️ {label}上传失败，继续处理")
+    return cache_hits
+
+def submit_workflow(params, progress_callback=None):
+    """
+    发送立即生成请求，返回解析后的响应
+    
+    code不为0（包括WORKFLOW_REJECTED_HTTP_STATUSES中的HTTP状态码）表示服务器明确拒绝、没有创建任务，可以重试；
+    返回None表示结果不明确（超时、网络错误、其它HTTP错误），服务器可能已经创建了任务，调用方不能自动重新提交
+    """
+    print(f"🚀 发送立即生成请求:")
+    print(f"📋 请求参数: {json.dumps(params, ensure_ascii=False, indent=2)}")
+    if progress_callback:
+        progress_callback(40, "发送API请求...")
+    return api_request(API_ENDPOINTS["workflow"], params, rejected_statuses=WORKFLOW_REJECTED_HTTP_STATUSES)
+
+def upload_and_submit_workflow(original_image, reference_image_path, params, progress_callback=None,
+                               cancel_token=None):
+    """
+    上传主视角图和参考图，然后发送一次立即生成请求（不访问任何控件，可在任意线程调用）
+    
+    返回值同submit_workflow；缓存的图片URL在使用前已确认有效，这里不会重新提交
+    """
+    upload_workflow_images(original_image, reference_image_path, params, progress_callback,
+                           cancel_token=cancel_token)
+    if cancel_token:
+        cancel_token.check()
+    return submit_workflow(params, progress_callback)
+
+
+class _PolledTask(object):
+    """wait_for_task使用的查询状态（与TrackedTask中interpret_task_status用到的字段相同）"""
+
+    def __init__(self, task_id, policy=None):
+        self.task_id = task_id
+        self.policy = policy or PollingPolicy()
+        self.started = time.monotonic()
+        self.attempts = 0
+        self.consecutive_failures = 0
+        self.last_state = None
+        self.backoff_level = 0
+
+
+def wait_for_task(task_id, flow_id=None, policy=None, progress_callback=None, cancel_token=None):
+    """
+    阻塞查询任务状态直到任务结束，返回(状态码, 任务详情)
+    
+    查询间隔与TaskManager相同，由PollingPolicy决定；状态码为None表示连续查询失败或超过监控截止时间。
+    progress_callback(进度, 状态文本)在调用线程中执行；cancel_token取消后抛出TaskCancelled（不会取消服务器上的任务）
+    """
+    task = _PolledTask(str(task_id), policy)
+    while True:
+        if cancel_token:
+            cancel_token.check()
+        task.attempts += 1
+        status_response = fetch_task_status(task_id, flow_id)
+        task_data = status_response.get("data", {}) if status_response else None
+        task_details = None
+        if task_data is not None and task_needs_details(task_data):
+            task_details = fetch_task_details(task_id)
+        update = interpret_task_status(task, task_data, task_details)
+        if update.outcome == "retry":
+            interval = task.policy.failure_interval(task)
+        elif update.outcome == "lost":
+            print(f"⚠️ 连续失败{task.consecutive_failures}次，停止监控: {task_id}")
+            return None, None
+        else:
+            if progress_callback:
+                progress_callback(update.progress, update.status_text)
+            if update.outcome == "finished":
+                return 20, task_details
+            if update.outcome == "failed":
+                return update.work_status, task_details
+            if update.outcome == "expired":
+                print(f"⏰ 监控超时: {task_id}")
+                return None, None
+            interval = task.policy.next_interval(task, task_data, update.progress)
+        if cancel_token:
+            if cancel_token.wait(interval):
+                cancel_token.check()
+        else:
+            time.sleep(interval)
+
+
+# =========================
+# 批量生成队列
+# =========================
+BATCH_JOB_STATE_TEXT = {
+    "queued": "排队中",
+    "submitting": "提交中",
+    "running": "运行中",
+    "finished": "已完成",
+    "failed": "失败",
+    "cancelled": "已取消"
+}
+BATCH_JOB_DONE_STATES = ("finished", "failed", "cancelled")
+
+def list_scene_views():
+    """
+    列出可用于批量截图的视图，返回[(显示名称, 视口序号, 摄影机名称)]
+    
+    包括当前布局中的每个视口和场景中的每个摄影机（摄影机在右下角视口中临时切换后截图）
+    """
+    views = []
+    try:
+        import pymxs
+        rt = pymxs.runtime
+        for index in range(1, int(rt.viewport.numViews) + 1):
+            views.append((f"视口{index}", index, None))
+        names = rt.execute('''
+(
+    local names = ""
+    for c in cameras where superClassOf c == camera do names += c.name + "\\n"
+    names
+)
+''')
+        for name in str(names or "").splitlines():
+            if name:
+                views.append((f"🎥 {name}", 4, name))
+    except Exception as e:
+        print(f"⚠️ 获取场景视图列表失败: {str(e)}")
+    return views
+
+
+def parse_sweep_values(text):
+    """
+    解析参数扫描输入，返回浮点数列表；空输入返回[]
+    
+    支持逗号/空格分隔的数值（0.3, 0.5, 0.7）和"起始:结束:步长"的范围（0.3:0.7:0.2）
+    """
+    values = []
+    for part in text.replace("，", ",").replace(",", " ").split():
+        if ":" in part:
+            start, stop, step = (float(v) for v in part.split(":"))
+            if step <= 0:
+                raise ValueError(f"步长必须大于0: {part}")
+            count = int(math.floor((stop - start) / step + 1e-9)) + 1
+            values.extend(round(start + i * step, 4) for i in range(max(count, 0)))
+        else:
+            values.append(float(part))
+    return list(OrderedDict.fromkeys(values))
+
+def build_prompt_matrix(workflow, prompt_lines, strengths=None, weights=None):
+    """
+    生成提示词矩阵的参数组合：每行提示词 × 控制强度 × 参考图权重，返回[(说明, 请求参数)]
+    
+    多提示词选项的一行中用"|"分隔各个提示词；扫描值为空时使用选项的默认值
+    """
+    matrix = []
+    for line in prompt_lines:
+        prompts = [prompt.strip() for prompt in line.split("|")]
+        for strength in strengths or [None]:
+            for weight in weights or [None]:
+                advanced = {}
+                label = " | ".join(prompts)
+                if strength is not None:
+                    advanced["控制强度"] = strength
+                    label += f"  强度{strength:g}"
+                if weight is not None:
+                    advanced["参考图权重"] = weight
+                    label += f"  权重{weight:g}"
+                matrix.append((label, build_workflow_params(workflow, prompts, advanced)))
+    return matrix
+
+
+class BatchJob(object):
+    """批量队列中的一个生成任务（一个视图 × 一个工作流选项）"""
+
+    def __init__(self, label, option, source, params, reference=None, job_info=None):
+        self.label = label            # 视图名称或参数组合说明
+        self.option = option
+        self.source = source          # 主视角截图（QImage/文件路径/编码后的图片数据）
+        self.reference = reference    # 参考图像路径
+        self.params = params
+        self.job_info = dict(job_info or {}, batch=True)  # 任务日志中标记为批量任务，重新打开面板时不绑定到Tab
+        self.state = "queued"
+        self.message = ""
+        self.task_id = None
+        self.progress = 0
+        self.retries = 0
+        self.submitted_at = None
+        self.finished_at = None
+        self.result_urls = []
+
+    @property
+    def done(self):
+        return self.state in BATCH_JOB_DONE_STATES
+
+
+class BatchQueue(QtCore.QObject):
+    """
+    批量生成队列：先按有限并发上传所有不同的图片，再按服务器的并发上限逐个提交任务
+    
+    相同的截图按同一预处理配置只上传一次；提交成功的任务写入任务日志并交给全局任务管理器监控，
+    每完成一个任务就提交下一个排队的任务。所有回调都在界面线程中执行
+    """
+    jobChanged = Signal(int)                 # 任务序号
+    progressChanged = Signal(int, str)       # 总进度, 状态文本
+    finished = Signal()
+
+    def __init__(self, jobs, max_active=BATCH_MAX_ACTIVE_JOBS, parent=None):
+        super(BatchQueue, self).__init__(parent)
+        self.jobs = list(jobs)
+        self.max_active = max_active
+        self.cancel_token = CancelToken()
+        self._upload_progress = 0
+        self._uploading = False
+        self._retry_pending = False
+        self._started = None
+        self._finished = False
+
+    def start(self):
+        """后台并发上传图片，完成后开始提交"""
+        self._started = time.monotonic()
+        self._uploading = True
+        self._emit_progress()
+        uploads = OrderedDict()
+        for job in self.jobs:
+            for slot, source in (("workOriginAvatar", job.source), ("workReferenceAvatar", job.reference)):
+                if source is not None:
+                    uploads.setdefault(self._upload_key(source, job.params.get("workType")),
+                                       (source, job.params.get("workType")))
+        print(f"📦 批量生成: {len(self.jobs)}个任务，需要上传{len(uploads)}张图片")
+        get_network_executor().submit(
+            self._upload_all, uploads,
+            on_success=self._on_uploaded,
+            on_error=self._on_upload_failed
+        )
+
+    @staticmethod
+    def _upload_key(source, work_type):
+        """同一图片按同一预处理配置只上传一次"""
+        profile = json.dumps(get_upload_image_profile(work_type), sort_keys=True)
+        identity = source if isinstance(source, str) else id(source)
+        return (identity, profile)
+
+    def _upload_all(self, uploads):
+        """后台线程：按UPLOAD_MAX_CONCURRENCY并发上传，返回{上传键: URL}"""
+        executor = get_network_executor()
+        tracker = UploadProgressTracker(
+            lambda value, text: executor.run_in_gui_thread(self._set_upload_progress, value), 0, 100)
+        for key, (source, work_type) in uploads.items():
+            if isinstance(source, QtGui.QImage):
+                tracker.add(key, source.sizeInBytes())
+            elif isinstance(source, bytes):
+                tracker.add(key, len(source))
+            else:
+                tracker.add(key, os.path.getsize(source) if os.path.exists(source) else 1)
+
+        def upload_one(item):
+            key, (source, work_type) = item
+            if self.cancel_token.cancelled:
+                return key, None
+            try:
+                data, filename = prepare_upload_image(source, work_type)
+            except Exception as e:
+                print(f"❌ 图片预处理失败: {str(e)}")
+                tracker.finish(key)
+                return key, None
+            def on_sent(sent, total):
+                self.cancel_token.check()
+                tracker.update(key, sent, total)
+            url = upload_image(data, filename=filename, progress_callback=on_sent)
+            tracker.finish(key)
+            return key, url
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(uploads), UPLOAD_MAX_CONCURRENCY))) as pool:
+            urls = dict(pool.map(upload_one, uploads.items()))
+        self.cancel_token.check()
+        return urls
+
+    def _set_upload_progress(self, value):
+        self._upload_progress = value
+        self._emit_progress()
+
+    def _on_uploaded(self, urls):
+        self._uploading = False
+        for index, job in enumerate(self.jobs):
+            if job.done:
+                continue
+            origin = urls.get(self._upload_key(job.source, job.params.get("workType")))
+            if not origin:
+                self._set_state(index, "failed", "主视角图像上传失败")
+                continue
+            job.params["workOriginAvatar"] = origin
+            if job.reference is not None:
+                reference = urls.get(self._upload_key(job.reference, job.params.get("workType")))
+                if reference:
+                    job.params["workReferenceAvatar"] = reference
+                else:
+                    print(f"⚠️ {job.label}的参考图像上传失败，继续处理")
+        self._pump()
+
+    def _on_upload_failed(self, error):
+        self._uploading = False
+        cancelled = self.cancel_token.cancelled
+        for index, job in enumerate(self.jobs):
+            if not job.done:
+                self._set_state(index, "cancelled" if cancelled else "failed",
+                                "" if cancelled else f"上传失败: {error}")
+        self._check_finished()
+
+    def active_count(self):
+        return sum(1 for job in self.jobs if job.state in ("submitting", "running"))
+
+    def _pump(self):
+        """在并发上限内提交排队中的任务"""
+        if self.cancel_token.cancelled or self._retry_pending:
+            self._check_finished()
+            return
+        for index, job in enumerate(self.jobs):
+            if self.active_count() >= self.max_active:
+                break
+            if job.state == "queued":
+                self._set_state(index, "submitting")
+                get_network_executor().submit(
+                    submit_workflow, job.params,
+                    on_success=lambda response, index=index: self._on_submitted(index, response),
+                    on_error=lambda error, index=index: self._on_submitted(index, None)
+                )
+        self._check_finished()
+
+    def _on_submitted(self, index, response):
+        job = self.jobs[index]
+        data = (response.get("data") or {}) if response and response.get("code") == 0 else {}
+        work_id = data.get("workId")
+        if response is None:
+            # 没有收到明确的响应，服务器可能已经创建了任务，重新提交可能重复生成
+            print(f"❌ {job.label}提交结果不明确，不自动重试")
+            self._set_state(index, "failed", WORKFLOW_SUBMIT_UNCERTAIN_MESSAGE)
+            self._pump()
+            return
+        if not work_id:
+            message = response.get("msg") or "未知错误"
+            if self.cancel_token.cancelled:
+                self._set_state(index, "cancelled")
+            elif response.get("code") != 0 and job.retries < BATCH_SUBMIT_MAX_RETRIES:
+                # 服务器明确拒绝（多半是并发任务数已满），没有创建任务，等待后重新排队
+                job.retries += 1
+                delay = get_http_client().retry_after_remaining() or BATCH_SUBMIT_RETRY_DELAY
+                print(f"⏳ {job.label}提交失败（{message}），{delay:.0f}秒后重试")
+                self._set_state(index, "queued", f"提交失败，等待重试: {message}")
+                self._retry_pending = True
+                QtCore.QTimer.singleShot(int(delay * 1000), self._retry)
+            else:
+                self._set_state(index, "failed", f"提交失败: {message}")
+            self._pump()
+            return
+        
+        flow_id = data.get("flowId")
+        job.task_id = str(work_id)
+        job.submitted_at = time.monotonic()
+        get_job_journal().record_submitted(work_id, flow_id, **job.job_info)
+        manager = get_task_manager()
+        if self.cancel_token.cancelled:
+            # 请求发出后才取消，服务器已经创建了任务
+            task = manager.cancel(work_id, flow_id)
+            task.cancelled.connect(lambda task_id, work_status: self._on_task_cancelled(index, work_status))
+            return
+        print(f"✅ {job.label}已提交: {work_id}")
+        self._set_state(index, "running")
+        task = manager.track(work_id, flow_id)
+        task.progressChanged.connect(lambda task_id, progress, text: self._on_task_progress(index, progress))
+        task.finished.connect(lambda task_id, task_data, details: self._on_task_finished(index, details))
+        task.failed.connect(lambda task_id, message: self._on_task_failed(index, message))
+        task.cancelled.connect(lambda task_id, work_status: self._on_task_cancelled(index, work_status))
+
+    def _retry(self):
+        self._retry_pending = False
+        self._pump()
+
+    def _on_task_progress(self, index, progress):
+        self.jobs[index].progress = progress
+        self.jobChanged.emit(index)
+        self._emit_progress()
+
+    def _on_task_finished(self, index, details):
+        job = self.jobs[index]
+        job.result_urls = parse_result_urls((details or {}).get("data"))
+        job.finished_at = time.monotonic()
+        self._set_state(index, "finished")
+        self._pump()
+
+    def _on_task_failed(self, index, message):
+        self._set_state(index, "failed", message)
+        self._pump()
+
+    def _on_task_cancelled(self, index, work_status):
+        job = self.jobs[index]
+        if work_status == 20:
+            # 取消前已经完成，结果仍然可以查看
+            get_network_executor().submit(
+                fetch_task_details, job.task_id,
+                on_success=lambda details: self._on_task_finished(index, details),
+                on_error=lambda error: self._on_task_failed(index, f"获取结果失败: {error}")
+            )
+            return
+        self._set_state(index, "failed" if work_status == 30 else "cancelled",
+                        "" if work_status in (30, 40) else "服务器未确认取消")
+        self._check_finished()
+
+    def cancel(self):
+        """中止上传，取消排队中的任务，并请求服务器取消已提交的任务"""
+        self.cancel_token.cancel()
+        manager = get_task_manager()
+        for index, job in enumerate(self.jobs):
+            if job.state == "queued":
+                self._set_state(index, "cancelled")
+            elif job.state == "running":
+                # 提交时已连接了该任务的cancelled信号
+                manager.cancel(job.task_id)
+        self._check_finished()
+
+    def _set_state(self, index, state, message=""):
+        job = self.jobs[index]
+        job.state = state
+        job.message = message
+        if job.done:
+            job.progress = 100
+        self.jobChanged.emit(index)
+        self._emit_progress()
+
+    def _check_finished(self):
+        if not self._finished and not self._uploading and all(job.done for job in self.jobs):
+            self._finished = True
+            elapsed = time.monotonic() - (self._started or time.monotonic())
+            done = sum(1 for job in self.jobs if job.state == "finished")
+            print(f"📦 批量生成结束: {done}/{len(self.jobs)}个成功")
+            record_timing("batch_queue", elapsed, jobs=len(self.jobs), finished=done)
+            self.finished.emit()
+
+    def eta(self):
+        """按已完成任务的平均耗时和并发上限估算剩余时间（秒），还没有任务完成时返回None"""
+        durations = [job.finished_at - job.submitted_at for job in self.jobs
+                     if job.state == "finished" and job.submitted_at is not None]
+        if not durations:
+            return None
+        average = sum(durations) / len(durations)
+        remaining = 0.0
+        for job in self.jobs:
+            if job.state == "running":
+                remaining += max(0.0, average - (time.monotonic() - job.submitted_at))
+            elif job.state in ("queued", "submitting"):
+                remaining += average
+        return remaining / max(1, self.max_active)
+
+    def overall_progress(self):
+        """上传占总进度的10%，其余按各任务进度平均"""
+        if not self.jobs:
+            return 100
+        jobs_progress = sum(job.progress for job in self.jobs) / len(self.jobs)
+        upload_progress = 100 if not self._uploading else self._upload_progress
+        return int(upload_progress * 0.1 + jobs_progress * 0.9)
+
+    def _emit_progress(self):
+        done = sum(1 for job in self.jobs if job.done)
+        if self._uploading:
+            text = f"上传图像... {self._upload_progress}%"
+        else:
+            text = f"已完成 {done}/{len(self.jobs)}，进行中 {self.active_count()}"
+            eta = self.eta()
+            if eta is not None and done < len(self.jobs):
+                minutes, seconds = divmod(int(eta + 0.5), 60)
+                text += f"，预计剩余 {minutes}分{seconds:02d}秒" if minutes else f"，预计剩余 {seconds}秒"
+        self.progressChanged.emit(self.overall_progress(), text)
+
+
+# =========================
+# 上传前图片预处理（缩放 + 重新编码）
+# =========================
+_IMAGE_FORMAT_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+
+def get_upload_image_profile(work_type):
+    """获取workType对应的预处理配置，返回None表示上传原图"""
+    return UPLOAD_IMAGE_PROFILES.get(work_type, UPLOAD_IMAGE_DEFAULT_PROFILE)
+
+def _writable_image_format(image_format):
+    """WebP需要Qt的imageformats插件，不可用时退回JPEG"""
+    supported = [bytes(f).decode().upper() for f in QtGui.QImageWriter.supportedImageFormats()]
+    if image_format.upper() in supported:
+        return image_format.upper()
+    return "JPEG"
+
+def prepare_upload_image(source, work_type, filename="viewport_capture.png"):
+    """
+    按workType的配置缩放并重新编码待上传图片，可在后台线程调用
+    
+    source可以是QImage、编码后的图片数据或文件路径，返回(图片数据, 文件名)
+    """
+    profile = get_upload_image_profile(work_type)
+    if isinstance(source, str):
+        filename = os.path.basename(source)
+    
+    if profile is None:
+        # 保持原分辨率：文件和已编码数据原样上传，QImage无损编码为PNG
+        if isinstance(source, QtGui.QImage):
+            return encode_qimage(source, "PNG"), os.path.splitext(filename)[0] + ".png"
+        if isinstance(source, bytes):
+            return source, filename
+        with open(source, 'rb') as f:
+            return f.read(), filename
+    
+    max_side = profile.get("max_side")
+    image_format = _writable_image_format(profile.get("format", "JPEG"))
+    quality = profile.get("quality", 90)
+    
+    if isinstance(source, QtGui.QImage):
+        image = source
+        if max_side and max(image.width(), image.height()) > max_side:
+            image = image.scaled(max_side, max_side, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+    else:
+        # 用QImageReader读取，超出尺寸时直接按缩放后的尺寸解码
+        if isinstance(source, bytes):
+            buffer = QtCore.QBuffer()
+            buffer.setData(QtCore.QByteArray(source))
+            buffer.open(QtCore.QIODevice.ReadOnly)
+            reader = QtGui.QImageReader(buffer)
+        else:
+            reader = QtGui.QImageReader(source)
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if max_side and size.isValid() and max(size.width(), size.height()) > max_side:
+            reader.setScaledSize(size.scaled(max_side, max_side, QtCore.Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            raise Exception(f"图片读取失败: {reader.errorString()}")
+    
+    if image_format == "JPEG" and image.hasAlphaChannel():
+        # JPEG不支持透明通道，透明区域填充为白色
+        flattened = QtGui.QImage(image.size(), QtGui.QImage.Format_RGB32)
+        flattened.fill(QtGui.QColor("white"))
+        painter = QtGui.QPainter(flattened)
+        painter.drawImage(0, 0, image)
+        painter.end()
+        image = flattened
+    
+    data = encode_qimage(image, image_format, quality)
+    if not data:
+        raise Exception(f"图片编码失败: {image_format}")
+    print(f"🗜️ 上传前预处理: workType={work_type}, {image.width()}x{image.height()} {image_format} {len(data)} 字节")
+    return data, f"{os.path.splitext(filename)[0]}.{_IMAGE_FORMAT_EXTENSIONS.get(image_format, 'jpg')}"
 
-def get_auto_login_info():
-    """获取自动登录信息"""
-    auto_login_file = "auto_login.json"
-    if os.path.exists(auto_login_file):
-        try:
-            with open(auto_login_file, 'r', encoding='utf-8') as f:
-                auto_login_data = json.load(f)
-            # 只要有用户名就返回数据，不检查auto_login字段
-            if "username" in auto_login_data:
-                return auto_login_data
-        except Exception as e:
-            print(f"读取自动登录信息失败: {str(e)}")
-    return None
+def encode_qimage(image, image_format="PNG", quality=-1):
+    """在内存中编码QImage，返回编码后的字节数据"""
+    buffer = QtCore.QBuffer()
+    buffer.open(QtCore.QIODevice.WriteOnly)
+    if not image.save(buffer, image_format, quality):
+        return None
+    return bytes(buffer.data())
 
 # =========================
 # 上传图片控件（支持拖拽和点击上传）
@@ -186,19 +3595,30 @@ class ImageUploadWidget(QtWidgets.QWidget):
     # 设置图片并显示文件名
     def setImage(self, filePath):
         if os.path.exists(filePath):
-            pixmap = QtGui.QPixmap(filePath).scaled(
-                self.iconLabel.width(), self.iconLabel.height(),
-                QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-            self.iconLabel.setPixmap(pixmap)
-            self.iconLabel.setText("")  # 清空提示
+            # 缩略图在后台按标签尺寸解码，大图不会卡住界面
+            self.iconLabel.clear()
+            self.iconLabel.setText("加载中...")
             self.fileNameLabel.setText(os.path.basename(filePath))
             self.imagePath = filePath
+            get_thumbnail_service().request(
+                filePath, self.iconLabel.width(), self.iconLabel.height(),
+                lambda image: self._onThumbnailReady(filePath, image))
         else:
             self.iconLabel.clear()
             self.iconLabel.setText("")
             self.fileNameLabel.setText("")
             self.imagePath = None
 
+    # 缩略图解码完成（界面线程）
+    def _onThumbnailReady(self, filePath, image):
+        if filePath != self.imagePath:
+            return  # 解码期间已经换了图片
+        if image is None:
+            self.iconLabel.setText("无法读取图片")
+            return
+        self.iconLabel.setPixmap(QtGui.QPixmap.fromImage(image))
+        self.iconLabel.setText("")  # 清空提示
+
 # =========================
 # 可点击的图片显示组件
 # =========================
@@ -286,15 +3706,28 @@ class ClickableImageView(QtWidgets.QWidget):
         self.setImage(pixmap, showOverlay=True)
     
     def setImagePath(self, imagePath, showOverlay=True):
-        """设置图片路径"""
+        """设置图片路径（在后台按显示尺寸解码，完成后再显示）"""
         self.currentImagePath = imagePath
         if imagePath and os.path.exists(imagePath):
-            pixmap = QtGui.QPixmap(imagePath)
-            self.setImage(pixmap, showOverlay)
+            width = self.imageLabel.width() or RESULT_PREVIEW_MAX_SIDE
+            height = self.imageLabel.height() or RESULT_PREVIEW_MAX_SIDE
+            get_thumbnail_service().request(
+                imagePath, width, height,
+                lambda image: self._onThumbnailReady(imagePath, image, showOverlay))
         else:
             self.imageLabel.setText("未获取到视图")
             self.overlayWidget.hide()
     
+    def _onThumbnailReady(self, imagePath, image, showOverlay):
+        """界面线程：后台解码完成"""
+        if imagePath != self.currentImagePath:
+            return  # 解码期间已经换了图片
+        if image is None:
+            self.imageLabel.setText("无法读取图片")
+            self.overlayWidget.hide()
+            return
+        self.setImage(QtGui.QPixmap.fromImage(image), showOverlay)
+    
     def setImage(self, pixmap, showOverlay=True):
         """设置图片"""
         if pixmap and not pixmap.isNull():
@@ -544,18 +3977,404 @@ class ClickableImageView(QtWidgets.QWidget):
         self.overlayWidget.setGeometry(0, 0, self.width(), self.height())
 
 
+# =========================
+# 分块多分辨率大图查看
+# =========================
+class TilePyramid(object):
+    """
+    按需构建的多分辨率图块金字塔
+    
+    第k层是原图缩小2^k倍的图片，按VIEWER_TILE_SIZE切成图块，图块在后台线程按需生成。
+    支持按区域解码的格式（如JPEG）直接用setScaledClipRect只解码图块所在区域；其它格式先解码整层
+    再切出当前需要的所有图块，整层图片与图块共用cache_bytes内存上限。超过一半上限的层只完整解码一次，
+    切出的全部图块写入临时目录，之后平移时从磁盘读取图块而不再重新解码整层，close()时删除临时目录。
+    最低分辨率层作为总览图常驻内存。on_tile_ready(key)在后台线程调用，key为None表示总览图已就绪
+    """
+    
+    def __init__(self, path, on_tile_ready=None, tile_size=VIEWER_TILE_SIZE,
+                 cache_bytes=VIEWER_TILE_CACHE_BYTES):
+        self.path = path
+        self.tile_size = tile_size
+        self.cache_bytes = cache_bytes
+        self.on_tile_ready = on_tile_ready
+        reader = QtGui.QImageReader(path)
+        size = reader.size()
+        self._clip_decode = reader.supportsOption(QtGui.QImageIOHandler.ImageOption.ScaledClipRect)
+        self.width = size.width() if size.isValid() else 0
+        self.height = size.height() if size.isValid() else 0
+        self.top_level = 0
+        while max(self.width, self.height) >> self.top_level > VIEWER_OVERVIEW_MAX_SIDE:
+            self.top_level += 1
+        
+        self._overview = None
+        self._levels = OrderedDict()
+        self._tiles = OrderedDict()
+        self._cache_used = 0  # 图块和已缓存分辨率层的总字节数
+        self._disk_dir = None
+        self._disk_levels = {}  # 已写入临时目录的层 -> 图块的QImage格式
+        self._wanted = []
+        self._closed = False
+        self._cond = threading.Condition()
+        if self.is_valid():
+            threading.Thread(target=self._run, name="tile-pyramid", daemon=True).start()
+    
+    def is_valid(self):
+        return self.width > 0 and self.height > 0
+    
+    def level_size(self, level):
+        factor = 1 << level
+        return QtCore.QSize(max(1, -(-self.width // factor)), max(1, -(-self.height // factor)))
+    
+    def level_for_scale(self, scale):
+        """按当前显示比例选择分辨率层：屏幕上一个像素对应不少于一个层像素"""
+        if scale <= 0 or scale >= 1:
+            return 0
+        return min(int(math.floor(math.log2(1.0 / scale))), self.top_level)
+    
+    def _level_scale(self, level):
+        size = self.level_size(level)
+        return self.width / size.width(), self.height / size.height()
+    
+    def tile_keys(self, level, scene_rect):
+        """与场景矩形相交的图块(level, col, row)列表"""
+        sx, sy = self._level_scale(level)
+        size = self.level_size(level)
+        step_x, step_y = self.tile_size * sx, self.tile_size * sy
+        col0 = max(0, int(scene_rect.left() // step_x))
+        row0 = max(0, int(scene_rect.top() // step_y))
+        col1 = min((size.width() - 1) // self.tile_size, int(scene_rect.right() // step_x))
+        row1 = min((size.height() - 1) // self.tile_size, int(scene_rect.bottom() // step_y))
+        return [(level, col, row) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)]
+    
+    def tile_scene_rect(self, key):
+        level, col, row = key
+        sx, sy = self._level_scale(level)
+        size = self.level_size(level)
+        x, y = col * self.tile_size, row * self.tile_size
+        w = min(self.tile_size, size.width() - x)
+        h = min(self.tile_size, size.height() - y)
+        return QtCore.QRectF(x * sx, y * sy, w * sx, h * sy)
+    
+    def overview(self):
+        return self._overview
+    
+    def cached_tile(self, key):
+        with self._cond:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+    
+    def request(self, keys):
+        """界面线程：设置当前需要的图块，替换之前尚未处理的请求"""
+        with self._cond:
+            self._wanted = [key for key in keys if key not in self._tiles]
+            self._cond.notify()
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._wanted = []
+            self._tiles.clear()
+            self._levels.clear()
+            self._cache_used = 0
+            self._cond.notify()
+        # 图块临时目录只由后台线程读写，它被唤醒后退出前删除
+    
+    def _decode(self, level, clip_rect=None):
+        """按第level层的尺寸解码整张图片，或只解码其中clip_rect区域"""
+        reader = QtGui.QImageReader(self.path)
+        if level > 0:
+            reader.setScaledSize(self.level_size(level))
+        if clip_rect is not None:
+            reader.setScaledClipRect(clip_rect)
+        image = reader.read()
+        if image.isNull():
+            print(f"❌ 解码图片失败: {self.path}, {reader.errorString()}")
+            return None
+        fmt = QtGui.QImage.Format_ARGB32_Premultiplied if image.hasAlphaChannel() else QtGui.QImage.Format_RGB32
+        return image.convertToFormat(fmt)
+    
+    def _tile_rect(self, key):
+        level, col, row = key
+        size = self.level_size(level)
+        rect = QtCore.QRect(col * self.tile_size, row * self.tile_size, self.tile_size, self.tile_size)
+        return rect.intersected(QtCore.QRect(0, 0, size.width(), size.height()))
+    
+    def _level_image(self, level):
+        """不能按区域解码时使用的整层图片；放得进内存上限的一半时才缓存"""
+        if level == self.top_level:
+            return self._overview
+        with self._cond:
+            image = self._levels.get(level)
+            if image is not None:
+                self._levels.move_to_end(level)
+                return image
+        image = self._decode(level)
+        if image is None or image.sizeInBytes() > self.cache_bytes // 2:
+            return image
+        with self._cond:
+            self._levels[level] = image
+            self._cache_used += image.sizeInBytes()
+            while len(self._levels) > VIEWER_LEVEL_CACHE_COUNT:
+                _, old = self._levels.popitem(last=False)
+                self._cache_used -= old.sizeInBytes()
+            self._trim()
+        return image
+    
+    def _trim(self):
+        """超出内存上限时先淘汰最久未用的分辨率层，再淘汰最久未用的图块（至少保留一个图块）"""
+        while self._cache_used > self.cache_bytes and self._levels:
+            _, old = self._levels.popitem(last=False)
+            self._cache_used -= old.sizeInBytes()
+        while self._cache_used > self.cache_bytes and len(self._tiles) > 1:
+            _, old = self._tiles.popitem(last=False)
+            self._cache_used -= old.sizeInBytes()
+    
+    def _store_tile(self, key, tile):
+        with self._cond:
+            self._tiles[key] = tile
+            self._cache_used += tile.sizeInBytes()
+            self._trim()
+    
+    def _disk_tile_path(self, key):
+        return os.path.join(self._disk_dir, "%d_%d_%d.raw" % key)
+
+    def _spill_level(self, level, image):
+        """把整层切成图块写入临时目录（未压缩的像素数据），写完后该层的图块都从磁盘读取"""
+        started = time.perf_counter()
+        try:
+            if self._disk_dir is None:
+                self._disk_dir = tempfile.mkdtemp(prefix="maxstyle-tiles-")
+                # 没有关闭查看器就退出3ds Max时也删除临时目录
+                atexit.register(shutil.rmtree, self._disk_dir, True)
+            size = self.level_size(level)
+            for row in range((size.height() - 1) // self.tile_size + 1):
+                for col in range((size.width() - 1) // self.tile_size + 1):
+                    if self._closed:
+                        return
+                    key = (level, col, row)
+                    tile = self.cached_tile(key) or image.copy(self._tile_rect(key))
+                    with open(self._disk_tile_path(key), 'wb') as f:
+                        f.write(tile.constBits())
+        except OSError as e:
+            print(f"⚠️ 写入图块临时文件失败，该层继续按需整层解码: {str(e)}")
+            return
+        self._disk_levels[level] = image.format()
+        print(f"🧩 第{level}层图块已写入临时目录，耗时{time.perf_counter() - started:.2f}秒")
+
+    def _read_disk_tile(self, key):
+        """从临时目录读取图块，文件缺失或不完整时返回None"""
+        rect = self._tile_rect(key)
+        try:
+            with open(self._disk_tile_path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != rect.width() * rect.height() * 4:
+            return None
+        # QImage不持有外部数据，必须复制一份
+        return QtGui.QImage(data, rect.width(), rect.height(), rect.width() * 4,
+                            self._disk_levels[key[0]]).copy()
+
+    def _remove_disk_tiles(self):
+        path, self._disk_dir = self._disk_dir, None
+        self._disk_levels = {}
+        if path:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _take_wanted(self, level):
+        """取出等待中的同一层图块，整层解码一次后一起切出"""
+        with self._cond:
+            keys = [key for key in self._wanted if key[0] == level and key not in self._tiles]
+            self._wanted = [key for key in self._wanted if key[0] != level]
+            return keys
+    
+    def _run(self):
+        """后台线程：先解码总览图，然后按请求顺序生成图块；退出前删除图块临时目录"""
+        try:
+            self._generate_tiles()
+        finally:
+            self._remove_disk_tiles()
+
+    def _generate_tiles(self):
+        started = time.perf_counter()
+        self._overview = self._decode(self.top_level)
+        print(f"🧩 总览图解码完成（第{self.top_level}层），耗时{time.perf_counter() - started:.2f}秒")
+        if self.on_tile_ready and self._overview is not None:
+            self.on_tile_ready(None)
+        while True:
+            with self._cond:
+                while not self._wanted and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                key = self._wanted.pop(0)
+                if key in self._tiles:
+                    continue
+            level = key[0]
+            spill = None
+            if self._clip_decode and level != self.top_level:
+                tile = self._decode(level, self._tile_rect(key))
+                if tile is None:
+                    continue
+                tiles = [(key, tile)]
+            else:
+                keys = [key] + self._take_wanted(level)
+                tiles = None
+                if level in self._disk_levels:
+                    tiles = [(k, self._read_disk_tile(k)) for k in keys]
+                    if any(tile is None for _, tile in tiles):
+                        print(f"⚠️ 第{level}层图块临时文件缺失，重新解码")
+                        del self._disk_levels[level]
+                        tiles = None
+                if tiles is None:
+                    image = self._level_image(level)
+                    if image is None:
+                        continue
+                    tiles = [(k, image.copy(self._tile_rect(k))) for k in keys]
+                    with self._cond:
+                        if level != self.top_level and level not in self._levels:
+                            # 整层太大没有缓存，切成图块写入磁盘，之后平移不再重新解码
+                            spill = image
+                    del image
+            for tile_key, tile in tiles:
+                self._store_tile(tile_key, tile)
+                if self.on_tile_ready:
+                    self.on_tile_ready(tile_key)
+            if spill is not None:
+                self._spill_level(level, spill)
+                del spill
+
+
+class TiledImageItem(QtWidgets.QGraphicsItem):
+    """只绘制可见区域图块的图片项，缺少的图块先用总览图放大代替"""
+    
+    def __init__(self, pyramid, parent=None):
+        super().__init__(parent)
+        self.pyramid = pyramid
+        self.setFlag(QtWidgets.QGraphicsItem.ItemUsesExtendedStyleOption)
+    
+    def boundingRect(self):
+        return QtCore.QRectF(0, 0, self.pyramid.width, self.pyramid.height)
+    
+    def paint(self, painter, option, widget=None):
+        bounds = self.boundingRect()
+        exposed = option.exposedRect.intersected(bounds)
+        overview = self.pyramid.overview()
+        if overview is not None:
+            fx = overview.width() / bounds.width()
+            fy = overview.height() / bounds.height()
+            source = QtCore.QRectF(exposed.x() * fx, exposed.y() * fy, exposed.width() * fx, exposed.height() * fy)
+            painter.drawImage(exposed, overview, source)
+        
+        scale = QtWidgets.QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.pyramid.level_for_scale(scale)
+        if level >= self.pyramid.top_level:
+            return
+        for key in self.pyramid.tile_keys(level, exposed):
+            tile = self.pyramid.cached_tile(key)
+            if tile is not None:
+                painter.drawImage(self.pyramid.tile_scene_rect(key), tile)
+        
+        # 按整个可见区域请求图块（exposedRect可能只是刚更新的一个图块）
+        view = widget.parent() if widget is not None else None
+        if isinstance(view, QtWidgets.QGraphicsView):
+            visible = view.mapToScene(view.viewport().rect()).boundingRect().intersected(bounds)
+            missing = [key for key in self.pyramid.tile_keys(level, visible)
+                       if self.pyramid.cached_tile(key) is None]
+            if missing:
+                self.pyramid.request(missing)
+
+
+class TiledImageView(QtWidgets.QGraphicsView):
+    """支持拖动平移和滚轮缩放的图片视图，用户操作前始终保持适应窗口"""
+    
+    clicked = QtCore.Signal()
+    doubleClicked = QtCore.Signal()
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+        self.setViewportUpdateMode(QtWidgets.QGraphicsView.SmartViewportUpdate)
+        self.setTransformationAnchor(QtWidgets.QGraphicsView.AnchorUnderMouse)
+        self.setResizeAnchor(QtWidgets.QGraphicsView.AnchorViewCenter)
+        self.setDragMode(QtWidgets.QGraphicsView.ScrollHandDrag)
+        self._fitMode = True
+        self._pressPos = None
+    
+    def fitScale(self):
+        rect = self.sceneRect()
+        viewport = self.viewport().rect()
+        if rect.isEmpty() or viewport.isEmpty():
+            return 1.0
+        return min(viewport.width() / rect.width(), viewport.height() / rect.height())
+    
+    def fitImage(self):
+        """把整张图片适应到视图中，之后窗口大小变化时继续保持适应，直到用户缩放或拖动"""
+        if self.sceneRect().isEmpty() or self.viewport().rect().isEmpty():
+            return
+        self.fitInView(self.sceneRect(), QtCore.Qt.KeepAspectRatio)
+        self._fitMode = True
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._fitMode:
+            self.fitImage()
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._fitMode:
+            self.fitImage()
+    
+    def wheelEvent(self, event):
+        """滚轮缩放，以鼠标位置为中心"""
+        steps = event.angleDelta().y() / 120.0
+        if not steps:
+            return
+        current = self.transform().m11()
+        target = current * (1.25 ** steps)
+        target = max(self.fitScale() * 0.5, min(VIEWER_MAX_ZOOM, target))
+        self.scale(target / current, target / current)
+        self._fitMode = False
+        event.accept()
+    
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            self._pressPos = event.position().toPoint()
+        super().mousePressEvent(event)
+    
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if event.button() == QtCore.Qt.LeftButton and self._pressPos is not None:
+            moved = (event.position().toPoint() - self._pressPos).manhattanLength()
+            self._pressPos = None
+            if moved < QtWidgets.QApplication.startDragDistance():
+                self.clicked.emit()
+            else:
+                self._fitMode = False
+    
+    def mouseDoubleClickEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            self.doubleClicked.emit()
+        event.accept()
+
+
 class ImageViewerDialog(QtWidgets.QDialog):
-    """图片查看对话框"""
+    """图片查看对话框（分块多分辨率显示，只解码当前缩放级别下可见的部分）"""
     
     def __init__(self, imagePath, parent=None):
         super().__init__(parent)
         self.setWindowTitle("图片查看")
         self.setModal(True)
+        self.pyramid = None
         
         # 先设置布局，再设置全屏
         self.setupUI(imagePath)
         
-        # 强制设置全屏显示（在布局设置之后）
+        # 强制设置全屏显示（在布局设置之后），图片在视图第一次显示时适应窗口
         self.setWindowState(QtCore.Qt.WindowFullScreen)
         self.showFullScreen()  # 确保全屏显示
         
@@ -563,11 +4382,6 @@ class ImageViewerDialog(QtWidgets.QDialog):
         screen = QtWidgets.QApplication.primaryScreen()
         screenGeometry = screen.geometry()
         print(f"✅ 全屏显示，屏幕尺寸: {screenGeometry.width()}x{screenGeometry.height()}")
-        
-        # 延迟执行缩放，确保全屏设置生效
-        QtCore.QTimer.singleShot(100, self.fitImageToView)
-        QtCore.QTimer.singleShot(300, self.fitImageToView)
-        QtCore.QTimer.singleShot(500, self.fitImageToView)
     
     def setupUI(self, imagePath):
         """设置UI布局"""
@@ -584,12 +4398,8 @@ class ImageViewerDialog(QtWidgets.QDialog):
         mainLayout.setContentsMargins(0, 0, 0, 0)
         mainLayout.setSpacing(0)
         
-        # 图片显示区域 - 使用QGraphicsView提供更好的缩放控制
-        self.graphicsView = QtWidgets.QGraphicsView()
-        self.graphicsView.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        self.graphicsView.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        self.graphicsView.setRenderHint(QtGui.QPainter.Antialiasing)
-        self.graphicsView.setViewportUpdateMode(QtWidgets.QGraphicsView.FullViewportUpdate)
+        # 图片显示区域 - 分块绘制，支持拖动平移和滚轮缩放
+        self.graphicsView = TiledImageView()
         self.graphicsView.setStyleSheet("""
             QGraphicsView {
                 background-color: #000;
@@ -601,19 +4411,18 @@ class ImageViewerDialog(QtWidgets.QDialog):
         self.scene = QtWidgets.QGraphicsScene()
         self.graphicsView.setScene(self.scene)
         
-        # 加载并显示图片
+        # 读取图片尺寸并创建图块金字塔（图片数据在后台按需解码）
         if os.path.exists(imagePath):
-            pixmap = QtGui.QPixmap(imagePath)
-            if not pixmap.isNull():
-                # 创建图形项
-                self.pixmapItem = self.scene.addPixmap(pixmap)
-                print(f"✅ 图片加载成功，原始尺寸: {pixmap.width()}x{pixmap.height()}")
+            executor = get_network_executor()
+            pyramid = TilePyramid(imagePath, on_tile_ready=lambda key: executor.run_in_gui_thread(self.onTileReady, key))
+            if pyramid.is_valid():
+                self.pyramid = pyramid
+                self.imageItem = TiledImageItem(pyramid)
+                self.scene.addItem(self.imageItem)
+                print(f"✅ 图片打开成功，原始尺寸: {pyramid.width}x{pyramid.height}，分辨率层数: {pyramid.top_level + 1}")
                 
                 # 设置场景矩形
-                self.graphicsView.setSceneRect(self.pixmapItem.boundingRect())
-                
-                # 连接大小改变事件
-                self.graphicsView.resizeEvent = self.onGraphicsViewResize
+                self.graphicsView.setSceneRect(self.imageItem.boundingRect())
             else:
                 print(f"❌ 图片数据无效")
         else:
@@ -643,106 +4452,953 @@ class ImageViewerDialog(QtWidgets.QDialog):
             }
         """)
         
-        # 关闭按钮
-        closeButton = QtWidgets.QPushButton("✕ 关闭")
-        closeButton.setStyleSheet("""
-            QPushButton {
-                background-color: #e74c3c;
+        # 适应窗口按钮
+        fitButton = QtWidgets.QPushButton("适应窗口")
+        fitButton.setStyleSheet("""
+            QPushButton {
+                background-color: #444;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #555;
+            }
+        """)
+        fitButton.clicked.connect(self.fitImageToView)
+        
+        # 关闭按钮
+        closeButton = QtWidgets.QPushButton("✕ 关闭")
+        closeButton.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-size: 14px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #c0392b;
+            }
+        """)
+        closeButton.clicked.connect(self.close)
+        
+        controlLayout.addWidget(titleLabel)
+        controlLayout.addStretch()
+        controlLayout.addWidget(fitButton)
+        controlLayout.addWidget(closeButton)
+        
+        # 添加到主布局
+        mainLayout.addWidget(self.controlBar)
+        mainLayout.addWidget(self.graphicsView)
+        
+        # 初始时隐藏控制栏
+        self.controlBar.hide()
+        
+        # 单击显示/隐藏控制栏，双击退出
+        self.graphicsView.clicked.connect(self.onClicked)
+        self.graphicsView.doubleClicked.connect(self.close)
+    
+    def fitImageToView(self):
+        """将图片适应到视图大小"""
+        self.graphicsView.fitImage()
+    
+    def onTileReady(self, key):
+        """界面线程：总览图或图块解码完成，只重绘对应区域"""
+        if not hasattr(self, 'imageItem'):
+            return
+        if key is None:
+            self.imageItem.update()
+        else:
+            self.imageItem.update(self.pyramid.tile_scene_rect(key))
+    
+    def onClicked(self):
+        """单击 - 显示/隐藏控制栏"""
+        if self.controlBar.isVisible():
+            self.controlBar.hide()
+        else:
+            self.controlBar.show()
+    
+    def done(self, result):
+        """关闭时停止后台解码并释放图块"""
+        if self.pyramid:
+            self.pyramid.close()
+        super().done(result)
+
+
+# =========================
+# 生成结果图库（多张结果图片的缩略图列表）
+# =========================
+class ResultGalleryWidget(QtWidgets.QWidget):
+    """结果缩略图列表，点击缩略图选择要查看的结果图片"""
+    
+    imageSelected = QtCore.Signal(int)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet("""
+            QToolButton {
+                background-color: #222;
+                color: #aaa;
+                border: 1px solid #444;
+                border-radius: 4px;
+            }
+            QToolButton:hover {
+                border: 1px solid #3da9fc;
+            }
+            QToolButton:checked {
+                border: 2px solid #3da9fc;
+            }
+        """)
+        
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(4)
+        
+        self.titleLabel = QtWidgets.QLabel()
+        self.titleLabel.setStyleSheet("color: #ccc; font-size: 12px;")
+        layout.addWidget(self.titleLabel)
+        
+        # 缩略图横向排列，超出宽度时可滚动
+        self.scrollArea = QtWidgets.QScrollArea()
+        self.scrollArea.setWidgetResizable(True)
+        self.scrollArea.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.scrollArea.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.scrollArea.setFixedHeight(RESULT_THUMBNAIL_SIZE + 24)
+        container = QtWidgets.QWidget()
+        self.thumbLayout = QtWidgets.QHBoxLayout(container)
+        self.thumbLayout.setContentsMargins(0, 0, 0, 0)
+        self.thumbLayout.setSpacing(6)
+        self.thumbLayout.addStretch()
+        self.scrollArea.setWidget(container)
+        layout.addWidget(self.scrollArea)
+        
+        self.buttonGroup = QtWidgets.QButtonGroup(self)
+        self.buttonGroup.setExclusive(True)
+        self.buttonGroup.idClicked.connect(self.imageSelected.emit)
+        self.buttons = []
+    
+    def setCount(self, count):
+        """清空并创建count个占位缩略图"""
+        for button in self.buttons:
+            self.buttonGroup.removeButton(button)
+            button.deleteLater()
+        self.buttons = []
+        for index in range(count):
+            button = QtWidgets.QToolButton()
+            button.setCheckable(True)
+            button.setEnabled(False)
+            button.setFixedSize(RESULT_THUMBNAIL_SIZE + 8, RESULT_THUMBNAIL_SIZE + 8)
+            button.setIconSize(QtCore.QSize(RESULT_THUMBNAIL_SIZE, RESULT_THUMBNAIL_SIZE))
+            button.setText("⏳")
+            button.setToolTip(f"结果图片{index + 1}")
+            self.buttonGroup.addButton(button, index)
+            self.thumbLayout.insertWidget(index, button)
+            self.buttons.append(button)
+        self.titleLabel.setText(f"生成结果（{count}张）")
+    
+    def setThumbnail(self, index, image):
+        """显示下载完成的缩略图"""
+        if 0 <= index < len(self.buttons):
+            button = self.buttons[index]
+            button.setIcon(QtGui.QIcon(QtGui.QPixmap.fromImage(image)))
+            button.setText("")
+            button.setEnabled(True)
+    
+    def setFailed(self, index):
+        if 0 <= index < len(self.buttons):
+            self.buttons[index].setText("❌")
+            self.buttons[index].setToolTip(f"结果图片{index + 1}下载失败")
+    
+    def setCurrentIndex(self, index):
+        if 0 <= index < len(self.buttons):
+            self.buttons[index].setChecked(True)
+
+
+# =========================
+# 历史记录浏览（QListView + 分页模型，缩略图按需加载）
+# =========================
+HISTORY_THUMBNAIL_DIR_NAME = "history_thumbnails"
+
+class HistoryThumbnailCache(object):
+    """
+    历史列表缩略图的磁盘缓存，按URL保存已缩小的JPEG
+    
+    浏览历史记录不写入结果图片缓存：没有缓存过的结果图片只在内存中下载并按缩略图尺寸解码，
+    原图随即丢弃；结果图片缓存中已有的原图直接读取。按文件修改时间淘汰最久未使用的缩略图
+    """
+
+    def __init__(self, directory, size=HISTORY_THUMBNAIL_SIZE, max_bytes=HISTORY_THUMBNAIL_DISK_BYTES):
+        self.directory = directory
+        self.size = size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None
+
+    def path_for(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".jpg")
+
+    def get(self, url):
+        """命中时返回QImage并刷新使用时间，否则返回None"""
+        path = self.path_for(url)
+        if not os.path.exists(path):
+            return None
+        image = QtGui.QImage(path)
+        if image.isNull():
+            print(f"⚠️ 历史缩略图文件损坏，重新生成: {url}")
+            self._discard(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+
+    def fetch(self, url, timeout=30):
+        """后台线程：返回缩略图QImage，未缓存时下载原图并按缩略图尺寸解码后保存；失败时返回None"""
+        image = self.get(url)
+        if image is not None:
+            return image
+        cached = get_result_cache().get(url)
+        if cached:
+            image = decode_scaled_image(cached, self.size)
+        else:
+            response = get_http_client().get(url, timeout=timeout)
+            try:
+                if response.status_code != 200:
+                    print(f"❌ 下载历史缩略图失败，状态码: {response.status_code}")
+                    return None
+                data = QtCore.QByteArray(response.content)
+            finally:
+                response.close()
+            image = self._decode(data)
+        if image is None:
+            return None
+        self._put(url, image)
+        return image
+
+    def _decode(self, data):
+        buffer = QtCore.QBuffer(data)
+        buffer.open(QtCore.QIODevice.ReadOnly)
+        reader = QtGui.QImageReader(buffer)
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if size.isValid() and (size.width() > self.size or size.height() > self.size):
+            reader.setScaledSize(size.scaled(self.size, self.size, QtCore.Qt.KeepAspectRatio))
+        image = reader.read()
+        return None if image.isNull() else image
+
+    def _put(self, url, image):
+        """写入临时文件后替换，再按总大小淘汰"""
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            path = self.path_for(url)
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            os.close(fd)
+            try:
+                if not image.save(temp_path, "JPG", HISTORY_THUMBNAIL_QUALITY):
+                    raise OSError("保存失败")
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"⚠️ 保存历史缩略图失败: {str(e)}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return
+            self._add_size(os.path.getsize(path) - previous)
+
+    def _discard(self, path):
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            if self._total is not None:
+                self._total -= size
+
+    def _add_size(self, delta):
+        """持有锁调用：第一次写入时统计目录总大小，之后只累加"""
+        if self._total is None:
+            self._total = sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                              if entry.name.endswith(".jpg"))
+        else:
+            self._total += delta
+        if self._total <= self.max_bytes:
+            return
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith(".jpg")),
+                         key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._total <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._total -= size
+
+
+_history_thumbnail_cache = None
+_history_thumbnail_cache_lock = threading.Lock()
+
+def get_history_thumbnail_cache():
+    """获取全局历史缩略图缓存"""
+    global _history_thumbnail_cache
+    if _history_thumbnail_cache is None:
+        with _history_thumbnail_cache_lock:
+            if _history_thumbnail_cache is None:
+                _history_thumbnail_cache = HistoryThumbnailCache(
+                    os.path.join(get_plugin_data_dir(), HISTORY_THUMBNAIL_DIR_NAME))
+    return _history_thumbnail_cache
+
+def load_history_thumbnail(url):
+    """后台线程：从历史缩略图缓存读取（或下载并缩小）结果图片的缩略图，不写入结果图片缓存"""
+    return get_history_thumbnail_cache().fetch(url)
+
+
+class HistoryListModel(QtCore.QAbstractListModel):
+    """
+    历史记录列表模型，滚动到底部时按游标从本地库读取下一页
+    
+    只有视图实际绘制的行才会请求缩略图；最近请求的缩略图优先加载，
+    快速滚动时已经滚出视图的请求在队列过长时被丢弃
+    """
+    RecordRole = QtCore.Qt.UserRole + 1
+    
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.filters = {}
+        self.records = []
+        self.exhausted = False
+        self._rowOf = {}
+        self._thumbnails = OrderedDict()   # 作品ID -> QPixmap（加载失败为None）
+        self._queue = OrderedDict()        # 等待加载缩略图的作品ID -> 图片URL
+        self._loading = set()
+        self._loadScheduled = False
+        self._placeholder = QtGui.QPixmap(HISTORY_THUMBNAIL_SIZE, HISTORY_THUMBNAIL_SIZE)
+        self._placeholder.fill(QtGui.QColor("#333"))
+    
+    def setFilters(self, **filters):
+        """按新的过滤条件从第一页重新加载"""
+        self.beginResetModel()
+        self.filters = filters
+        self.records = []
+        self._rowOf = {}
+        self._queue.clear()
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore(QtCore.QModelIndex())
+    
+    def reload(self):
+        self.setFilters(**self.filters)
+    
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+    
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.exhausted
+    
+    def fetchMore(self, parent):
+        if parent.isValid() or self.exhausted:
+            return
+        cursor = None
+        if self.records:
+            last = self.records[-1]
+            cursor = (last["created"], last["work_id"])
+        try:
+            page = self.store.page(cursor, HISTORY_PAGE_SIZE, **self.filters)
+        except sqlite3.Error as e:
+            print(f"❌ 读取历史记录失败: {str(e)}")
+            page = []
+        self.exhausted = len(page) < HISTORY_PAGE_SIZE
+        if not page:
+            return
+        start = len(self.records)
+        self.beginInsertRows(QtCore.QModelIndex(), start, start + len(page) - 1)
+        for offset, record in enumerate(page):
+            self._rowOf[record["work_id"]] = start + offset
+        self.records.extend(page)
+        self.endInsertRows()
+    
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.records):
+            return None
+        record = self.records[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            when = time.strftime("%m-%d %H:%M", time.localtime(record["created"]))
+            workflow = get_workflow_registry().by_work_type(record["work_type"])
+            name = workflow.name if workflow else f"类型{record['work_type']}"
+            if record["status"] != 20:
+                name += f"（{TASK_STATUS_TEXT.get(record['status'], '未知')}）"
+            return f"{when}\n{name}"
+        if role == QtCore.Qt.ToolTipRole:
+            return record["prompt"] or None
+        if role == QtCore.Qt.DecorationRole:
+            return self._thumbnail(record)
+        if role == self.RecordRole:
+            return record
+        return None
+    
+    def _thumbnail(self, record):
+        work_id = record["work_id"]
+        if work_id in self._thumbnails:
+            self._thumbnails.move_to_end(work_id)
+            return self._thumbnails[work_id] or self._placeholder
+        if record["result_urls"] and work_id not in self._loading:
+            self._queue[work_id] = record["result_urls"][0]
+            self._queue.move_to_end(work_id)
+            # 只保留最近请求的一屏左右，快速滚动时跳过已经滚出视图的行
+            while len(self._queue) > HISTORY_PAGE_SIZE:
+                self._queue.popitem(last=False)
+            if not self._loadScheduled:
+                self._loadScheduled = True
+                QtCore.QTimer.singleShot(0, self._loadQueued)
+        return self._placeholder
+    
+    def _loadQueued(self):
+        self._loadScheduled = False
+        executor = get_network_executor()
+        while self._queue and len(self._loading) < HISTORY_THUMBNAIL_CONCURRENCY:
+            work_id, url = self._queue.popitem(last=True)
+            self._loading.add(work_id)
+            executor.submit(
+                load_history_thumbnail, url,
+                on_success=lambda image, work_id=work_id: self._onThumbnailLoaded(work_id, image),
+                on_error=lambda error, work_id=work_id: self._onThumbnailLoaded(work_id, None)
+            )
+    
+    def _onThumbnailLoaded(self, work_id, image):
+        self._loading.discard(work_id)
+        self._thumbnails[work_id] = QtGui.QPixmap.fromImage(image) if image is not None else None
+        while len(self._thumbnails) > HISTORY_THUMBNAIL_CACHE_MAX_ENTRIES:
+            self._thumbnails.popitem(last=False)
+        row = self._rowOf.get(work_id)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+        self._loadQueued()
+
+
+class HistoryDialog(QtWidgets.QDialog):
+    """历史记录浏览窗口：按提示词、类型、状态、时间过滤，双击查看结果大图"""
+    
+    STATUS_FILTERS = [("全部状态", None), ("已完成", 20), ("运行中", 10), ("失败", 30), ("已取消", 40)]
+    RANGE_FILTERS = [("全部时间", None), ("今天", 0), ("最近7天", 7), ("最近30天", 30)]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("历史记录")
+        self.resize(760, 640)
+        self.setStyleSheet("""
+            QDialog { background-color: #222; color: white; }
+            QLineEdit, QComboBox {
+                background-color: #333;
+                color: white;
+                border: 1px solid #555;
+                border-radius: 4px;
+                padding: 4px 6px;
+            }
+            QListView { background-color: #1b1b1b; color: #ddd; border: 1px solid #444; }
+            QListView::item:selected { background-color: #2176c1; }
+        """)
+        layout = QtWidgets.QVBoxLayout(self)
+        
+        filterLayout = QtWidgets.QHBoxLayout()
+        self.searchEdit = QtWidgets.QLineEdit()
+        self.searchEdit.setPlaceholderText("搜索提示词")
+        self.typeCombo = QtWidgets.QComboBox()
+        self.typeCombo.addItem("全部类型", None)
+        registry = get_workflow_registry()
+        for tab in registry.tabs():
+            for option in registry.options(tab):
+                self.typeCombo.addItem(f"{tab}-{option}", registry.get(tab, option).work_type)
+        self.statusCombo = QtWidgets.QComboBox()
+        for text, value in self.STATUS_FILTERS:
+            self.statusCombo.addItem(text, value)
+        self.rangeCombo = QtWidgets.QComboBox()
+        for text, value in self.RANGE_FILTERS:
+            self.rangeCombo.addItem(text, value)
+        self.syncButton = QtWidgets.QPushButton("同步")
+        self.syncButton.setStyleSheet("background-color: #3da9fc; color: white; border-radius: 4px; padding: 4px 12px;")
+        filterLayout.addWidget(self.searchEdit, 1)
+        filterLayout.addWidget(self.typeCombo)
+        filterLayout.addWidget(self.statusCombo)
+        filterLayout.addWidget(self.rangeCombo)
+        filterLayout.addWidget(self.syncButton)
+        layout.addLayout(filterLayout)
+        
+        self.statusLabel = QtWidgets.QLabel()
+        self.statusLabel.setStyleSheet("color: #888; font-size: 12px;")
+        layout.addWidget(self.statusLabel)
+        
+        # 只为可见的行创建绘制数据，数千条记录滚动也不会创建数千个控件
+        self.model = HistoryListModel(get_history_store(), self)
+        self.listView = QtWidgets.QListView()
+        self.listView.setViewMode(QtWidgets.QListView.IconMode)
+        self.listView.setResizeMode(QtWidgets.QListView.Adjust)
+        self.listView.setMovement(QtWidgets.QListView.Static)
+        self.listView.setUniformItemSizes(True)
+        self.listView.setLayoutMode(QtWidgets.QListView.Batched)
+        self.listView.setBatchSize(HISTORY_PAGE_SIZE)
+        self.listView.setIconSize(QtCore.QSize(HISTORY_THUMBNAIL_SIZE, HISTORY_THUMBNAIL_SIZE))
+        self.listView.setGridSize(QtCore.QSize(HISTORY_THUMBNAIL_SIZE + 24, HISTORY_THUMBNAIL_SIZE + 48))
+        self.listView.setWordWrap(True)
+        self.listView.setModel(self.model)
+        self.listView.doubleClicked.connect(self.openRecord)
+        layout.addWidget(self.listView, 1)
+        
+        self.searchTimer = QtCore.QTimer(self)
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(HISTORY_SEARCH_DELAY)
+        self.searchTimer.timeout.connect(self.applyFilters)
+        self.searchEdit.textChanged.connect(self.searchTimer.start)
+        self.typeCombo.currentIndexChanged.connect(self.applyFilters)
+        self.statusCombo.currentIndexChanged.connect(self.applyFilters)
+        self.rangeCombo.currentIndexChanged.connect(self.applyFilters)
+        self.syncButton.clicked.connect(self.sync)
+        
+        # 先显示本地已有的记录，再在后台同步服务器上的新记录
+        self.applyFilters()
+        self.sync()
+    
+    def applyFilters(self):
+        since = None
+        days = self.rangeCombo.currentData()
+        if days is not None:
+            today = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+            since = today - days * 86400
+        self.model.setFilters(
+            work_type=self.typeCombo.currentData(),
+            status=self.statusCombo.currentData(),
+            since=since,
+            text=self.searchEdit.text().strip() or None
+        )
+        self._updateStatus()
+    
+    def _updateStatus(self, text=None):
+        loaded = self.model.rowCount()
+        more = "" if self.model.exhausted else "+"
+        self.statusLabel.setText(text or f"显示 {loaded}{more} 条记录")
+    
+    def sync(self):
+        self.syncButton.setEnabled(False)
+        self._updateStatus("正在同步历史记录...")
+        get_network_executor().submit(
+            sync_work_history,
+            on_success=self._onSynced,
+            on_error=lambda error: self._onSynced(None)
+        )
+    
+    def _onSynced(self, changed):
+        self.syncButton.setEnabled(True)
+        if changed:
+            self.model.reload()
+        self._updateStatus(None if changed is not None else "同步失败，显示本地记录")
+    
+    def openRecord(self, index):
+        """下载（或读取缓存的）结果图片后用大图查看器打开"""
+        record = self.model.data(index, HistoryListModel.RecordRole)
+        if not record or not record["result_urls"]:
+            return
+        self._updateStatus("正在加载图片...")
+        get_network_executor().submit(
+            get_result_cache().fetch, record["result_urls"][0],
+            on_success=self._openImage,
+            on_error=lambda error: self._updateStatus(f"加载图片失败: {error}")
+        )
+    
+    def _openImage(self, path):
+        self._updateStatus()
+        if path:
+            ImageViewerDialog(path, self).exec_()
+
+
+# =========================
+# 批量生成窗口
+# =========================
+class BatchDialog(QtWidgets.QDialog):
+    """批量生成窗口：勾选视图和选项后一次截图、上传并排队提交，双击已完成的任务查看结果"""
+    
+    COLUMNS = ["视图", "选项", "状态", "进度"]
+    
+    def __init__(self, tab, parent=None):
+        super().__init__(parent)
+        self.tab = tab
+        self.queue = None
+        self.jobs = []
+        self.setWindowTitle(f"批量生成 - {tab.tabName}")
+        self.resize(640, 600)
+        self.setStyleSheet("""
+            QDialog { background-color: #222; color: white; }
+            QLabel { color: #ddd; }
+            QListWidget, QTableWidget {
+                background-color: #1b1b1b;
+                color: #ddd;
+                border: 1px solid #444;
+            }
+            QHeaderView::section { background-color: #333; color: #ddd; border: none; padding: 4px; }
+            QTableWidget::item:selected { background-color: #2176c1; }
+        """)
+        layout = QtWidgets.QVBoxLayout(self)
+        
+        pickLayout = QtWidgets.QHBoxLayout()
+        self.viewList = QtWidgets.QListWidget()
+        self.optionList = QtWidgets.QListWidget()
+        for title, widget in (("视图（视口/摄影机）", self.viewList), ("选项", self.optionList)):
+            column = QtWidgets.QVBoxLayout()
+            column.addWidget(QtWidgets.QLabel(title))
+            column.addWidget(widget)
+            pickLayout.addLayout(column)
+        layout.addLayout(pickLayout, 1)
+        
+        buttonLayout = QtWidgets.QHBoxLayout()
+        self.countLabel = QtWidgets.QLabel()
+        self.refreshButton = QtWidgets.QPushButton("刷新视图")
+        self.startButton = QtWidgets.QPushButton("开始批量生成")
+        self.cancelButton = QtWidgets.QPushButton("取消")
+        self.startButton.setStyleSheet("background-color: #3da9fc; color: white; border-radius: 4px; padding: 4px 12px;")
+        self.cancelButton.setStyleSheet("background-color: #c0392b; color: white; border-radius: 4px; padding: 4px 12px;")
+        buttonLayout.addWidget(self.countLabel, 1)
+        buttonLayout.addWidget(self.refreshButton)
+        buttonLayout.addWidget(self.startButton)
+        buttonLayout.addWidget(self.cancelButton)
+        layout.addLayout(buttonLayout)
+        
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.cellDoubleClicked.connect(self.openResult)
+        layout.addWidget(self.table, 2)
+        
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.setRange(0, 100)
+        self.progressBar.setValue(0)
+        self.statusLabel = QtWidgets.QLabel()
+        self.statusLabel.setStyleSheet("color: #888; font-size: 12px;")
+        layout.addWidget(self.progressBar)
+        layout.addWidget(self.statusLabel)
+        
+        self.viewList.itemChanged.connect(self._updateCount)
+        self.optionList.itemChanged.connect(self._updateCount)
+        self.refreshButton.clicked.connect(self.refreshViews)
+        self.startButton.clicked.connect(self.start)
+        self.cancelButton.clicked.connect(self.cancel)
+        self.refreshViews()
+        self._setRunning(False)
+    
+    @staticmethod
+    def _addCheckItem(listWidget, text, data, checked):
+        item = QtWidgets.QListWidgetItem(text)
+        item.setData(QtCore.Qt.UserRole, data)
+        item.setFlags(item.flags() | QtCore.Qt.ItemIsUserCheckable)
+        item.setCheckState(QtCore.Qt.Checked if checked else QtCore.Qt.Unchecked)
+        listWidget.addItem(item)
+    
+    @staticmethod
+    def _checked(listWidget):
+        return [listWidget.item(row).data(QtCore.Qt.UserRole) for row in range(listWidget.count())
+                if listWidget.item(row).checkState() == QtCore.Qt.Checked]
+    
+    def refreshViews(self):
+        """重新读取场景中的视口和摄影机，以及当前Tab的选项"""
+        self.viewList.blockSignals(True)
+        self.optionList.blockSignals(True)
+        self.viewList.clear()
+        self.optionList.clear()
+        for view in list_scene_views():
+            self._addCheckItem(self.viewList, view[0], view, view[2] is not None)
+        current = self.tab.comboBox.currentText()
+        for option in get_workflow_registry().options(self.tab.tabName):
+            self._addCheckItem(self.optionList, option, option, option == current)
+        self.viewList.blockSignals(False)
+        self.optionList.blockSignals(False)
+        self._updateCount()
+    
+    def _updateCount(self, *args):
+        count = len(self._checked(self.viewList)) * len(self._checked(self.optionList))
+        self.countLabel.setText(f"共 {count} 个任务（同时进行 {BATCH_MAX_ACTIVE_JOBS} 个）")
+        self.startButton.setEnabled(count > 0 and self.queue is None)
+    
+    def _setRunning(self, running):
+        self.startButton.setEnabled(not running)
+        self.refreshButton.setEnabled(not running)
+        self.viewList.setEnabled(not running)
+        self.optionList.setEnabled(not running)
+        self.cancelButton.setEnabled(running)
+        if not running:
+            self._updateCount()
+    
+    def start(self):
+        """截取选中的视图，生成任务并开始上传和提交"""
+        if not get_credential_store().token():
+            self.tab.show_error_message("请先登录，获取token后才能调用API")
+            return
+        views = self._checked(self.viewList)
+        options = self._checked(self.optionList)
+        self.statusLabel.setText("正在截取视图...")
+        QtWidgets.QApplication.processEvents()
+        jobs = self.tab.build_batch_jobs(views, options)
+        if not jobs:
+            self.statusLabel.setText("没有可提交的任务（截图失败）")
+            return
+        self.jobs = jobs
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            for column, text in enumerate((job.label, job.option, "", "")):
+                self.table.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+            self._updateRow(row, job)
+        self.queue = BatchQueue(jobs, parent=self)
+        self.queue.jobChanged.connect(lambda row: self._updateRow(row, self.jobs[row]))
+        self.queue.progressChanged.connect(self._onProgress)
+        self.queue.finished.connect(self._onFinished)
+        self._setRunning(True)
+        self.queue.start()
+    
+    def _updateRow(self, row, job):
+        status = BATCH_JOB_STATE_TEXT.get(job.state, job.state)
+        if job.message:
+            status += f"（{job.message}）"
+        self.table.item(row, 2).setText(status)
+        self.table.item(row, 2).setToolTip(status)
+        self.table.item(row, 3).setText(f"{job.progress}%")
+    
+    def _onProgress(self, value, text):
+        self.progressBar.setValue(value)
+        self.statusLabel.setText(text)
+    
+    def _onFinished(self):
+        done = sum(1 for job in self.jobs if job.state == "finished")
+        self.statusLabel.setText(f"批量生成结束：成功 {done}/{len(self.jobs)}，双击已完成的任务查看结果")
+        self.queue = None
+        self._setRunning(False)
+    
+    def cancel(self):
+        if self.queue is not None:
+            self.cancelButton.setEnabled(False)
+            self.statusLabel.setText("正在取消...")
+            self.queue.cancel()
+    
+    def openResult(self, row, column):
+        """在Tab中显示任务结果，并用大图查看器打开第一张"""
+        if row >= len(self.jobs) or not self.jobs[row].result_urls:
+            return
+        urls = self.jobs[row].result_urls
+        self.tab._display_result_urls(urls)
+        get_network_executor().submit(
+            get_result_cache().fetch, urls[0],
+            on_success=lambda path: path and ImageViewerDialog(path, self).exec_(),
+            on_error=lambda error: self.statusLabel.setText(f"加载图片失败: {error}")
+        )
+
+
+class PromptMatrixDialog(QtWidgets.QDialog):
+    """提示词矩阵窗口：同一张截图按多组提示词和参数并行生成，结果并排显示便于对比"""
+    
+    def __init__(self, tab, parent=None):
+        super().__init__(parent)
+        self.tab = tab
+        self.option = None
+        self.queue = None
+        self.jobs = []
+        self.resize(760, 680)
+        self.setStyleSheet("""
+            QDialog { background-color: #222; color: white; }
+            QLabel { color: #ddd; }
+            QPlainTextEdit, QLineEdit, QSpinBox {
+                background-color: #333;
                 color: white;
-                border: none;
-                padding: 8px 16px;
+                border: 1px solid #555;
                 border-radius: 4px;
-                font-size: 14px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
+                padding: 4px 6px;
             }
+            QListWidget { background-color: #1b1b1b; color: #ddd; border: 1px solid #444; }
+            QListWidget::item:selected { background-color: #2176c1; }
         """)
-        closeButton.clicked.connect(self.close)
-        
-        controlLayout.addWidget(titleLabel)
-        controlLayout.addStretch()
-        controlLayout.addWidget(closeButton)
-        
-        # 添加到主布局
-        mainLayout.addWidget(self.controlBar)
-        mainLayout.addWidget(self.graphicsView)
-        
-        # 初始时隐藏控制栏
-        self.controlBar.hide()
+        layout = QtWidgets.QVBoxLayout(self)
         
-        # 添加鼠标事件处理
-        self.graphicsView.mousePressEvent = self.onMousePress
-        self.graphicsView.mouseDoubleClickEvent = self.onMouseDoubleClick
+        self.optionLabel = QtWidgets.QLabel()
+        self.optionLabel.setStyleSheet("color: #3af; font-size: 15px; font-weight: bold;")
+        layout.addWidget(self.optionLabel)
+        self.promptEdit = QtWidgets.QPlainTextEdit()
+        self.promptEdit.setPlaceholderText("每行一组提示词，每行生成一个任务；多提示词选项在一行中用 | 分隔各个提示词")
+        self.promptEdit.setFixedHeight(120)
+        layout.addWidget(self.promptEdit)
+        
+        sweepLayout = QtWidgets.QHBoxLayout()
+        self.strengthEdit = QtWidgets.QLineEdit()
+        self.strengthEdit.setPlaceholderText("控制强度，如 0.4, 0.6 或 0.3:0.7:0.2")
+        self.weightEdit = QtWidgets.QLineEdit()
+        self.weightEdit.setPlaceholderText("参考图权重，如 0.6, 0.8")
+        self.parallelSpin = QtWidgets.QSpinBox()
+        self.parallelSpin.setRange(1, PROMPT_MATRIX_MAX_PARALLEL)
+        self.parallelSpin.setValue(BATCH_MAX_ACTIVE_JOBS)
+        sweepLayout.addWidget(self.strengthEdit, 1)
+        sweepLayout.addWidget(self.weightEdit, 1)
+        sweepLayout.addWidget(QtWidgets.QLabel("同时进行"))
+        sweepLayout.addWidget(self.parallelSpin)
+        layout.addLayout(sweepLayout)
+        
+        buttonLayout = QtWidgets.QHBoxLayout()
+        self.countLabel = QtWidgets.QLabel()
+        self.startButton = QtWidgets.QPushButton("开始生成")
+        self.cancelButton = QtWidgets.QPushButton("取消")
+        self.startButton.setStyleSheet("background-color: #3da9fc; color: white; border-radius: 4px; padding: 4px 12px;")
+        self.cancelButton.setStyleSheet("background-color: #c0392b; color: white; border-radius: 4px; padding: 4px 12px;")
+        buttonLayout.addWidget(self.countLabel, 1)
+        buttonLayout.addWidget(self.startButton)
+        buttonLayout.addWidget(self.cancelButton)
+        layout.addLayout(buttonLayout)
+        
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.setRange(0, 100)
+        self.statusLabel = QtWidgets.QLabel()
+        self.statusLabel.setStyleSheet("color: #888; font-size: 12px;")
+        layout.addWidget(self.progressBar)
+        layout.addWidget(self.statusLabel)
+        
+        # 结果并排显示：每个参数组合一格，完成后显示缩略图
+        self.resultList = QtWidgets.QListWidget()
+        self.resultList.setViewMode(QtWidgets.QListView.IconMode)
+        self.resultList.setResizeMode(QtWidgets.QListView.Adjust)
+        self.resultList.setMovement(QtWidgets.QListView.Static)
+        self.resultList.setIconSize(QtCore.QSize(HISTORY_THUMBNAIL_SIZE, HISTORY_THUMBNAIL_SIZE))
+        self.resultList.setGridSize(QtCore.QSize(HISTORY_THUMBNAIL_SIZE + 48, HISTORY_THUMBNAIL_SIZE + 64))
+        self.resultList.setWordWrap(True)
+        self.resultList.itemDoubleClicked.connect(self.openResult)
+        layout.addWidget(self.resultList, 1)
+        
+        self.promptEdit.textChanged.connect(self._updateCount)
+        self.strengthEdit.textChanged.connect(self._updateCount)
+        self.weightEdit.textChanged.connect(self._updateCount)
+        self.startButton.clicked.connect(self.start)
+        self.cancelButton.clicked.connect(self.cancel)
+        self.cancelButton.setEnabled(False)
     
-    def fitImageToView(self):
-        """将图片适应到视图大小"""
-        if hasattr(self, 'pixmapItem'):
-            # 获取视图和场景的实际尺寸
-            view_size = self.graphicsView.size()
-            scene_rect = self.pixmapItem.boundingRect()
-            
-            print(f"🔍 视图尺寸: {view_size.width()}x{view_size.height()}")
-            print(f"🔍 场景尺寸: {scene_rect.width()}x{scene_rect.height()}")
-            
-            # 如果视图尺寸为0，等待一下再试
-            if view_size.width() <= 0 or view_size.height() <= 0:
-                print("⚠️ 视图尺寸为0，延迟重试")
-                QtCore.QTimer.singleShot(100, self.fitImageToView)
-                return
-            
-            # 计算缩放比例
-            scale_x = view_size.width() / scene_rect.width()
-            scale_y = view_size.height() / scene_rect.height()
-            scale = min(scale_x, scale_y)  # 保持宽高比
-            
-            print(f"🔍 计算缩放比例: scale_x={scale_x:.2f}, scale_y={scale_y:.2f}, 最终scale={scale:.2f}")
-            
-            # 重置变换
-            self.graphicsView.resetTransform()
-            
-            # 应用缩放
-            self.graphicsView.scale(scale, scale)
-            
-            # 居中显示
-            self.graphicsView.centerOn(self.pixmapItem)
-            
-            # 强制更新
-            self.graphicsView.viewport().update()
-            
-            print(f"✅ 图片已适应视图大小，缩放比例: {scale:.2f}")
-            
-            # 验证缩放结果
-            transformed_rect = self.graphicsView.mapToScene(self.graphicsView.viewport().rect())
-            print(f"🔍 变换后视图范围: {transformed_rect.width():.1f}x{transformed_rect.height():.1f}")
+    def setOption(self, option):
+        """切换到Tab当前的选项，用选项的默认提示词填充输入框（生成过程中不切换）"""
+        if self.queue is not None or option == self.option:
+            return
+        self.option = option
+        workflow = get_workflow_registry().get(self.tab.tabName, option)
+        self.setWindowTitle(f"提示词矩阵 - {self.tab.tabName}-{option}")
+        self.optionLabel.setText(f"{self.tab.tabName} - {option}")
+        prompts = list(workflow.prompts) if workflow else []
+        if workflow and workflow.layout == "multi":
+            self.promptEdit.setPlainText(" | ".join(prompts))
+        else:
+            self.promptEdit.setPlainText("\n".join(prompts))
+        required = workflow.params if workflow else ()
+        self.strengthEdit.setEnabled("workStrong" in required)
+        self.weightEdit.setEnabled("workWeight" in required)
+        self._updateCount()
     
-    def onGraphicsViewResize(self, event):
-        """处理QGraphicsView大小改变事件"""
-        if hasattr(self, 'pixmapItem'):
-            self.fitImageToView()
-        event.accept()
+    def _matrix(self):
+        """按输入生成参数组合，输入无效时抛出ValueError"""
+        workflow = get_workflow_registry().get(self.tab.tabName, self.option)
+        if workflow is None:
+            raise ValueError("工作流配置中没有该选项")
+        lines = [line.strip() for line in self.promptEdit.toPlainText().splitlines() if line.strip()]
+        strengths = parse_sweep_values(self.strengthEdit.text()) if self.strengthEdit.isEnabled() else []
+        weights = parse_sweep_values(self.weightEdit.text()) if self.weightEdit.isEnabled() else []
+        count = len(lines) * max(len(strengths), 1) * max(len(weights), 1)
+        if count > PROMPT_MATRIX_MAX_JOBS:
+            raise ValueError(f"组合数{count}超过上限{PROMPT_MATRIX_MAX_JOBS}")
+        return build_prompt_matrix(workflow, lines, strengths, weights)
     
-    def resizeEvent(self, event):
-        """处理对话框大小改变事件"""
-        super().resizeEvent(event)
-        if hasattr(self, 'pixmapItem'):
-            self.fitImageToView()
+    def _updateCount(self):
+        try:
+            count = len(self._matrix())
+            self.countLabel.setText(f"共 {count} 个任务")
+        except ValueError as e:
+            count = 0
+            self.countLabel.setText(f"输入无效: {str(e)}")
+        self.startButton.setEnabled(count > 0 and self.queue is None)
     
-    def onMousePress(self, event):
-        """鼠标点击事件 - 显示/隐藏控制栏"""
-        if event.button() == QtCore.Qt.LeftButton:
-            if self.controlBar.isVisible():
-                self.controlBar.hide()
-            else:
-                self.controlBar.show()
-        event.accept()
+    def start(self):
+        """截取一次主视角视图，上传一次后并行提交所有参数组合"""
+        if not get_credential_store().token():
+            self.tab.show_error_message("请先登录，获取token后才能调用API")
+            return
+        try:
+            matrix = self._matrix()
+        except ValueError as e:
+            self.statusLabel.setText(f"输入无效: {str(e)}")
+            return
+        self.statusLabel.setText("正在截取主视角视图...")
+        QtWidgets.QApplication.processEvents()
+        jobs = self.tab.build_prompt_matrix_jobs(self.option, matrix)
+        if not jobs:
+            self.statusLabel.setText("主视角视图获取失败")
+            return
+        self.jobs = jobs
+        self.resultList.clear()
+        for job in jobs:
+            item = QtWidgets.QListWidgetItem(job.label)
+            item.setToolTip(job.label)
+            self.resultList.addItem(item)
+        self.queue = BatchQueue(jobs, self.parallelSpin.value(), self)
+        self.queue.jobChanged.connect(self._onJobChanged)
+        self.queue.progressChanged.connect(self._onProgress)
+        self.queue.finished.connect(self._onFinished)
+        self.startButton.setEnabled(False)
+        self.cancelButton.setEnabled(True)
+        self.queue.start()
     
-    def onMouseDoubleClick(self, event):
-        """鼠标双击事件 - 退出全屏"""
-        if event.button() == QtCore.Qt.LeftButton:
-            self.close()
-        event.accept()
+    def _onJobChanged(self, row):
+        job = self.jobs[row]
+        item = self.resultList.item(row)
+        status = BATCH_JOB_STATE_TEXT.get(job.state, job.state)
+        if job.state == "running":
+            status += f" {job.progress}%"
+        item.setText(f"{job.label}\n{status}")
+        if job.state == "finished" and job.result_urls and item.icon().isNull():
+            get_network_executor().submit(
+                load_history_thumbnail, job.result_urls[0],
+                on_success=lambda image, row=row: self._onThumbnail(row, image),
+                on_error=lambda error: print(f"⚠️ 加载结果缩略图失败: {error}")
+            )
+    
+    def _onThumbnail(self, row, image):
+        item = self.resultList.item(row)
+        if item is not None and image is not None and not image.isNull():
+            item.setIcon(QtGui.QIcon(QtGui.QPixmap.fromImage(image)))
+    
+    def _onProgress(self, value, text):
+        self.progressBar.setValue(value)
+        self.statusLabel.setText(text)
+    
+    def _onFinished(self):
+        done = sum(1 for job in self.jobs if job.state == "finished")
+        self.statusLabel.setText(f"生成结束：成功 {done}/{len(self.jobs)}，双击结果查看大图")
+        self.queue = None
+        self.cancelButton.setEnabled(False)
+        self._updateCount()
+    
+    def cancel(self):
+        if self.queue is not None:
+            self.cancelButton.setEnabled(False)
+            self.statusLabel.setText("正在取消...")
+            self.queue.cancel()
+    
+    def openResult(self, item):
+        row = self.resultList.row(item)
+        if row >= len(self.jobs) or not self.jobs[row].result_urls:
+            return
+        get_network_executor().submit(
+            get_result_cache().fetch, self.jobs[row].result_urls[0],
+            on_success=lambda path: path and ImageViewerDialog(path, self).exec_(),
+            on_error=lambda error: self.statusLabel.setText(f"加载图片失败: {error}")
+        )
 
 
 # =========================
@@ -903,114 +5559,9 @@ def clearLayout(layout):
 # 每个Tab的内容区控件
 # =========================
 class TabContentWidget(QtWidgets.QWidget):
-    MULTI_PROMPT_DEFAULTS = {
-        "多风格（白模）": [
-            "书房，现代风格，书桌",
-            "卧室，现代风格",
-            "客厅，现代风格"
-        ],
-        "多风格（线稿）": [
-            "卧室，现代风格",
-            "客厅，现代风格",
-            "书房，现代风格"
-        ]
-    }
-    PROMPT_DEFAULTS = {
-        # 室内设计
-        "彩平图": "彩平图，现代风格，客厅布局",
-        "毛坯房出图": "客厅,复古法式风格，金属茶几，沙发，地毯，装饰品，阳台，极精细的细节，吊灯",
-        "线稿出图": "卧室，现代风格，简约线条",
-        "白模渲染": "卧室，现代风格，电脑，书，电脑椅",
-        "多风格（白模）": "书房，现代风格，书桌",
-        "多风格（线稿）": "卧室，现代风格",
-        "风格转换": "客厅，中式风格，传统装饰",
-        "360出图": "全景室内，360度视角",
-        # 建筑规划
-        "彩平图": "建筑彩平图，现代建筑设计",
-        "现场出图": "建筑工地，现代风格，施工现场",
-        "线稿出图": "建筑线稿，简约风格，结构清晰",
-        "白模透视（精确）": "建筑白模，精确透视，细节建模",
-        "白模透视（体块）": "建筑体块白模，鸟瞰视角",
-        "白模鸟瞰（精确）": "建筑鸟瞰，精确建模，高空视角",
-        "白模鸟瞰（体块）": "建筑鸟瞰，体块模型，简化结构",
-        "白天变夜景": "夜景，灯光渲染，城市夜景",
-        "亮化工程": "建筑亮化，灯光设计，夜景照明",
-        # 景观设计
-        "彩平图": "景观彩平图，现代景观设计",
-        "现场出图": "景观现场，现代风格，自然景观",
-        "现场（局部）参考局部": "局部景观，参考对比，细节展示",
-        "线稿出图": "景观线稿，简约风格，自然线条",
-        "白模（透视）": "景观白模，透视效果，自然景观",
-        "白模（鸟瞰）": "景观鸟瞰，白模，高空视角",
-        "白天转夜景": "夜景，灯光渲染，景观夜景",
-        "亮化工程": "景观亮化，灯光设计，夜景照明",
-        # 图像处理
-        "指定换材质": "替换为新材质，材质转换",
-        "修改局部": "局部修改，细节增强，精确编辑",
-        "AI去除万物": "去除指定物体，智能清理",
-        "AI去水印": "去除水印，智能修复",
-        "增加物体": "添加新物体，智能合成",
-        "增加物体（指定物体）": "添加指定物体，精确合成",
-        "替换（产品）": "产品替换，智能替换",
-        "替换（背景天花）": "替换背景或天花板，环境替换",
-        "扩图": "扩展画面，智能扩展",
-        "洗图": "图像清洗，去噪，质量提升",
-        "图像增强": "图像增强，细节提升，清晰度优化",
-        "溶图（局部）": "局部溶图，融合效果，自然过渡",
-        "放大出图": "图像放大，高清，分辨率提升",
-        "老照片修复": "老照片修复，去划痕，历史照片修复"
-    }
-    ADVANCED_DEFAULTS = {
-        "室内设计-彩平图": {"控制强度": 0.55, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "室内设计-毛坯房出图": {"控制强度": 0.55, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "室内设计-线稿出图": {"控制强度": 0.55, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "室内设计-白模渲染": {"控制强度": 0.55, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "室内设计-多风格（白模）": {"控制强度": 0.58, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "室内设计-多风格（线稿）": {"控制强度": 0.58, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "室内设计-风格转换": {"控制强度": 0.55, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "室内设计-360出图": {"控制强度": 0.55, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-彩平图": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-现场出图": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-线稿出图": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-白模透视（精确）": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-白模透视（体块）": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-白模鸟瞰（精确）": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-白模鸟瞰（体块）": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-白天变夜景": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "建筑规划-亮化工程": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-彩平图": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-现场出图": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-现场（局部）参考局部": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-线稿出图": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-白模（透视）": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-白模（鸟瞰）": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-白天转夜景": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "景观设计-亮化工程": {"控制强度": 0.8, "参考图权重": 0.6, "参考图权重2": 0.6, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-指定换材质": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-修改局部": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-AI去除万物": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-AI去水印": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-增加物体": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-增加物体（指定物体）": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-替换（产品）": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-替换（背景天花）": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-扩图": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-洗图": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-图像增强": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-溶图（局部）": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-放大出图": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0},
-        "图像处理-老照片修复": {"控制强度": 0.5, "参考图权重": 0.8, "参考图权重2": 0.8, "控制开始时间": 0, "控制结束时间": 1, "像素值": 0, "是否竖屏": False, "增强细节": 0}
-    }
     def __init__(self, tabName, parent=None):
         super(TabContentWidget, self).__init__(parent)
         try:
-            # 下拉栏选项映射（每个Tab不同）
-            tab_options = {
-                '室内设计': ['彩平图', '毛坯房出图', '线稿出图', '白模渲染', '多风格（白模）', '多风格（线稿）', '风格转换', '360出图'],
-                '建筑规划': ['彩平图', '现场出图', '线稿出图', '白模透视（精确）', '白模透视（体块）', '白模鸟瞰（精确）', '白模鸟瞰（体块）', '白天变夜景', '亮化工程'],
-                '景观设计': ['彩平图', '现场出图', '现场（局部）参考局部', '线稿出图', '白模（透视）', '白模（鸟瞰）', '白天转夜景', '亮化工程'],
-                '图像处理': ['指定换材质', '修改局部', 'AI去除万物', 'AI去水印', '增加物体', '增加物体（指定物体）', '替换（产品）', '替换（背景天花）', '扩图', '洗图', '图像增强', '溶图（局部）', '放大出图', '老照片修复']
-            }
             # 真正的内容widget
             contentWidget = QtWidgets.QWidget()
             contentWidget.setMaximumWidth(520)  # 统一内容区宽度
@@ -1053,7 +5604,8 @@ text-shadow: 1px 1px 4px #000;
         self.comboBox.setFixedHeight(28)
         self.comboBox.setFixedWidth(180)
         self.comboBox.setStyleSheet("background-color: #444; color: white;")
-        for opt in tab_options.get(tabName, []):
+        # 下拉栏选项来自工作流注册表（每个Tab不同）
+        for opt in get_workflow_registry().options(tabName):
             self.comboBox.addItem(opt)
         comboBar = QtWidgets.QWidget()
         comboBarLayout = QtWidgets.QHBoxLayout(comboBar)
@@ -1064,11 +5616,15 @@ text-shadow: 1px 1px 4px #000;
         comboBarLayout.addSpacing(12)
         comboBarLayout.addWidget(self.comboBox)
         comboBarLayout.addStretch(1)
-        # 动态内容区
+        # 动态内容区（每个选项的表单只创建一次并缓存，切换选项时只切换显示的表单，
+        # 已输入的提示词和已上传的图片在切换回来时保留）
         self.dynamicContent = QtWidgets.QWidget()
-        self.dynamicLayout = QtWidgets.QVBoxLayout(self.dynamicContent)
-        self.dynamicLayout.setContentsMargins(0, 0, 0, 0)
-        self.dynamicLayout.setSpacing(18)
+        self.formContainerLayout = QtWidgets.QVBoxLayout(self.dynamicContent)
+        self.formContainerLayout.setContentsMargins(0, 0, 0, 0)
+        self.formContainerLayout.setSpacing(0)
+        self.dynamicLayout = None  # 正在创建的表单的布局
+        self._formCache = {}
+        self._currentForm = None
         contentLayout.addWidget(self.dynamicContent)
         # 外层用QScrollArea包裹
         scroll = QtWidgets.QScrollArea()
@@ -1115,6 +5671,40 @@ QPushButton:pressed {
         self.captureBtn.clicked.connect(self.capture_max_view)
         self.captureBtn.setEnabled(True)
         mainLayout.addWidget(self.captureBtn)
+        # 批量生成按钮：多个视图 × 多个选项一次提交
+        self.batchBtn = QtWidgets.QPushButton("📦 批量生成")
+        self.batchBtn.setMinimumHeight(32)
+        self.batchBtn.setMaximumHeight(36)
+        self.batchBtn.setStyleSheet("""
+QPushButton {
+    background-color: #444;
+    color: white;
+    border-radius: 8px;
+    font-weight: bold;
+    font-size: 14px;
+    padding: 4px 0;
+}
+QPushButton:hover {
+    background-color: #555;
+}
+QPushButton:pressed {
+    background-color: #333;
+}
+""")
+        self.batchBtn.clicked.connect(self.show_batch_dialog)
+        # 提示词矩阵按钮：当前选项的多组提示词/参数共用一张截图并行提交
+        self.matrixBtn = QtWidgets.QPushButton("🧪 提示词矩阵")
+        self.matrixBtn.setMinimumHeight(32)
+        self.matrixBtn.setMaximumHeight(36)
+        self.matrixBtn.setStyleSheet(self.batchBtn.styleSheet())
+        self.matrixBtn.clicked.connect(self.show_prompt_matrix_dialog)
+        batchBar = QtWidgets.QWidget()
+        batchBarLayout = QtWidgets.QHBoxLayout(batchBar)
+        batchBarLayout.setContentsMargins(0, 6, 0, 0)
+        batchBarLayout.setSpacing(6)
+        batchBarLayout.addWidget(self.batchBtn)
+        batchBarLayout.addWidget(self.matrixBtn)
+        mainLayout.addWidget(batchBar)
         # 不添加到主布局中，保持隐藏状态
         # 预留底部按钮区
         self.bottomBtnContainer = QtWidgets.QWidget()
@@ -1123,15 +5713,19 @@ QPushButton:pressed {
         self.bottomBtnLayout.setSpacing(0)
         mainLayout.addWidget(self.bottomBtnContainer)
         self.setLayout(mainLayout)
+        # 生成按钮所有表单共用，按当前表单决定是否显示
+        self.generateButton = self._generateBtn()
+        self._addBottomBtn(self.generateButton)
         # 绑定下拉栏切换事件和初始化，必须放在bottomBtnLayout创建之后
         self.comboBox.currentTextChanged.connect(self.updateDynamicUI)
         self.updateDynamicUI(self.comboBox.currentText())
 
-    # 清空动态内容区
+    # 清空动态内容区（销毁所有缓存的表单，下次切换选项时重新创建）
     def clearDynamicContent(self):
-        clearLayout(self.dynamicLayout)
-        # 清空底部按钮区
-        clearLayout(self.bottomBtnLayout)
+        clearLayout(self.formContainerLayout)
+        self._formCache = {}
+        self._currentForm = None
+        self.uploadWidget = None
 
     # 样式常量
     PROMPT_EDIT_STYLE = """
@@ -1188,87 +5782,71 @@ QPushButton:pressed {
                 hbox.addStretch(1)
                 layout.addLayout(hbox)
 
-    # 配置驱动（选项名→上传区+提示词组）
-    UPLOAD_PROMPT_CONFIG = {
-        "多风格（白模）": [
-            ("参考图像1", "提示词1", "书房，现代风格，书桌"),
-            ("参考图像2", "提示词2", "卧室，现代风格"),
-            ("参考图像3", "提示词3", "客厅，现代风格")
-        ],
-        "多风格（线稿)": [
-            ("参考图像1", "提示词1", "卧室，现代风格"),
-            ("参考图像2", "提示词2", "客厅，现代风格"),
-            ("参考图像3", "提示词3", "书房，现代风格")
-        ],
-        # 其它多上传区选项可继续补充
-    }
-    
-    # 参数需求配置（选项名→需要的参数列表）
-    PARAM_REQUIREMENTS = {
-        # 室内设计 - 基础选项，只需要基本参数
-        "彩平图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "毛坯房出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "线稿出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "白模渲染": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "风格转换": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "360出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        
-        # 多风格选项，需要多个提示词
-        "多风格（白模）": ["workName", "workNameOne", "workNameTwo", "workStrong", "workStrongOne", "workWeight", "workWeightOne", "workStart", "workEnd"],
-        "多风格（线稿）": ["workName", "workNameOne", "workNameTwo", "workStrong", "workStrongOne", "workWeight", "workWeightOne", "workStart", "workEnd"],
-        
-        # 建筑规划 - 基础选项
-        "建筑规划-彩平图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-现场出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-线稿出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-白模透视（精确）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-白模透视（体块）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-白模鸟瞰（精确）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-白模鸟瞰（体块）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-白天变夜景": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "建筑规划-亮化工程": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        
-        # 景观设计 - 基础选项
-        "景观设计-彩平图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "景观设计-现场出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "景观设计-现场（局部）参考局部": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "景观设计-线稿出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "景观设计-白模（透视）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "景观设计-白模（鸟瞰）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "景观设计-白天转夜景": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "景观设计-亮化工程": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        
-        # 图像处理 - 特殊选项，需要额外参数
-        "图像处理-溶图（局部）": ["workName", "workStrong", "workWeight", "workWeightOne", "workStart", "workEnd", "workPixel", "workIsVertical"],
-        "图像处理-放大出图": ["workName", "workStrong", "workWeight", "workStart", "workEnd", "workEnhance"],
-        "图像处理-图像增强": ["workName", "workStrong", "workWeight", "workStart", "workEnd", "workEnhance"],
-        
-        # 图像处理 - 基础选项
-        "图像处理-指定换材质": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-修改局部": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-AI去除万物": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-AI去水印": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-增加物体": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-增加物体（指定物体）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-替换（产品）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-替换（背景天花）": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-扩图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-洗图": ["workName", "workStrong", "workWeight", "workStart", "workEnd"],
-        "图像处理-老照片修复": ["workName", "workStrong", "workWeight", "workStart", "workEnd"]
-    }
+    def _current_workflow(self, option=None):
+        """当前Tab下某个选项（默认为下拉栏当前选项）的注册表配置，未知选项返回None"""
+        if option is None:
+            option = self.comboBox.currentText()
+        return get_workflow_registry().get(self.tabName, option)
 
-    # updateDynamicUI重构
+    # 切换选项：显示该选项缓存的表单，第一次切换到该选项时才创建
     def updateDynamicUI(self, option):
-        self.clearDynamicContent()
-        tabWidget = self.parent()
-        tabName = ""
-        if tabWidget and hasattr(tabWidget, 'parent') and tabWidget.parent() and hasattr(tabWidget.parent(), 'tabWidget'):
-            idx = tabWidget.parent().tabWidget.currentIndex()
-            tabName = tabWidget.parent().tabWidget.tabText(idx)
         optionText = self.comboBox.currentText()
         self.titleLabel.setText(optionText)
-        # 针对"溶图（局部）"特殊处理：2上传区+1提示词
-        if option == "溶图（局部）":
+        form = self._formCache.get(option)
+        if form is None:
+            started = time.perf_counter()
+            form = self._buildDynamicForm(option)
+            self._formCache[option] = form
+            self.formContainerLayout.addWidget(form)
+            print(f"🧱 创建表单: {option}，耗时{(time.perf_counter() - started) * 1000:.1f} ms")
+        if self._currentForm is not None and self._currentForm is not form:
+            self._currentForm.hide()
+        form.show()
+        self._currentForm = form
+        self.uploadWidget = form.uploadWidget
+        self.generateButton.setVisible(form.hasGenerateBtn)
+
+    def _buildDynamicForm(self, option):
+        """创建一个选项的表单控件，记录表单的上传控件和是否需要生成按钮"""
+        form = QtWidgets.QWidget()
+        self.dynamicLayout = QtWidgets.QVBoxLayout(form)
+        self.dynamicLayout.setContentsMargins(0, 0, 0, 0)
+        self.dynamicLayout.setSpacing(18)
+        self.uploadWidget = None
+        form.hasGenerateBtn = self._populateDynamicForm(option)
+        form.uploadWidget = self.uploadWidget
+        form.workflow = self._current_workflow(option)
+        self.dynamicLayout = None
+        return form
+
+    def reloadWorkflowOptions(self):
+        """工作流注册表更新后重新填充下拉栏，只重建配置有变化的表单，其它表单中已输入的内容保留"""
+        registry = get_workflow_registry()
+        current = self.comboBox.currentText()
+        for option, form in list(self._formCache.items()):
+            if form.workflow is None or registry.get(self.tabName, option) != form.workflow:
+                del self._formCache[option]
+                if form is self._currentForm:
+                    self._currentForm = None
+                self.formContainerLayout.removeWidget(form)
+                form.deleteLater()
+        self.comboBox.blockSignals(True)
+        self.comboBox.clear()
+        for opt in registry.options(self.tabName):
+            self.comboBox.addItem(opt)
+        self.comboBox.setCurrentIndex(max(self.comboBox.findText(current), 0))
+        self.comboBox.blockSignals(False)
+        self.updateDynamicUI(self.comboBox.currentText())
+
+    # 按选项向self.dynamicLayout中添加表单控件，返回是否需要生成按钮
+    def _populateDynamicForm(self, option):
+        workflow = self._current_workflow(option)
+        if workflow is None:
+            print(f"❌ 工作流配置中没有该选项: {self.tabName}-{option}")
+            return False
+        default_prompt = workflow.prompts[0] if workflow.prompts else ""
+        # 溶图布局：2上传区+1提示词
+        if workflow.layout == "blend":
             upload_labels = ["参考图像1", "参考图像2"]
             for label in upload_labels:
                 # 只显示上传区，不显示提示词输入框
@@ -1283,7 +5861,7 @@ QPushButton:pressed {
             label.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
             promptEdit = QtWidgets.QLineEdit()
             promptEdit.setFixedWidth(TabContentWidget.PROMPT_EDIT_WIDTH)
-            promptEdit.setText(self.PROMPT_DEFAULTS.get(option, ""))
+            promptEdit.setText(default_prompt)
             promptEdit.setStyleSheet(TabContentWidget.PROMPT_EDIT_STYLE)
             vbox.addWidget(label)
             vbox.addWidget(promptEdit)
@@ -1368,36 +5946,22 @@ QPushButton:pressed {
                 advLayout.addLayout(paramLayout)
             advGroup.setContentLayout(advLayout)
             self.dynamicLayout.addWidget(advGroup)
-            return
-        # 配置驱动多上传区+多提示词
-        if option in self.UPLOAD_PROMPT_CONFIG or option in ["多风格（白模）", "多风格（线稿）"]:
-            config = self.UPLOAD_PROMPT_CONFIG.get(option)
-            if config:
-                for i, (upload_label, prompt_label, prompt_default) in enumerate(config):
-                    widget = self.UploadWithPromptWidget(upload_label, prompt_label, prompt_default, self)
-                    self.dynamicLayout.addWidget(widget)
-                    if i < len(config) - 1:
-                        self.dynamicLayout.addSpacing(12)
-            else:
-                # 默认3组上传区+提示词
-                for i in range(3):
-                        upload_label = f"参考图像{i+1}"
-                        prompt_label = f"提示词{i+1}"
-                        prompt_default = self.MULTI_PROMPT_DEFAULTS.get(option, ["", "", ""])[i]
-                        widget = self.UploadWithPromptWidget(upload_label, prompt_label, prompt_default, self)
-                        self.dynamicLayout.addWidget(widget)
-                if i < 2:
+            return False
+        # 多上传区+多提示词：每个默认提示词对应一组上传区和提示词
+        if workflow.layout == "multi":
+            for i, prompt_default in enumerate(workflow.prompts):
+                widget = self.UploadWithPromptWidget(f"参考图像{i+1}", f"提示词{i+1}", prompt_default, self)
+                self.dynamicLayout.addWidget(widget)
+                if i < len(workflow.prompts) - 1:
                     self.dynamicLayout.addSpacing(12)
-            self.dynamicLayout.addLayout(self._strengthSlider())
-            self.dynamicLayout.addWidget(self._advancedParams())
         else:
             # 单上传区+单提示词
-            widget = self.UploadWithPromptWidget("参考图像", "提示词", self.PROMPT_DEFAULTS.get(option, ""), self)
+            widget = self.UploadWithPromptWidget("参考图像", "提示词", default_prompt, self)
             self.dynamicLayout.addWidget(widget)
-            if tabName == "图像处理" or option in ["彩平图", "线稿出图", "风格转换"]:
-                self.dynamicLayout.addLayout(self._strengthSlider())
-                self.dynamicLayout.addWidget(self._advancedParams())
-        self._addBottomBtn(self._generateBtn())
+        if workflow.controls:
+            self.dynamicLayout.addLayout(self._strengthSlider())
+            self.dynamicLayout.addWidget(self._advancedParams())
+        return True
 
     # 复用控件生成函数
     def _uploadGroup(self, multi=False, label_text="参考图像"):
@@ -1477,14 +6041,10 @@ QPushButton:pressed {
         layout = QtWidgets.QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(2)  # label和输入框间距更小
-        if option in self.MULTI_PROMPT_DEFAULTS:
-            defaults = self.MULTI_PROMPT_DEFAULTS[option]
-            default = defaults[prompt_index] if prompt_index < len(defaults) else ""
-            label = QtWidgets.QLabel(f"提示词{prompt_index+1}" if len(defaults) > 1 else "提示词")
-        else:
-            optionText = option if option else (self.comboBox.currentText() if hasattr(self, "comboBox") else "")
-            default = self.PROMPT_DEFAULTS.get(optionText, "")
-            label = QtWidgets.QLabel("提示词")
+        workflow = self._current_workflow(option) if hasattr(self, "comboBox") else None
+        defaults = workflow.prompts if workflow else ()
+        default = defaults[prompt_index] if prompt_index < len(defaults) else ""
+        label = QtWidgets.QLabel(f"提示词{prompt_index+1}" if len(defaults) > 1 else "提示词")
         label.setStyleSheet("color: #ccc; font-size: 14px; margin-bottom: 0px;")
         label.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
         promptEdit = QtWidgets.QLineEdit()
@@ -1711,710 +6271,290 @@ QPushButton:pressed {
                 # 方法3：通过父级结构获取Tab名称
                 tabWidget = self.parent()
                 print(f"  tabWidget: {tabWidget}")
-                print(f"  tabWidget.parent(): {tabWidget.parent() if tabWidget else None}")
-                
-        if tabWidget and hasattr(tabWidget, 'parent') and tabWidget.parent() and hasattr(tabWidget.parent(), 'tabWidget'):
-            idx = tabWidget.parent().tabWidget.currentIndex()
-            tabName = tabWidget.parent().tabWidget.tabText(idx)
-            print(f"  tabWidget.parent().tabWidget: {tabWidget.parent().tabWidget}")
-            print(f"  currentIndex: {idx}")
-            print(f"  tabText: {tabName}")
-        else:
-            print(f"  ❌ 无法获取Tab信息")
-            
-        option = self.comboBox.currentText()
-        print(f"  option: {option}")
-        print(f"  tabName: '{tabName}'")
-        
-        # 分流到不同的API调用函数
-        if tabName == "室内设计":
-            print(f"✅ 调用室内设计API: {option}")
-            self.call_api_interior(option)
-        elif tabName == "建筑规划":
-            print(f"✅ 调用建筑规划API: {option}")
-            self.call_api_architecture(option)
-        elif tabName == "景观设计":
-            print(f"✅ 调用景观设计API: {option}")
-            self.call_api_landscape(option)
-        elif tabName == "图像处理":
-            print(f"✅ 调用图像处理API: {option}")
-            self.call_api_image(option)
-        else:
-            print(f"❌ 未匹配的Tab: '{tabName}'，调用默认API: {option}")
-            self.call_api_default(option)
-
-    # 下面是预留的API调用函数，后续直接填参数和实现即可
-    def call_api_interior(self, option):
-        if option == "彩平图":
-            self.api_interior_cai_ping_tu()
-        elif option == "毛坯房出图":
-            self.api_interior_mao_pi_fang()
-        elif option == "线稿出图":
-            self.api_interior_xian_gao()
-        elif option == "白模渲染":
-            self.api_interior_bai_mo()
-        elif option == "多风格（白模）":
-            self.api_interior_duo_fengge_baimo()
-        elif option == "多风格（线稿）":
-            self.api_interior_duo_fengge_xiangao()
-        elif option == "风格转换":
-            self.api_interior_fengge_zhuanhuan()
-        elif option == "360出图":
-            self.api_interior_360()
-        elif option == "室内-多角度(白模)":
-            self.api_interior_duo_fengge_baimo()
-        elif option == "室内-多角度(线稿)":
-            self.api_interior_duo_fengge_xiangao()
-        else:
-            print(f"未实现的室内设计API: {option}")
-
-    def api_interior_cai_ping_tu(self):
-        """室内设计-彩平图API"""
-        return self.call_workflow_api("彩平图", "室内设计")
-        
-    def api_interior_mao_pi_fang(self):
-        """室内设计-毛坯房出图API"""
-        return self.call_workflow_api("毛坯房出图", "室内设计")
-        
-    def api_interior_xian_gao(self):
-        """室内设计-线稿出图API"""
-        return self.call_workflow_api("线稿出图", "室内设计")
-        
-    def api_interior_bai_mo(self):
-        """室内设计-白模渲染API"""
-        return self.call_workflow_api("白模渲染", "室内设计")
-        
-    def api_interior_duo_fengge_baimo(self):
-        """室内设计-多风格（白模）API"""
-        return self.call_workflow_api("多风格（白模）", "室内设计")
-        
-    def api_interior_duo_fengge_xiangao(self):
-        """室内设计-多风格（线稿）API"""
-        return self.call_workflow_api("多风格（线稿）", "室内设计")
-        
-    def api_interior_fengge_zhuanhuan(self):
-        """室内设计-风格转换API"""
-        return self.call_workflow_api("风格转换", "室内设计")
-        
-    def api_interior_360(self):
-        """室内设计-360出图API"""
-        return self.call_workflow_api("360出图", "室内设计")
-
-    def call_api_architecture(self, option):
-        if option == "彩平图":
-            self.api_arch_cai_ping_tu()
-        elif option == "现场出图":
-            self.api_arch_xian_chang()
-        elif option == "线稿出图":
-            self.api_arch_xian_gao()
-        elif option == "白模透视（精确）":
-            self.api_arch_baimo_toushi_jingque()
-        elif option == "白模透视（体块）":
-            self.api_arch_baimo_toushi_tikuai()
-        elif option == "白模鸟瞰（精确）":
-            self.api_arch_baimo_niokan_jingque()
-        elif option == "白模鸟瞰（体块）":
-            self.api_arch_baimo_niokan_tikuai()
-        elif option == "白天变夜景":
-            self.api_arch_baitian_yejing()
-        elif option == "亮化工程":
-            self.api_arch_lianghua()
-        else:
-            print(f"未实现的建筑规划API: {option}")
-
-    def api_arch_cai_ping_tu(self):
-        """建筑规划-彩平图API"""
-        return self.call_workflow_api("彩平图", "建筑规划")
-        
-    def api_arch_xian_chang(self):
-        """建筑规划-现场出图API"""
-        return self.call_workflow_api("现场出图", "建筑规划")
-        
-    def api_arch_xian_gao(self):
-        """建筑规划-线稿出图API"""
-        return self.call_workflow_api("线稿出图", "建筑规划")
-        
-    def api_arch_baimo_toushi_jingque(self):
-        """建筑规划-白模透视（精确）API"""
-        return self.call_workflow_api("白模透视（精确）", "建筑规划")
-        
-    def api_arch_baimo_toushi_tikuai(self):
-        """建筑规划-白模透视（体块）API"""
-        return self.call_workflow_api("白模透视（体块）", "建筑规划")
-        
-    def api_arch_baimo_niokan_jingque(self):
-        """建筑规划-白模鸟瞰（精确）API"""
-        return self.call_workflow_api("白模鸟瞰（精确）", "建筑规划")
-        
-    def api_arch_baimo_niokan_tikuai(self):
-        """建筑规划-白模鸟瞰（体块）API"""
-        return self.call_workflow_api("白模鸟瞰（体块）", "建筑规划")
-        
-    def api_arch_baitian_yejing(self):
-        """建筑规划-白天变夜景API"""
-        return self.call_workflow_api("白天变夜景", "建筑规划")
-        
-    def api_arch_lianghua(self):
-        """建筑规划-亮化工程API"""
-        return self.call_workflow_api("亮化工程", "建筑规划")
-
-    def call_api_landscape(self, option):
-        if option == "彩平图":
-            self.api_land_cai_ping_tu()
-        elif option == "现场出图":
-            self.api_land_xian_chang()
-        elif option == "现场（局部）参考局部":
-            self.api_land_xian_chang_jubu()
-        elif option == "线稿出图":
-            self.api_land_xian_gao()
-        elif option == "白模（透视）":
-            self.api_land_baimo_toushi()
-        elif option == "白模（鸟瞰）":
-            self.api_land_baimo_niokan()
-        elif option == "白天转夜景":
-            self.api_land_baitian_yejing()
-        elif option == "亮化工程":
-            self.api_land_lianghua()
-        else:
-            print(f"未实现的景观设计API: {option}")
-
-    def api_land_cai_ping_tu(self):
-        """景观设计-彩平图API"""
-        return self.call_workflow_api("彩平图", "景观设计")
-        
-    def api_land_xian_chang(self):
-        """景观设计-现场出图API"""
-        return self.call_workflow_api("现场出图", "景观设计")
-        
-    def api_land_xian_chang_jubu(self):
-        """景观设计-现场（局部）参考局部API"""
-        return self.call_workflow_api("现场（局部）参考局部", "景观设计")
-        
-    def api_land_xian_gao(self):
-        """景观设计-线稿出图API"""
-        return self.call_workflow_api("线稿出图", "景观设计")
-        
-    def api_land_baimo_toushi(self):
-        """景观设计-白模（透视）API"""
-        return self.call_workflow_api("白模（透视）", "景观设计")
-        
-    def api_land_baimo_niokan(self):
-        """景观设计-白模（鸟瞰）API"""
-        return self.call_workflow_api("白模（鸟瞰）", "景观设计")
-        
-    def api_land_baitian_yejing(self):
-        """景观设计-白天转夜景API"""
-        return self.call_workflow_api("白天转夜景", "景观设计")
-        
-    def api_land_lianghua(self):
-        """景观设计-亮化工程API"""
-        return self.call_workflow_api("亮化工程", "景观设计")
-
-    def call_api_image(self, option):
-        if option == "指定换材质":
-            self.api_img_huancai()
-        elif option == "修改局部":
-            self.api_img_xiugai_jubu()
-        elif option == "AI去除万物":
-            self.api_img_quchu()
-        elif option == "AI去水印":
-            self.api_img_shuiyin()
-        elif option == "增加物体":
-            self.api_img_zengjia()
-        elif option == "增加物体（指定物体）":
-            self.api_img_zengjia_zhiding()
-        elif option == "替换（产品）":
-            self.api_img_tihuan_chanpin()
-        elif option == "替换（背景天花）":
-            self.api_img_tihuan_beijing()
-        elif option == "扩图":
-            self.api_img_kuotu()
-        elif option == "洗图":
-            self.api_img_xitu()
-        elif option == "图像增强":
-            self.api_img_enhance()
-        elif option == "溶图（局部）":
-            self.api_img_rongtu()
-        elif option == "放大出图":
-            self.api_img_fangda()
-        elif option == "老照片修复":
-            self.api_img_repair()
-        else:
-            print(f"未实现的图像处理API: {option}")
-
-    def api_img_huancai(self):
-        """图像处理-指定换材质API"""
-        return self.call_workflow_api("指定换材质", "图像处理")
-        
-    def api_img_xiugai_jubu(self):
-        """图像处理-修改局部API"""
-        return self.call_workflow_api("修改局部", "图像处理")
-        
-    def api_img_quchu(self):
-        """图像处理-AI去除万物API"""
-        return self.call_workflow_api("AI去除万物", "图像处理")
-        
-    def api_img_shuiyin(self):
-        """图像处理-AI去水印API"""
-        return self.call_workflow_api("AI去水印", "图像处理")
-        
-    def api_img_zengjia(self):
-        """图像处理-增加物体API"""
-        return self.call_workflow_api("增加物体", "图像处理")
-        
-    def api_img_zengjia_zhiding(self):
-        """图像处理-增加物体（指定物体）API"""
-        return self.call_workflow_api("增加物体（指定物体）", "图像处理")
-        
-    def api_img_tihuan_chanpin(self):
-        """图像处理-替换（产品）API"""
-        return self.call_workflow_api("替换（产品）", "图像处理")
-        
-    def api_img_tihuan_beijing(self):
-        """图像处理-替换（背景天花）API"""
-        return self.call_workflow_api("替换（背景天花）", "图像处理")
-        
-    def api_img_kuotu(self):
-        """图像处理-扩图API"""
-        return self.call_workflow_api("扩图", "图像处理")
-        
-    def api_img_xitu(self):
-        """图像处理-洗图API"""
-        return self.call_workflow_api("洗图", "图像处理")
-        
-    def api_img_enhance(self):
-        """图像处理-图像增强API"""
-        return self.call_workflow_api("图像增强", "图像处理")
-        
-    def api_img_rongtu(self):
-        """图像处理-溶图（局部）API"""
-        return self.call_workflow_api("溶图（局部）", "图像处理")
-        
-    def api_img_fangda(self):
-        """图像处理-放大出图API"""
-        return self.call_workflow_api("放大出图", "图像处理")
-        
-    def api_img_repair(self):
-        """图像处理-老照片修复API"""
-        return self.call_workflow_api("老照片修复", "图像处理")
-
-    def call_api_default(self, option):
-        print(f"[API] 默认: {option}")
-        # TODO: 其它情况的API调用
-        pass
-
-    # =========================
-    # 核心API调用方法
-    # =========================
-    
-    def call_workflow_api(self, option_name, tab_name):
-        """调用工作流API"""
-        try:
-            print(f"调用API: {tab_name}-{option_name}")
-            
-            # 显示任务进度条
-            main_panel = self.get_main_panel()
-            if main_panel:
-                main_panel.show_task_progress(True)
-                main_panel.update_task_progress(0, "准备中...")
-            
-            # 0. 检查登录状态，如果没有token则强制登录
-            print("🔐 检查登录状态...")
-            login_data = get_auto_login_info()
-            if not login_data or not login_data.get('token'):
-                print("❌ 没有找到token，需要先登录")
-                self.show_error_message("请先登录，获取token后才能调用API")
-                if main_panel:
-                    main_panel.show_task_progress(False)
-                return None
-            else:
-                print(f"✅ 找到token: {login_data.get('token')[:20]}...")
-            
-            # 1. 在获取主视角视图之前先隐藏UI元素
-            print("🎯 开始隐藏UI元素...")
-            try:
-                import pymxs
-                rt = pymxs.runtime
-                hide_ui_code = '''
-try (
-    -- 隐藏ViewCube
-    viewport.setLayout #layout_1
-    print "✅ ViewCube已隐藏"
-    
-    -- 隐藏状态栏
-    statusPanel.visible = false
-    print "✅ 状态栏已隐藏"
-    
-    -- 隐藏视口控制栏（投影模式、着色模式等）
-    try (
-        -- 隐藏视口标签栏和按钮
-        viewport.setLayout #layout_1
-        -- 尝试隐藏视口控制元素
-        actionMan.executeAction 0 "40140"  -- 隐藏命令面板
-        print "✅ 视口控制栏已隐藏"
-    ) catch (
-        print "⚠️ 隐藏视口控制栏失败"
-    )
-    
-    -- 隐藏坐标轴系统
-    try (
-        -- 隐藏坐标轴
-        coordinateSystem.visible = false
-        print "✅ 坐标轴系统已隐藏"
-    ) catch (
-        print "⚠️ 隐藏坐标轴系统失败"
-    )
-    
-    -- 隐藏视口边框和标签
-    try (
-        -- 设置视口为全屏模式
-        viewport.setLayout #layout_1
-        -- 隐藏视口标签
-        viewport.setLayout #layout_1
-        print "✅ 视口边框已隐藏"
-    ) catch (
-        print "⚠️ 隐藏视口边框失败"
-    )
-    
-    -- 尝试隐藏更多UI元素
-    try (
-        -- 隐藏工具栏
-        toolbar.visible = false
-        print "✅ 工具栏已隐藏"
-    ) catch (
-        print "⚠️ 隐藏工具栏失败"
-    )
-    
-    -- 尝试隐藏视口控制按钮
-    try (
-        -- 隐藏视口控制按钮
-        viewport.setLayout #layout_1
-        print "✅ 视口控制按钮已隐藏"
-    ) catch (
-        print "⚠️ 隐藏视口控制按钮失败"
-    )
+                print(f"  tabWidget.parent(): {tabWidget.parent() if tabWidget else None}")
+                
+        if tabWidget and hasattr(tabWidget, 'parent') and tabWidget.parent() and hasattr(tabWidget.parent(), 'tabWidget'):
+            idx = tabWidget.parent().tabWidget.currentIndex()
+            tabName = tabWidget.parent().tabWidget.tabText(idx)
+            print(f"  tabWidget.parent().tabWidget: {tabWidget.parent().tabWidget}")
+            print(f"  currentIndex: {idx}")
+            print(f"  tabText: {tabName}")
+        else:
+            print(f"  ❌ 无法获取Tab信息")
+            
+        option = self.comboBox.currentText()
+        print(f"  option: {option}")
+        print(f"  tabName: '{tabName}'")
+        
+        # 按(Tab, 选项)在工作流注册表中查找
+        workflow = get_workflow_registry().get(tabName, option)
+        if workflow:
+            print(f"✅ 调用{tabName}API: {option} (workType={workflow.work_type})")
+            self.call_workflow_api(option, tabName)
+        else:
+            print(f"❌ 未匹配的选项: '{tabName}-{option}'，调用默认API")
+            self.call_api_default(option)
+
+    def call_api_default(self, option):
+        print(f"[API] 默认: {option}")
+        # TODO: 其它情况的API调用
+        pass
+
+    # =========================
+    # 核心API调用方法
+    # =========================
     
-    print "🎯 主视角UI元素隐藏完成"
-) catch (
-    print "⚠️ 隐藏UI元素时出现错误"
-)
-'''
-                rt.execute(hide_ui_code)
-                print("✅ UI元素隐藏成功")
-            except Exception as e:
-                print(f"⚠️ 隐藏UI元素失败: {str(e)}")
+    def call_workflow_api(self, option_name, tab_name):
+        """调用工作流API（截图在界面线程完成，上传和提交在后台线程执行）"""
+        try:
+            print(f"调用API: {tab_name}-{option_name}")
             
-            # 2. 自动获取主视角视图作为原始图像
-            print("📷 自动获取主视角视图...")
+            # 显示任务进度条
+            main_panel = self.get_main_panel()
             if main_panel:
-                main_panel.update_task_progress(10, "获取主视角视图...")
+                main_panel.show_task_progress(True)
+                main_panel.update_task_progress(0, "准备中...")
             
-            original_image_path = self.capture_max_view()
-            if not original_image_path:
-                self.show_error_message("主视角视图获取失败")
+            # 0. 检查登录状态，如果没有token则强制登录
+            print("🔐 检查登录状态...")
+            login_data = get_auto_login_info()
+            if not login_data or not login_data.get('token'):
+                print("❌ 没有找到token，需要先登录")
+                self.show_error_message("请先登录，获取token后才能调用API")
                 if main_panel:
                     main_panel.show_task_progress(False)
                 return None
-                
-            # 2. 上传图像到服务器
-            print("📤 上传主视角图像...")
+            else:
+                print(f"✅ 找到token: {login_data.get('token')[:20]}...")
+            
+            # 1. 在获取主视角视图之前先隐藏UI元素
+            self._hide_max_ui()
+            
+            # 2. 自动获取主视角视图作为原始图像
+            print("📷 自动获取主视角视图...")
             if main_panel:
-                main_panel.update_task_progress(20, "上传主视角图像...")
-            original_image_url = self.upload_image(original_image_path)
-            if not original_image_url:
-                print("❌ 主视角图像上传失败")
-                self.show_error_message("主视角图像上传失败")
+                main_panel.update_task_progress(10, "获取主视角视图...")
+            
+            original_image = self.capture_max_view_image()
+            # 截图完成后立即恢复UI，不必等待网络请求
+            self._restore_max_ui()
+            if original_image is None:
+                self.show_error_message("主视角视图获取失败")
                 if main_panel:
                     main_panel.show_task_progress(False)
                 return None
-            print(f"✅ 主视角图像上传成功: {original_image_url}")
                 
             # 3. 获取用户上传的图像作为参考图像
-            reference_image_url = None
             reference_image_path = self.get_uploaded_image_path()
             print(f"🔍 检查参考图像路径: {reference_image_path}")
-            if reference_image_path and os.path.exists(reference_image_path):
-                print("📤 上传参考图像...")
-                if main_panel:
-                    main_panel.update_task_progress(30, "上传参考图像...")
-                reference_image_url = self.upload_image(reference_image_path)
-                if reference_image_url:
-                    print(f"✅ 参考图像上传成功: {reference_image_url}")
-                else:
-                    print("⚠️ 参考图像上传失败，继续处理")
-            else:
-                print("⚠️ 没有找到参考图像或文件不存在")
-                if not reference_image_path:
-                    print("❌ 参考图像路径为空")
-                elif not os.path.exists(reference_image_path):
-                    print(f"❌ 参考图像文件不存在: {reference_image_path}")
                 
             # 4. 获取工作类型
             work_type_key = f"{tab_name}-{option_name}"
-            work_type = WORK_TYPE_MAP.get(work_type_key, 100)
+            registry = get_workflow_registry()
+            workflow = registry.get(tab_name, option_name)
+            work_type = workflow.work_type if workflow else 100
             print(f"🔍 工作类型映射: {work_type_key} -> {work_type}")
             
             # 5. 获取提示词（支持多提示词）
             multi_prompts = self.get_multi_prompts()
-            prompt_text = multi_prompts[0] if multi_prompts else "默认提示词"
-            prompt_one = multi_prompts[1] if len(multi_prompts) > 1 else ""
-            prompt_two = multi_prompts[2] if len(multi_prompts) > 2 else ""
-            
-            print(f"📝 提示词配置:")
-            print(f"  - 主要提示词: {prompt_text}")
-            print(f"  - 提示词1: {prompt_one}")
-            print(f"  - 提示词2: {prompt_two}")
+            print(f"📝 提示词配置: {multi_prompts}")
             
             # 6. 获取高级参数
-            strength_value = self.get_strength_value()
-            weight_value = self.get_weight_value()
-            weight_one_value = self.get_weight_one_value()
-            start_value = self.get_start_value()
-            end_value = self.get_end_value()
-            pixel_value = self.get_pixel_value()
-            is_vertical = self.get_is_vertical()
-            enhance_value = self.get_enhance_value()
+            advanced = {
+                "控制强度": self.get_strength_value(),
+                "参考图权重": self.get_weight_value(),
+                "参考图权重2": self.get_weight_one_value(),
+                "控制开始时间": self.get_start_value(),
+                "控制结束时间": self.get_end_value(),
+                "像素值": self.get_pixel_value(),
+                "是否竖屏": self.get_is_vertical(),
+                "增强细节": self.get_enhance_value()
+            }
             
             # 7. 根据选项确定需要的参数
-            work_type_key = f"{tab_name}-{option_name}"
-            required_params = self.PARAM_REQUIREMENTS.get(option_name, [])
-            if not required_params:
-                # 如果没有找到具体选项，尝试使用Tab+选项的组合
-                required_params = self.PARAM_REQUIREMENTS.get(work_type_key, ["workName", "workStrong", "workWeight", "workStart", "workEnd"])
+            required_params = workflow.params if workflow else registry.default_params
             
             print(f"🎚️ 参数需求分析:")
             print(f"  - 选项: {option_name}")
             print(f"  - 工作类型键: {work_type_key}")
             print(f"  - 需要参数: {required_params}")
             
-            # 8. 动态构建参数
-            params = {
-                "workOriginAvatar": original_image_url,      # 主视角视图作为原始图像（URL）
-                "workType": work_type,
-                "workReferenceAvatar": reference_image_url if reference_image_url else "",  # 参考图像（URL）
-                "workExtendAvatar": "",                     # 扩展图像1 (暂时为空)
-                "workExtendAvatarOne": "",                  # 扩展图像2 (暂时为空)
-                "workId": "",                               # 工作ID (暂时为空)
-                "workFlowId": "",                           # 工作流ID (暂时为空)
-                "workMask": "",                             # 遮罩1 (必填，但可以为空)
-                "workMaskOne": ""                           # 遮罩2 (必填，但可以为空)
-            }
-            
-            # 根据需要的参数动态添加
-            if "workName" in required_params:
-                params["workName"] = prompt_text
-            if "workNameOne" in required_params:
-                params["workNameOne"] = prompt_one
-            if "workNameTwo" in required_params:
-                params["workNameTwo"] = prompt_two
-            if "workStrong" in required_params:
-                params["workStrong"] = strength_value
-            if "workStrongOne" in required_params:
-                params["workStrongOne"] = strength_value
-            if "workWeight" in required_params:
-                params["workWeight"] = weight_value
-            if "workWeightOne" in required_params:
-                params["workWeightOne"] = weight_one_value
-            if "workStart" in required_params:
-                params["workStart"] = start_value
-            if "workEnd" in required_params:
-                params["workEnd"] = end_value
-            if "workPixel" in required_params:
-                params["workPixel"] = pixel_value
-            if "workIsVertical" in required_params:
-                params["workIsVertical"] = is_vertical
-            if "workEnhance" in required_params:
-                params["workEnhance"] = enhance_value
+            # 8. 动态构建参数（图像URL在后台上传完成后填入）
+            params = build_workflow_params(workflow, multi_prompts, advanced)
             
             print(f"🎚️ 最终参数配置:")
             for key, value in params.items():
-                if key in ["workOriginAvatar", "workReferenceAvatar", "workExtendAvatar", "workExtendAvatarOne", "workId", "workFlowId", "workMask", "workMaskOne"]:
+                if key in WORKFLOW_FIXED_PARAMS:
                     continue  # 跳过固定参数
                 print(f"  - {key}: {value}")
             
-            print(f"🚀 发送立即生成请求:")
-            print(f"📋 请求参数: {json.dumps(params, ensure_ascii=False, indent=2)}")
-            
+            # 9. 上传图像并提交工作流（后台线程，点击取消任务时中止上传）
+            cancel_token = self._operation_token()
+            job_info = {"tab": tab_name, "option": option_name, "work_type": work_type, "params": params}
+            executor = get_network_executor()
+            progress_callback = None
             if main_panel:
-                main_panel.update_task_progress(40, "发送API请求...")
-            
-            response = self.call_api_request(API_ENDPOINTS["workflow"], params)
-            
-            if response and response.get("code") == 0:
-                print(f"✅ 立即生成请求成功:")
-                print(f"📥 响应数据: {json.dumps(response, ensure_ascii=False, indent=2)}")
-                
-                # 获取任务ID - 从响应数据中提取正确的ID
-                work_id = response.get("data", {}).get("workId")
-                task_id = response.get("data", {}).get("resultTask", {}).get("data", {}).get("taskId")
-                flow_id = response.get("data", {}).get("flowId")
-                
-                if work_id:
-                    print(f"🆔 工作ID: {work_id}")
-                    print(f"🔄 流程ID: {flow_id}")
-                    print(f"📋 任务ID: {task_id}")
-                    print(f"🎉 任务已提交，开始监控进度...")
-                    if main_panel:
-                        main_panel.update_task_progress(50, "任务已提交，开始监控...")
-                    # 重新启用任务监控，使用正确的工作ID和流程ID
-                    self.monitor_task_progress(work_id, flow_id)
-                else:
-                    print("⚠️ 未获取到任务ID，无法监控进度")
-                    if main_panel:
-                        main_panel.show_task_progress(False)
-                
-                self.show_success_message("任务已提交，正在处理中...")
+                progress_callback = lambda value, text: executor.run_in_gui_thread(
+                    main_panel.update_task_progress, value, text)
+            executor.submit(
+                upload_and_submit_workflow,
+                original_image, reference_image_path, params, progress_callback, cancel_token,
+                on_success=lambda response: self._on_workflow_submitted(response, main_panel, cancel_token,
+                                                                        job_info),
+                on_error=lambda error: self._on_workflow_cancelled() if cancel_token.cancelled
+                    else self._on_workflow_failed(f"API调用异常: {error}", main_panel)
+            )
+            return None
                 
-                # 恢复UI元素
-                print("🎯 开始恢复UI元素...")
-                try:
-                    import pymxs
-                    rt = pymxs.runtime
-                    restore_ui_code = '''
+        except Exception as e:
+            print(f"API调用异常: {str(e)}")
+            self.show_error_message(f"API调用异常: {str(e)}")
+            # 隐藏进度条
+            main_panel = self.get_main_panel()
+            if main_panel:
+                main_panel.show_task_progress(False)
+            self._restore_max_ui()
+            return None
+
+    def _on_workflow_submitted(self, response, main_panel, cancel_token=None, job_info=None):
+        """界面线程：处理立即生成请求的响应，提交成功的任务先写入任务日志再开始监控"""
+        work_id = response.get("data", {}).get("workId") if response and response.get("code") == 0 else None
+        if work_id:
+            get_job_journal().record_submitted(work_id, response.get("data", {}).get("flowId"), **(job_info or {}))
+        if response and response.get("code") == 0 and cancel_token and cancel_token.cancelled:
+            # 请求发出后才点击的取消，服务器已经创建了任务，直接请求取消
+            if work_id:
+                task = get_task_manager().cancel(work_id, response.get("data", {}).get("flowId"))
+                task.cancelled.connect(self._on_task_cancelled)
+            else:
+                self._on_workflow_cancelled()
+            return
+        if response and response.get("code") == 0:
+            print(f"✅ 立即生成请求成功:")
+            print(f"📥 响应数据: {json.dumps(response, ensure_ascii=False, indent=2)}")
+            
+            # 获取任务ID - 从响应数据中提取正确的ID
+            work_id = response.get("data", {}).get("workId")
+            task_id = response.get("data", {}).get("resultTask", {}).get("data", {}).get("taskId")
+            flow_id = response.get("data", {}).get("flowId")
+            
+            if work_id:
+                print(f"🆔 工作ID: {work_id}")
+                print(f"🔄 流程ID: {flow_id}")
+                print(f"📋 任务ID: {task_id}")
+                print(f"🎉 任务已提交，开始监控进度...")
+                if main_panel:
+                    main_panel.update_task_progress(50, "任务已提交，开始监控...")
+                # 重新启用任务监控，使用正确的工作ID和流程ID
+                self.monitor_task_progress(work_id, flow_id)
+            else:
+                print("⚠️ 未获取到任务ID，无法监控进度")
+                if main_panel:
+                    main_panel.show_task_progress(False)
+            
+            self.show_success_message("任务已提交，正在处理中...")
+        else:
+            if response is None:
+                self._on_workflow_failed(WORKFLOW_SUBMIT_UNCERTAIN_MESSAGE, main_panel)
+                return
+            error_msg = response.get("msg", "未知错误")
+            print(f"❌ 立即生成请求失败: {error_msg}")
+            self._on_workflow_failed(f"API调用失败: {error_msg}", main_panel)
+
+    def _on_workflow_cancelled(self):
+        """界面线程：上传或提交过程中被取消"""
+        print("🛑 已取消提交，未完成的上传已中止")
+        self._hide_progress_if_idle()
+
+    def _on_workflow_failed(self, message, main_panel):
+        """界面线程：上传或提交失败"""
+        print(f"❌ {message}")
+        self.show_error_message(message)
+        if main_panel:
+            main_panel.show_task_progress(False)
+
+    def _hide_max_ui(self):
+        """截图前隐藏3ds Max的界面元素（ViewCube、状态栏、工具栏等）"""
+        print("🎯 开始隐藏UI元素...")
+        try:
+            import pymxs
+            rt = pymxs.runtime
+            hide_ui_code = '''
 try (
-    -- 恢复ViewCube
+    -- 隐藏ViewCube
     viewport.setLayout #layout_1
-    print "✅ ViewCube已恢复"
+    print "✅ ViewCube已隐藏"
     
-    -- 恢复状态栏
-    statusPanel.visible = true
-    print "✅ 状态栏已恢复"
+    -- 隐藏状态栏
+    statusPanel.visible = false
+    print "✅ 状态栏已隐藏"
     
-    -- 恢复视口控制栏
+    -- 隐藏视口控制栏（投影模式、着色模式等）
     try (
-        -- 恢复视口标签栏
+        -- 隐藏视口标签栏和按钮
         viewport.setLayout #layout_1
-        -- 恢复命令面板
-        actionMan.executeAction 0 "40140"
-        print "✅ 视口控制栏已恢复"
+        -- 尝试隐藏视口控制元素
+        actionMan.executeAction 0 "40140"  -- 隐藏命令面板
+        print "✅ 视口控制栏已隐藏"
     ) catch (
-        print "⚠️ 恢复视口控制栏失败"
+        print "⚠️ 隐藏视口控制栏失败"
     )
     
-    -- 恢复坐标轴系统
+    -- 隐藏坐标轴系统
     try (
-        -- 恢复坐标轴
-        coordinateSystem.visible = true
-        print "✅ 坐标轴系统已恢复"
+        -- 隐藏坐标轴
+        coordinateSystem.visible = false
+        print "✅ 坐标轴系统已隐藏"
     ) catch (
-        print "⚠️ 恢复坐标轴系统失败"
+        print "⚠️ 隐藏坐标轴系统失败"
     )
     
-    -- 恢复视口边框和标签
+    -- 隐藏视口边框和标签
     try (
-        -- 恢复视口布局
+        -- 设置视口为全屏模式
         viewport.setLayout #layout_1
-        print "✅ 视口边框已恢复"
-    ) catch (
-        print "⚠️ 恢复视口边框失败"
-    )
-    
-    -- 恢复工具栏
-    try (
-        -- 恢复工具栏
-        toolbar.visible = true
-        print "✅ 工具栏已恢复"
-    ) catch (
-        print "⚠️ 恢复工具栏失败"
-    )
-    
-    print "🎯 主视角UI元素恢复完成"
-) catch (
-    print "⚠️ 恢复UI元素时出现错误"
-)
-'''
-                    rt.execute(restore_ui_code)
-                    print("✅ UI元素恢复成功")
-                except Exception as restore_e:
-                    print(f"⚠️ 恢复UI元素失败: {str(restore_e)}")
-                
-                return response
-            else:
-                error_msg = response.get("msg", "未知错误") if response else "网络错误"
-                print(f"❌ 立即生成请求失败: {error_msg}")
-                self.show_error_message(f"API调用失败: {error_msg}")
-                if main_panel:
-                    main_panel.show_task_progress(False)
-                
-                # 恢复UI元素
-                print("🎯 开始恢复UI元素...")
-                try:
-                    import pymxs
-                    rt = pymxs.runtime
-                    restore_ui_code = '''
-try (
-    -- 恢复ViewCube
-    viewport.setLayout #layout_1
-    print "✅ ViewCube已恢复"
-    
-    -- 恢复状态栏
-    statusPanel.visible = true
-    print "✅ 状态栏已恢复"
-    
-    -- 恢复视口控制栏
-    try (
-        -- 恢复视口标签栏
+        -- 隐藏视口标签
         viewport.setLayout #layout_1
-        -- 恢复命令面板
-        actionMan.executeAction 0 "40140"
-        print "✅ 视口控制栏已恢复"
+        print "✅ 视口边框已隐藏"
     ) catch (
-        print "⚠️ 恢复视口控制栏失败"
+        print "⚠️ 隐藏视口边框失败"
     )
     
-    -- 恢复坐标轴系统
+    -- 尝试隐藏更多UI元素
     try (
-        -- 恢复坐标轴
-        coordinateSystem.visible = true
-        print "✅ 坐标轴系统已恢复"
+        -- 隐藏工具栏
+        toolbar.visible = false
+        print "✅ 工具栏已隐藏"
     ) catch (
-        print "⚠️ 恢复坐标轴系统失败"
+        print "⚠️ 隐藏工具栏失败"
     )
     
-    -- 恢复视口边框和标签
+    -- 尝试隐藏视口控制按钮
     try (
-        -- 恢复视口布局
+        -- 隐藏视口控制按钮
         viewport.setLayout #layout_1
-        print "✅ 视口边框已恢复"
-    ) catch (
-        print "⚠️ 恢复视口边框失败"
-    )
-    
-    -- 恢复工具栏
-    try (
-        -- 恢复工具栏
-        toolbar.visible = true
-        print "✅ 工具栏已恢复"
+        print "✅ 视口控制按钮已隐藏"
     ) catch (
-        print "⚠️ 恢复工具栏失败"
+        print "⚠️ 隐藏视口控制按钮失败"
     )
     
-    print "🎯 主视角UI元素恢复完成"
+    print "🎯 主视角UI元素隐藏完成"
 ) catch (
-    print "⚠️ 恢复UI元素时出现错误"
+    print "⚠️ 隐藏UI元素时出现错误"
 )
 '''
-                    rt.execute(restore_ui_code)
-                    print("✅ UI元素恢复成功")
-                except Exception as restore_e:
-                    print(f"⚠️ 恢复UI元素失败: {str(restore_e)}")
-                
-                return None
-                
+            rt.execute(hide_ui_code)
+            print("✅ UI元素隐藏成功")
         except Exception as e:
-            print(f"API调用异常: {str(e)}")
-            self.show_error_message(f"API调用异常: {str(e)}")
-            # 隐藏进度条
-            main_panel = self.get_main_panel()
-            if main_panel:
-                main_panel.show_task_progress(False)
-            
-            # 恢复UI元素
-            print("🎯 开始恢复UI元素...")
-            try:
-                import pymxs
-                rt = pymxs.runtime
-                restore_ui_code = '''
+            print(f"⚠️ 隐藏UI元素失败: {str(e)}")
+    
+    def _restore_max_ui(self):
+        """恢复截图前隐藏的3ds Max界面元素"""
+        print("🎯 开始恢复UI元素...")
+        try:
+            import pymxs
+            rt = pymxs.runtime
+            restore_ui_code = '''
 try (
     -- 恢复ViewCube
     viewport.setLayout #layout_1
@@ -2467,15 +6607,13 @@ try (
     print "⚠️ 恢复UI元素时出现错误"
 )
 '''
-                rt.execute(restore_ui_code)
-                print("✅ UI元素恢复成功")
-            except Exception as restore_e:
-                print(f"⚠️ 恢复UI元素失败: {str(restore_e)}")
-            
-            return None
+            rt.execute(restore_ui_code)
+            print("✅ UI元素恢复成功")
+        except Exception as restore_e:
+            print(f"⚠️ 恢复UI元素失败: {str(restore_e)}")
     
     def monitor_task_progress(self, task_id, flow_id=None):
-        """监控任务进度 - 优化版本，减少不必要的请求"""
+        """监控任务进度 - 交给全局任务管理器，多个任务可以同时监控"""
         print(f"📊 开始监控任务进度: {task_id}")
         if flow_id:
             print(f"🔄 流程ID: {flow_id}")
@@ -2486,302 +6624,254 @@ try (
             main_panel.show_task_progress(True)
             main_panel.update_task_progress(0, "准备中...")
         
-        # 使用QTimer进行异步监控，避免阻塞主线程
-        self.monitor_timer = QtCore.QTimer()
-        self.monitor_timer.timeout.connect(lambda: self._monitor_task_step(task_id, flow_id, main_panel))
-        
-        # 监控状态变量 - 优化配置
-        self.monitor_attempt = 0
-        self.monitor_max_attempts = 120  # 增加最大尝试次数（因为间隔变短）
-        self.monitor_consecutive_failures = 0
-        self.monitor_last_progress = -1
-        self.monitor_last_status = None
-        self.monitor_stable_count = 0  # 稳定状态计数
-        self.monitor_task_id = task_id
-        self.monitor_flow_id = flow_id
-        
-        # 开始监控，初始间隔0.5秒
-        self.monitor_timer.start(500)  # 0.5秒间隔
-        
-        # 立即执行第一次查询
-        QtCore.QTimer.singleShot(100, lambda: self._monitor_task_step(task_id, flow_id, main_panel))
-    
-    def _monitor_task_step(self, task_id, flow_id, main_panel):
-        """单次任务监控步骤 - 优化版本"""
-        self.monitor_attempt += 1
-        print(f"🔄 第{self.monitor_attempt}次查询任务进度...")
-        
-        # 查询任务状态
-        status_response = self.query_task_status(task_id, flow_id)
-        if not status_response:
-            self.monitor_consecutive_failures += 1
-            print(f"❌ 第{self.monitor_attempt}次查询任务状态失败 (连续失败: {self.monitor_consecutive_failures})")
-            
-            # 更新进度条显示错误状态
-            if main_panel:
-                main_panel.update_task_progress(0, f"查询失败 ({self.monitor_consecutive_failures}/3)")
-            
-            # 如果连续失败超过3次，停止监控
-            if self.monitor_consecutive_failures >= 3:
-                print(f"⚠️ 连续失败{self.monitor_consecutive_failures}次，停止监控")
-                self.show_error_message("任务监控失败，请手动检查任务状态")
-                if main_panel:
-                    main_panel.show_task_progress(False)
-                self._stop_monitoring()
-                return
-            
-            # 继续监控
-            return
-        
-        # 重置连续失败计数
-        self.monitor_consecutive_failures = 0
-        
-        # 获取任务状态和进度
-        task_data = status_response.get("data", {})
-        work_status = task_data.get("workStatus", 0)
-        work_current = task_data.get("workCurrent", 0)
-        work_number = task_data.get("workNumber", 100)
-        
-        # 状态映射（根据API文档修正）
-        status_map = {
-            0: "待处理",
-            10: "运行中", 
-            20: "已完成",
-            30: "失败",
-            40: "已取消"
-        }
-        status_text = status_map.get(work_status, f"未知状态({work_status})")
-        
-        # 使用API返回的总进度值
-        if work_status == 20:  # 已完成
-            progress = 100
-        elif work_status == 10:  # 运行中
-            # 直接使用workNumber作为总进度值
-            progress = work_number if work_number > 0 else 0
-        elif work_status == 0:  # 待处理
-            progress = 0
-        else:
-            progress = 0
-        
-        print(f"📈 任务进度: {progress}% (状态: {status_text})")
-        print(f"📊 详细信息: 等待人数{work_current}, API总进度{work_number}%, 状态码{work_status}")
-        
-        # 更新主界面进度条
+        if not hasattr(self, 'monitored_tasks'):
+            self.monitored_tasks = set()
+        task = get_task_manager().track(task_id, flow_id)
+        self.monitored_tasks.add(task.task_id)
+        previous = task.owner
+        if previous is not self:
+            # 任务原来由已关闭的面板显示时由本页面接管，旧页面不再显示也不再取消它
+            if previous is not None:
+                getattr(previous, 'monitored_tasks', set()).discard(task.task_id)
+            task.bind(self, self._on_task_progress, self._on_task_finished,
+                      self._on_task_failed, self._on_task_cancelled)
+    
+    def _task_status_prefix(self):
+        """多个任务同时进行时在状态文本前显示任务数"""
+        count = get_task_manager().active_count()
+        return f"[{count}个任务] " if count > 1 else ""
+    
+    def _on_task_progress(self, task_id, progress, status_text):
+        """界面线程：任务进度更新"""
+        main_panel = self.get_main_panel()
         if main_panel:
-            main_panel.update_task_progress(progress, status_text)
+            main_panel.update_task_progress(progress, self._task_status_prefix() + status_text)
+    
+    def _on_task_finished(self, task_id, task_data, task_details):
+        """界面线程：任务完成，显示结果图片"""
+        self.monitored_tasks.discard(task_id)
+        image_urls = parse_result_urls(task_details.get("data") if task_details else None)
+        if image_urls:
+            print(f"🖼️ 获取到{len(image_urls)}张结果图片: {image_urls}")
+            self._display_result_urls(image_urls)
+        else:
+            print("❌ 未获取到图片URL")
         
-        # 智能间隔调整 - 基于状态稳定性
-        current_state = (work_status, progress)
-        if current_state == self.monitor_last_status:
-            self.monitor_stable_count += 1
+        self.show_success_message("任务完成！进度: 100%")
+        self._hide_progress_if_idle()
+    
+    def _on_task_failed(self, task_id, message):
+        """界面线程：任务失败或监控停止"""
+        self.monitored_tasks.discard(task_id)
+        self.show_error_message(message)
+        self._hide_progress_if_idle()
+    
+    def _on_task_cancelled(self, task_id, work_status):
+        """界面线程：服务器对取消请求的确认结果"""
+        getattr(self, 'monitored_tasks', set()).discard(task_id)
+        if work_status == 40:
+            self.show_success_message("任务已取消")
+        elif work_status == 20:
+            self.show_success_message("任务在取消前已经完成")
+        elif work_status == 30:
+            self.show_error_message("任务在取消前已经失败")
         else:
-            self.monitor_stable_count = 0
-            self.monitor_last_status = current_state
+            self.show_error_message("已停止监控，但服务器未确认取消，请稍后检查任务状态")
+        self._hide_progress_if_idle()
+    
+    def _hide_progress_if_idle(self):
+        """没有进行中或等待取消确认的任务时隐藏进度条"""
+        main_panel = self.get_main_panel()
+        manager = get_task_manager()
+        if main_panel and manager.active_count() == 0 and manager.cancelling_count() == 0:
+            main_panel.show_task_progress(False)
+    
+    def _operation_token(self):
+        """本页面当前的取消标记，上传、提交和下载开始时取得，取消后换成新的标记"""
+        if getattr(self, '_cancelToken', None) is None:
+            self._cancelToken = CancelToken()
+        return self._cancelToken
+    
+    def cancel_tasks(self):
+        """
+        取消本页面正在进行的上传、提交、任务监控和结果下载，并请求服务器取消任务
         
-        # 如果任务完成
-        if work_status == 20:
-            print(f"🎉 任务完成！进度: {progress}%")
-            
-            # 获取任务详情和图片URL
-            task_details = self.get_task_details(task_id)
-            if task_details and task_details.get("data", {}).get("workUrl"):
-                work_url = task_details["data"]["workUrl"]
-                print(f"🖼️ 获取到图片URL: {work_url}")
-                
-                # 解析图片URL（可能是JSON字符串）
-                try:
-                    import json
-                    if work_url.startswith('[') and work_url.endswith(']'):
-                        # 如果是JSON数组格式
-                        url_list = json.loads(work_url)
-                        if url_list:
-                            image_url = url_list[0]  # 取第一张图片
-                            print(f"🖼️ 解析到图片地址: {image_url}")
-                            
-                            # 显示图片到主视角区域
-                            self.display_result_image(image_url)
-                        else:
-                            print("❌ 图片URL列表为空")
-                    else:
-                        # 如果是单个URL字符串
-                        print(f"🖼️ 单个图片地址: {work_url}")
-                        self.display_result_image(work_url)
-                except Exception as e:
-                    print(f"❌ 解析图片URL失败: {str(e)}")
-                    print(f"📋 原始URL: {work_url}")
-            else:
-                print("❌ 未获取到图片URL")
-            
-            self.show_success_message(f"任务完成！进度: {progress}%")
-            if main_panel:
-                main_panel.show_task_progress(False)
-            
-            # 立即停止监控，不再继续查询
-            print("🛑 任务完成，停止监控")
-            self._stop_monitoring()
+        返回需要等待服务器确认取消的任务数
+        """
+        token = getattr(self, '_cancelToken', None)
+        if token is not None:
+            token.cancel()
+            self._cancelToken = None
+        for dialog in (getattr(self, '_batchDialog', None), getattr(self, '_matrixDialog', None)):
+            if dialog is not None and dialog.queue is not None:
+                dialog.queue.cancel()
+        # 丢弃仍在下载的结果图库回调
+        self.resultGalleryGeneration = getattr(self, 'resultGalleryGeneration', 0) + 1
+        manager = get_task_manager()
+        task_ids = list(getattr(self, 'monitored_tasks', ()))
+        for task_id in task_ids:
+            manager.cancel(task_id)
+        return len(task_ids)
+    
+    def _display_result_urls(self, image_urls):
+        """只有一张结果时直接显示，多张结果时显示缩略图库供选择"""
+        if len(image_urls) == 1:
+            if hasattr(self, 'resultGallery'):
+                self.resultGallery.hide()
+            self.display_result_image(image_urls[0])
+        else:
+            self.display_result_gallery(image_urls)
+    
+    def display_result_image(self, image_url):
+        """显示结果图片到主视角区域（后台流式下载，下载过程中显示进度和预览图）"""
+        print(f"🖼️ 开始下载并显示图片: {image_url}")
+        executor = get_network_executor()
+        progress_state = {"percent": None}
+        
+        def on_progress(received, total):
+            # 下载线程：只在百分比变化时通知界面
+            percent = int(received * 100 / total) if total else None
+            if percent is not None and percent == progress_state["percent"]:
+                return
+            progress_state["percent"] = percent
+            executor.run_in_gui_thread(self._on_result_download_progress, received, total)
+        
+        def on_preview(image):
+            executor.run_in_gui_thread(self._show_result_preview, image)
+        
+        cancel_token = self._operation_token()
+        executor.submit(
+            get_result_cache().fetch, image_url,
+            progress_callback=on_progress,
+            preview_callback=on_preview,
+            cancel_token=cancel_token,
+            on_success=self._show_result_image,
+            on_error=lambda error: self._hide_progress_if_idle() if cancel_token.cancelled
+                else self._on_result_download_failed(error)
+        )
+    
+    def display_result_gallery(self, image_urls):
+        """后台并发下载全部结果图片并解码缩略图，默认选中第一张"""
+        print(f"🖼️ 开始下载{len(image_urls)}张结果图片")
+        executor = get_network_executor()
+        gallery = self._ensure_result_gallery()
+        gallery.setCount(len(image_urls))
+        gallery.setCurrentIndex(0)
+        gallery.show()
+        # 新的结果到达后丢弃上一批仍在下载的回调
+        self.resultGalleryGeneration = getattr(self, 'resultGalleryGeneration', 0) + 1
+        self.resultGalleryPaths = [None] * len(image_urls)
+        self.resultGalleryIndex = 0
+        generation = self.resultGalleryGeneration
+        
+        def on_item(index, path, thumbnail, preview):
+            executor.run_in_gui_thread(self._on_gallery_item_ready, generation, index, path, thumbnail, preview)
+        
+        cancel_token = self._operation_token()
+        executor.submit(
+            download_result_images, image_urls,
+            item_callback=on_item,
+            cancel_token=cancel_token,
+            on_success=lambda paths: self._hide_progress_if_idle(),
+            on_error=lambda error: self._hide_progress_if_idle() if cancel_token.cancelled
+                else self._on_result_download_failed(error)
+        )
+    
+    def _on_gallery_item_ready(self, generation, index, path, thumbnail, preview):
+        """界面线程：一张结果图片下载完成，更新缩略图；当前选中的图片先显示预览图"""
+        if generation != self.resultGalleryGeneration:
             return
-        
-        # 检查是否进度很高但状态还是运行中（可能是API状态更新延迟）
-        if work_status == 10 and progress >= 80:
-            print(f"🔍 进度达到{progress}%但状态仍为运行中，主动检查任务详情...")
-            
-            # 主动获取任务详情检查是否有图片URL
-            task_details = self.get_task_details(task_id)
-            if task_details and task_details.get("data", {}).get("workUrl"):
-                work_url = task_details["data"]["workUrl"]
-                if work_url and work_url.strip():  # 如果有图片URL，说明任务已完成
-                    print(f"🎉 发现任务已完成！获取到图片URL: {work_url}")
-                    
-                    # 解析图片URL（可能是JSON字符串）
-                    try:
-                        import json
-                        if work_url.startswith('[') and work_url.endswith(']'):
-                            # 如果是JSON数组格式
-                            url_list = json.loads(work_url)
-                            if url_list:
-                                image_url = url_list[0]  # 取第一张图片
-                                print(f"🖼️ 解析到图片地址: {image_url}")
-                                
-                                # 显示图片到主视角区域
-                                self.display_result_image(image_url)
-                            else:
-                                print("❌ 图片URL列表为空")
-                        else:
-                            # 如果是单个URL字符串
-                            print(f"🖼️ 单个图片地址: {work_url}")
-                            self.display_result_image(work_url)
-                    except Exception as e:
-                        print(f"❌ 解析图片URL失败: {str(e)}")
-                        print(f"📋 原始URL: {work_url}")
-                    
-                    self.show_success_message(f"任务完成！进度: {progress}%")
-                    if main_panel:
-                        main_panel.show_task_progress(False)
-                    
-                    # 立即停止监控，不再继续查询
-                    print("🛑 任务完成，停止监控")
-                    self._stop_monitoring()
-                    return
-                else:
-                    print(f"⚠️ 进度{progress}%但未获取到图片URL，继续监控...")
-            else:
-                print(f"⚠️ 进度{progress}%但任务详情获取失败，继续监控...")
-        
-        # 如果任务失败
-        if work_status in [30, 40]:
-            print(f"❌ 任务失败，状态: {status_text}")
-            self.show_error_message(f"任务失败，状态: {status_text}")
-            if main_panel:
-                main_panel.show_task_progress(False)
-            
-            # 立即停止监控，不再继续查询
-            print("🛑 任务失败，停止监控")
-            self._stop_monitoring()
+        if not path or thumbnail is None:
+            self.resultGallery.setFailed(index)
             return
-        
-        # 检查是否超时
-        if self.monitor_attempt >= self.monitor_max_attempts:
-            print(f"⏰ 监控超时，已查询{self.monitor_max_attempts}次")
-            self.show_error_message("任务监控超时，请手动检查任务状态")
-            if main_panel:
-                main_panel.show_task_progress(False)
-            
-            # 立即停止监控，不再继续查询
-            print("🛑 监控超时，停止监控")
-            self._stop_monitoring()
+        self.resultGalleryPaths[index] = path
+        self.resultGallery.setThumbnail(index, thumbnail)
+        if index == self.resultGalleryIndex and preview is not None:
+            # 预览图可以点击，放大查看时才解码原图
+            widget = self._ensure_result_widget()
+            widget.setImage(QtGui.QPixmap.fromImage(preview), showOverlay=True)
+            widget.currentImagePath = path
+            widget.show()
+            if hasattr(self, 'captureBtn'):
+                self.captureBtn.setText("🖼️ 生成结果")
+    
+    def _on_gallery_image_selected(self, index):
+        """界面线程：选择缩略图后解码并显示对应的结果图片"""
+        self.resultGalleryIndex = index
+        path = self.resultGalleryPaths[index] if index < len(self.resultGalleryPaths) else None
+        if path:
+            self._show_result_image(path)
+    
+    def _ensure_result_gallery(self):
+        """创建结果缩略图库（只创建一次，位于结果图片上方）"""
+        if not hasattr(self, 'resultGallery'):
+            self.resultGallery = ResultGalleryWidget()
+            self.resultGallery.imageSelected.connect(self._on_gallery_image_selected)
+            result_widget = self._ensure_result_widget()
+            mainLayout = self.layout()
+            if mainLayout:
+                index = mainLayout.indexOf(result_widget)
+                mainLayout.insertWidget(index if index >= 0 else mainLayout.count(), self.resultGallery)
+        return self.resultGallery
+    
+    def _on_result_download_progress(self, received, total):
+        """界面线程：在任务进度条上显示结果图片的下载进度"""
+        main_panel = self.get_main_panel()
+        if not main_panel:
             return
-        
-        # 智能间隔调整 - 基于状态稳定性和进度
-        if progress >= 80:  # 进度很高时，减少查询频率
-            if self.monitor_stable_count >= 2:  # 稳定2次后增加间隔
-                interval = 10000  # 高进度稳定状态10秒
-            else:
-                interval = 5000   # 高进度变化状态5秒
-        elif self.monitor_stable_count >= 3:  # 状态稳定3次后增加间隔
-            if progress < 10:
-                interval = 3000   # 稳定状态3秒
-            elif progress < 50:
-                interval = 5000   # 稳定状态5秒
-            else:
-                interval = 8000   # 稳定状态8秒
+        main_panel.show_task_progress(True)
+        if total:
+            percent = int(received * 100 / total)
+            main_panel.update_task_progress(percent, f"下载结果图片... {received // 1024}/{total // 1024} KB")
         else:
-            if progress < 10:
-                interval = 1000   # 变化状态1秒
-            elif progress < 50:
-                interval = 2000   # 变化状态2秒
-            else:
-                interval = 3000   # 变化状态3秒
-        
-        # 更新定时器间隔
-        self.monitor_timer.setInterval(interval)
-        print(f"⏰ 下次查询间隔: {interval/1000}秒 (稳定计数: {self.monitor_stable_count})")
+            main_panel.update_task_progress(0, f"下载结果图片... {received // 1024} KB")
     
-    def _stop_monitoring(self):
-        """停止任务监控"""
-        if hasattr(self, 'monitor_timer'):
-            self.monitor_timer.stop()
-            print("🛑 停止任务监控")
+    def _on_result_download_failed(self, error):
+        print(f"❌ 显示图片时出错: {error}")
+        self._hide_progress_if_idle()
     
-    def display_result_image(self, image_url):
-        """显示结果图片到主视角区域"""
+    def _show_result_preview(self, image):
+        """界面线程：显示下载过程中的低分辨率预览图（不可点击放大）"""
+        widget = self._ensure_result_widget()
+        widget.setImage(QtGui.QPixmap.fromImage(image), showOverlay=False)
+        widget.currentImagePath = None
+        widget.show()
+    
+    def _ensure_result_widget(self):
+        """创建生成结果显示区域（只创建一次）"""
+        if not hasattr(self, 'resultImageWidget'):
+            # 创建新的生成结果图片组件
+            self.resultImageWidget = ClickableImageView()
+            self.resultImageWidget.setMinimumHeight(220)
+            self.resultImageWidget.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+            
+            # 添加到主布局中（在底部按钮区之前）
+            mainLayout = self.layout()
+            if mainLayout:
+                # 找到底部按钮区的位置
+                for i in range(mainLayout.count()):
+                    widget = mainLayout.itemAt(i).widget()
+                    if widget == self.bottomBtnContainer:
+                        mainLayout.insertWidget(i, self.resultImageWidget)
+                        break
+        return self.resultImageWidget
+    
+    def _show_result_image(self, image_path):
+        """界面线程：显示已缓存到本地的结果图片"""
         try:
-            print(f"🖼️ 开始下载并显示图片: {image_url}")
-            
-            # 下载图片
-            import requests
+            self._hide_progress_if_idle()
+            if not image_path:
+                return
+            self._ensure_result_widget()
             
-            # 设置请求头，避免被拒绝
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+            # 显示生成的图片（显示点击提示），按显示尺寸在后台解码，放大查看直接使用缓存文件
+            self.resultImageWidget.setImagePath(image_path, showOverlay=True)
+            self.resultImageWidget.show()  # 确保显示
+            print(f"✅ 图片缓存位置: {image_path}")
             
-            response = requests.get(image_url, headers=headers, timeout=30)
-            if response.status_code == 200:
-                # 将图片数据转换为QPixmap
-                image_data = QtCore.QByteArray(response.content)
-                
-                # 使用已经导入的QtGui
-                pixmap = QtGui.QPixmap()
-                pixmap.loadFromData(image_data)
-                
-                if not pixmap.isNull():
-                    # 创建生成结果显示区域
-                    if not hasattr(self, 'resultImageWidget'):
-                        # 创建新的生成结果图片组件
-                        self.resultImageWidget = ClickableImageView()
-                        self.resultImageWidget.setMinimumHeight(220)
-                        self.resultImageWidget.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
-                        
-                        # 添加到主布局中（在底部按钮区之前）
-                        mainLayout = self.layout()
-                        if mainLayout:
-                            # 找到底部按钮区的位置
-                            for i in range(mainLayout.count()):
-                                widget = mainLayout.itemAt(i).widget()
-                                if widget == self.bottomBtnContainer:
-                                    mainLayout.insertWidget(i, self.resultImageWidget)
-                                    break
-                    
-                    # 保存图片到临时文件，以便点击放大功能使用
-                    import tempfile
-                    temp_dir = tempfile.gettempdir()
-                    temp_image_path = os.path.join(temp_dir, "generated_result.png")
-                    pixmap.save(temp_image_path)
-                    
-                    # 显示生成的图片（显示点击提示）
-                    self.resultImageWidget.setImage(pixmap, showOverlay=True)
-                    self.resultImageWidget.currentImagePath = temp_image_path  # 设置图片路径
-                    self.resultImageWidget.show()  # 确保显示
-                    print(f"✅ 生成图片显示成功，尺寸: {pixmap.width()}x{pixmap.height()}")
-                    print(f"✅ 图片已保存到: {temp_image_path}")
-                    
-                    # 更新按钮文本
-                    if hasattr(self, 'captureBtn'):
-                        self.captureBtn.setText("🖼️ 生成结果")
-                else:
-                    print("❌ 图片数据加载失败")
-            else:
-                print(f"❌ 下载图片失败，状态码: {response.status_code}")
+            # 更新按钮文本
+            if hasattr(self, 'captureBtn'):
+                self.captureBtn.setText("🖼️ 生成结果")
                 
         except Exception as e:
             print(f"❌ 显示图片时出错: {str(e)}")
@@ -2810,187 +6900,30 @@ try (
     
     def query_task_status(self, task_id, flow_id=None):
         """查询任务状态"""
-        try:
-            print(f"🔍 查询任务状态: {task_id}")
-            
-            # 根据API文档，使用GET请求，需要id和flowId参数
-            params = {"id": task_id}
-            if flow_id:
-                params["flowId"] = flow_id
-            
-            response = self.call_api_request(API_ENDPOINTS["work_status"], params, method="GET")
-            
-            if response and response.get("code") == 0:
-                print(f"✅ 任务状态查询成功")
-                return response
-            elif response:
-                print(f"⚠️ 任务状态查询返回错误: {response.get('msg', '未知错误')}")
-                return None
-            else:
-                print(f"❌ 查询任务状态失败，无响应")
-                return None
-                
-        except Exception as e:
-            print(f"❌ 查询任务状态异常: {str(e)}")
-            return None
+        return fetch_task_status(task_id, flow_id)
     
     def get_task_details(self, task_id):
         """获取任务详情"""
-        try:
-            print(f"📋 获取任务详情: {task_id}")
-            
-            # 根据API文档，使用GET请求，参数为id
-            params = {"id": task_id}
-            response = self.call_api_request(API_ENDPOINTS["work_details"], params, method="GET")
-            
-            if response and response.get("code") == 0:
-                print(f"✅ 任务详情获取成功:")
-                print(f"📥 详情数据: {json.dumps(response, ensure_ascii=False, indent=2)}")
-                
-                # 获取结果图片URL
-                result_data = response.get("data", {})
-                result_images = result_data.get("resultImages", [])
-                if result_images:
-                    print(f"🖼️ 生成结果图片:")
-                    for i, img_url in enumerate(result_images):
-                        print(f"  图片{i+1}: {img_url}")
-                else:
-                    print("⚠️ 未找到结果图片")
-                
-                return response
-            else:
-                error_msg = response.get("msg", "未知错误") if response else "网络错误"
-                print(f"❌ 获取任务详情失败: {error_msg}")
-                return None
-                
-        except Exception as e:
-            print(f"❌ 获取任务详情异常: {str(e)}")
-            return None
+        return fetch_task_details(task_id)
     
-    def upload_image(self, image_path):
+    def upload_image(self, image_source, use_cache=True, cache_hits=None, progress_callback=None,
+                     filename="viewport_capture.png"):
         """上传图像到服务器"""
-        try:
-            print(f"📤 开始上传图像: {image_path}")
-            
-            if not os.path.exists(image_path):
-                print(f"❌ 图像文件不存在: {image_path}")
-                return None
-                
-            print(f"✅ 图像文件存在，开始上传...")
-                
-            with open(image_path, 'rb') as f:
-                files = {'file': f}
-                # 为文件上传使用正确的请求头，让requests自动设置Content-Type
-                headers = {}
-                login_data = get_auto_login_info()
-                if login_data and login_data.get('token'):
-                    headers["Authorization"] = f"Bearer {login_data.get('token')}"
-                    print(f"🔐 使用Bearer token认证: {login_data.get('token')[:20]}...")
-                
-                upload_url = f"{API_BASE_URL}{API_ENDPOINTS['upload']}"
-                print(f"🌐 上传URL: {upload_url}")
-                print(f"📋 请求头: {headers}")
-                
-                response = requests.post(
-                    upload_url, 
-                    files=files,
-                    headers=headers,
-                    timeout=30
-                )
-                
-                print(f"📥 上传响应状态码: {response.status_code}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    print(f"📋 上传响应内容: {result}")
-                    if result.get("code") == 0:
-                        # 从正确的路径获取URL
-                        image_url = result.get("data", {}).get("fileInfo", {}).get("fileUrl")
-                        print(f"✅ 图像上传成功，URL: {image_url}")
-                        return image_url
-                    else:
-                        print(f"❌ 图像上传失败: {result.get('msg', '未知错误')}")
-                else:
-                    print(f"❌ 图像上传HTTP错误: {response.status_code}")
-                    print(f"📋 错误响应: {response.text}")
-                    
-        except Exception as e:
-            print(f"❌ 图像上传异常: {str(e)}")
-        return None
+        return upload_image(image_source, use_cache, cache_hits, progress_callback, filename)
     
     def call_api_request(self, endpoint, params, method="POST"):
         """发送API请求"""
-        try:
-            # 构建请求URL
-            url = f"{API_BASE_URL}{endpoint}"
-            
-            headers = self.get_auth_headers()
-            
-            if method.upper() == "GET":
-                # GET请求：参数在URL中
-                query_params = []
-                for key, value in params.items():
-                    if value is not None and value != "":
-                        query_params.append(f"{key}={value}")
-                
-                if query_params:
-                    url += "?" + "&".join(query_params)
-                
-                print(f"🌐 发送GET请求到: {url}")
-                response = requests.get(url, headers=headers, timeout=30)
-            else:
-                # POST请求：参数在URL中
-                query_params = []
-                for key, value in params.items():
-                    if value is not None and value != "":
-                        query_params.append(f"{key}={value}")
-                
-                if query_params:
-                    url += "?" + "&".join(query_params)
-                
-                print(f"🌐 发送POST请求到: {url}")
-                response = requests.post(url, headers=headers, timeout=30)
-            
-            print(f"📥 响应状态码: {response.status_code}")
-            print(f"📥 响应内容: {response.text}")
-            
-            if response.status_code == 200:
-                try:
-                    return response.json()
-                except json.JSONDecodeError as e:
-                    print(f"❌ JSON解析失败: {str(e)}")
-                    print(f"📋 原始响应: {response.text}")
-                    return None
-            else:
-                print(f"❌ API请求HTTP错误: {response.status_code}")
-                print(f"📋 错误响应: {response.text}")
-                return None
-                
-        except Exception as e:
-            print(f"❌ API请求异常: {str(e)}")
-            return None
+        return api_request(endpoint, params, method, headers=self.get_auth_headers())
     
     def get_auth_headers(self):
         """获取认证头"""
         # 尝试从登录响应中获取token
         try:
-            # 从auto_login.json读取token
-            login_data = get_auto_login_info()
-            print(f"🔍 读取到的登录数据: {login_data}")
-            
-            if login_data and login_data.get('token'):
-                headers = {
-                    "Content-Type": "application/x-www-form-urlencoded",
-                    "Authorization": f"Bearer {login_data.get('token')}"
-                }
-                print(f"🔐 使用Bearer token认证: {login_data.get('token')[:20]}...")
+            # 从内存中的登录凭据缓存读取token，不再每次请求都读取auto_login.json
+            headers = get_credential_store().auth_headers()
+            if "Authorization" in headers:
                 return headers
-            else:
-                print("⚠️ 没有找到token，使用默认认证头")
-                if login_data:
-                    print(f"📋 登录数据内容: {list(login_data.keys())}")
-                else:
-                    print("📋 登录数据为空")
+            print("⚠️ 没有找到token，使用默认认证头")
         except Exception as e:
             print(f"❌ 获取认证头异常: {str(e)}")
         
@@ -3002,7 +6935,7 @@ try (
         try:
             print("🔍 检查是否已登录...")
             
-            # 从auto_login.json读取登录信息
+            # 从登录凭据缓存读取登录信息
             login_data = get_auto_login_info()
             if not login_data or not login_data.get('username'):
                 print("❌ 没有保存的登录信息")
@@ -3054,25 +6987,20 @@ try (
         """获取参考图像路径（已废弃，现在使用用户上传的图像作为参考）"""
         return getattr(self, 'reference_image_path', None)
     
+    def _advanced_default(self, name, fallback):
+        """当前选项的高级参数默认值"""
+        workflow = self._current_workflow()
+        return workflow.advanced.get(name, fallback) if workflow else fallback
+    
     def get_prompt_text(self):
-        """获取提示词文本"""
+        """获取提示词文本（多提示词选项返回第一个提示词）"""
         try:
             # 从当前选中的选项获取默认提示词
             current_option = self.comboBox.currentText()
-            
-            # 检查是否是多提示词选项
-            if current_option in self.MULTI_PROMPT_DEFAULTS:
-                # 多提示词选项，返回第一个提示词作为主要提示词
-                multi_prompts = self.MULTI_PROMPT_DEFAULTS[current_option]
-                prompt_text = multi_prompts[0] if multi_prompts else "默认提示词"
-                print(f"📝 获取多提示词选项: {current_option}")
-                print(f"📝 使用第一个提示词: {prompt_text}")
-                return prompt_text
-            else:
-                # 单提示词选项
-                prompt_text = self.PROMPT_DEFAULTS.get(current_option, "默认提示词")
-                print(f"📝 获取单提示词: {prompt_text} (选项: {current_option})")
-                return prompt_text
+            workflow = self._current_workflow()
+            prompt_text = workflow.prompts[0] if workflow and workflow.prompts else "默认提示词"
+            print(f"📝 获取提示词: {prompt_text} (选项: {current_option})")
+            return prompt_text
         except Exception as e:
             print(f"❌ 获取提示词失败: {str(e)}")
             return "默认提示词"
@@ -3082,8 +7010,7 @@ try (
         try:
             # 从当前选中的选项获取默认强度值
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            strength_value = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("控制强度", 0.5)
+            strength_value = self._advanced_default("控制强度", 0.5)
             print(f"🎚️ 获取控制强度: {strength_value} (选项: {current_option})")
             return strength_value
         except Exception as e:
@@ -3095,8 +7022,7 @@ try (
         try:
             # 从当前选中的选项获取默认权重值
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            weight_value = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("参考图权重", 0.8)
+            weight_value = self._advanced_default("参考图权重", 0.8)
             print(f"⚖️ 获取参考图权重: {weight_value} (选项: {current_option})")
             return weight_value
         except Exception as e:
@@ -3108,8 +7034,7 @@ try (
         try:
             # 从当前选中的选项获取默认开始时间
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            start_value = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("控制开始时间", 0.0)
+            start_value = self._advanced_default("控制开始时间", 0.0)
             print(f"⏰ 获取控制开始时间: {start_value} (选项: {current_option})")
             return start_value
         except Exception as e:
@@ -3121,8 +7046,7 @@ try (
         try:
             # 从当前选中的选项获取默认结束时间
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            end_value = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("控制结束时间", 1.0)
+            end_value = self._advanced_default("控制结束时间", 1.0)
             print(f"⏰ 获取控制结束时间: {end_value} (选项: {current_option})")
             return end_value
         except Exception as e:
@@ -3133,10 +7057,11 @@ try (
         """获取多提示词列表"""
         try:
             current_option = self.comboBox.currentText()
+            workflow = self._current_workflow()
             
             # 检查是否是多提示词选项
-            if current_option in self.MULTI_PROMPT_DEFAULTS:
-                multi_prompts = self.MULTI_PROMPT_DEFAULTS[current_option]
+            if workflow and len(workflow.prompts) > 1:
+                multi_prompts = list(workflow.prompts)
                 print(f"📝 获取多提示词列表: {multi_prompts} (选项: {current_option})")
                 return multi_prompts
             else:
@@ -3153,8 +7078,7 @@ try (
         try:
             # 从当前选中的选项获取默认像素值
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            pixel_value = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("像素值", 0)
+            pixel_value = self._advanced_default("像素值", 0)
             print(f"📐 获取像素值: {pixel_value} (选项: {current_option})")
             return pixel_value
         except Exception as e:
@@ -3166,8 +7090,7 @@ try (
         try:
             # 从当前选中的选项获取默认竖屏设置
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            is_vertical = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("是否竖屏", False)
+            is_vertical = self._advanced_default("是否竖屏", False)
             print(f"📱 获取竖屏设置: {is_vertical} (选项: {current_option})")
             return is_vertical
         except Exception as e:
@@ -3179,8 +7102,7 @@ try (
         try:
             # 从当前选中的选项获取默认增强值
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            enhance_value = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("增强细节", 0)
+            enhance_value = self._advanced_default("增强细节", 0)
             print(f"🔍 获取增强细节: {enhance_value} (选项: {current_option})")
             return enhance_value
         except Exception as e:
@@ -3192,8 +7114,7 @@ try (
         try:
             # 从当前选中的选项获取默认第二个权重值
             current_option = self.comboBox.currentText()
-            work_type_key = f"{self.tabName}-{current_option}"
-            weight_one_value = self.ADVANCED_DEFAULTS.get(work_type_key, {}).get("参考图权重2", 0.8)
+            weight_one_value = self._advanced_default("参考图权重2", 0.8)
             print(f"⚖️ 获取第二个权重值: {weight_one_value} (选项: {current_option})")
             return weight_one_value
         except Exception as e:
@@ -3243,17 +7164,19 @@ try (
         self.bottomBtnLayout.addWidget(btn)
         self.bottomBtnLayout.addStretch(1)
 
-    def crop_viewport_image(self, pixmap):
+    def crop_viewport_image(self, image):
         """
         裁剪视口图片，去掉外围的UI元素
+        
+        返回共享原图像素内存的QImage视图（不复制像素），原图必须在视图使用期间保持有效
         """
         try:
-            if pixmap.isNull():
+            if image.isNull():
                 return None
             
             # 获取原始图片尺寸
-            original_width = pixmap.width()
-            original_height = pixmap.height()
+            original_width = image.width()
+            original_height = image.height()
             
             print(f"🔍 开始裁剪图片: {original_width} x {original_height}")
             
@@ -3275,10 +7198,17 @@ try (
             # 确保裁剪区域有效
             if crop_width <= 0 or crop_height <= 0:
                 print("⚠️ 裁剪区域无效，返回原图")
-                return pixmap
-            
-            # 执行裁剪
-            cropped = pixmap.copy(crop_x, crop_y, crop_width, crop_height)
+                return image
+            
+            # 32位格式下直接按偏移量引用原图像素，不复制数据
+            if image.format() not in (QtGui.QImage.Format_RGB32, QtGui.QImage.Format_ARGB32):
+                image = image.convertToFormat(QtGui.QImage.Format_RGB32)
+            bytes_per_line = image.bytesPerLine()
+            offset = crop_y * bytes_per_line + crop_x * 4
+            cropped = QtGui.QImage(image.constBits()[offset:], crop_width, crop_height,
+                                   bytes_per_line, image.format())
+            # 保持原图引用，避免视图引用的像素内存被释放
+            cropped._source_image = image
             
             print(f"✅ 裁剪完成: {crop_width} x {crop_height}")
             print(f"📐 裁剪区域: x={crop_x}, y={crop_y}, w={crop_width}, h={crop_height}")
@@ -3290,6 +7220,97 @@ try (
             return None
 
     def capture_max_view(self):
+        """获取主视角视图，返回裁剪并编码后的PNG字节数据"""
+        image = self.capture_max_view_image()
+        if image is None:
+            return None
+        image_data = encode_qimage(image, "PNG")
+        if not image_data:
+            print("❌ 主视角视图编码失败")
+            self.viewImageLabel.setText("图片编码失败")
+        return image_data
+
+    def capture_views(self, views):
+        """
+        一次截取多个视图（截图前隐藏一次界面元素，全部截完后再恢复），返回与views对应的QImage列表
+        
+        views为list_scene_views()返回的(显示名称, 视口序号, 摄影机名称)，截图失败的视图对应None
+        """
+        self._hide_max_ui()
+        try:
+            return [self.capture_max_view_image(viewport, camera) for label, viewport, camera in views]
+        finally:
+            self._restore_max_ui()
+    
+    def _reference_image_for(self, option):
+        """选项表单中上传的参考图像；该选项的表单还没有创建时使用当前表单的参考图像"""
+        form = self._formCache.get(option)
+        upload = form.uploadWidget if form is not None and form.uploadWidget else self.uploadWidget
+        path = getattr(upload, 'imagePath', None) if upload else None
+        return path if path and os.path.exists(path) else None
+    
+    def build_batch_jobs(self, views, options):
+        """截取所有选中的视图，为每个视图 × 选项生成一个批量任务（参数使用各选项的默认值）"""
+        registry = get_workflow_registry()
+        images = self.capture_views(views)
+        jobs = []
+        for (label, viewport, camera), image in zip(views, images):
+            if image is None:
+                print(f"❌ {label}截图失败，跳过")
+                continue
+            for option in options:
+                workflow = registry.get(self.tabName, option)
+                if workflow is None:
+                    continue
+                params = build_workflow_params(workflow)
+                job_info = {"tab": self.tabName, "option": option, "work_type": workflow.work_type,
+                            "params": params}
+                jobs.append(BatchJob(label, option, image, params, self._reference_image_for(option), job_info))
+        return jobs
+    
+    def build_prompt_matrix_jobs(self, option, matrix):
+        """截取一次主视角视图，为提示词矩阵的每个参数组合生成一个批量任务（共用同一张截图和参考图）"""
+        workflow = get_workflow_registry().get(self.tabName, option)
+        image = self.capture_views([("主视角", 4, None)])[0]
+        if workflow is None or image is None:
+            return []
+        reference = self._reference_image_for(option)
+        jobs = []
+        for label, params in matrix:
+            job_info = {"tab": self.tabName, "option": option, "work_type": workflow.work_type, "params": params}
+            jobs.append(BatchJob(label, option, image, params, reference, job_info))
+        return jobs
+    
+    def show_prompt_matrix_dialog(self):
+        """打开当前选项的提示词矩阵窗口"""
+        dialog = getattr(self, '_matrixDialog', None)
+        if dialog is None:
+            dialog = PromptMatrixDialog(self, self)
+            self._matrixDialog = dialog
+        dialog.setOption(self.comboBox.currentText())
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+    
+    def show_batch_dialog(self):
+        """打开批量生成窗口（已打开时切换到前台）"""
+        dialog = getattr(self, '_batchDialog', None)
+        if dialog is None:
+            dialog = BatchDialog(self, self)
+            self._batchDialog = dialog
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+    
+    def capture_max_view_image(self, viewport=4, camera=None):
+        """
+        获取主视角视图，返回裁剪后的QImage
+        
+        viewport为截图的视口序号（默认右下角视口）；camera为摄影机名称时，截图前临时把该视口
+        切换到摄影机视图，截图后恢复原来的视图。
+        MaxScript无法把位图直接交给Python内存，所以视口只以不压缩的BMP格式落盘一次，
+        之后的读取、裁剪、编码和上传都在内存中完成
+        """
         try:
             print("🔍 开始获取主视角视图...")
             
@@ -3309,14 +7330,11 @@ try (
                 msgBox.exec()
                 return None
             
-            # 如果成功导入pymxs模块，继续执行原来的代码
-            import os
-            import tempfile
-            temp_path = os.path.join(tempfile.gettempdir(), "quick_viewport_capture.png")
+            # BMP不需要压缩编码，写入和读取都比PNG快得多
+            temp_path = os.path.join(tempfile.gettempdir(), "quick_viewport_capture.bmp")
             ms_path = temp_path.replace('\\', '/')
             
             print(f"📁 临时文件路径: {temp_path}")
-            print(f"📁 MaxScript路径: {ms_path}")
             
             # 执行截图代码
             rt = pymxs.runtime
@@ -3346,11 +7364,28 @@ try (
 '''
             rt.execute(hide_ui_code)
             
-            rt.viewport.activeViewport = 4  # 切换到右下角视口
-            print("📷 切换到视口4")
+            rt.viewport.activeViewport = viewport
+            print(f"📷 切换到视口{viewport}")
+            
+            switch_camera = restore_view = ""
+            if camera:
+                camera_name = camera.replace('\\', '\\\\').replace('"', '\\"')
+                print(f"🎥 切换到摄影机: {camera}")
+                switch_camera = f'''
+    local oldCamera = viewport.getCamera()
+    local oldType = viewport.getType()
+    local oldTM = viewport.getTM()
+    viewport.setCamera (getNodeByName "{camera_name}")
+    completeRedraw()'''
+                restore_view = '''
+    if oldCamera != undefined then viewport.setCamera oldCamera else (
+        viewport.setType oldType
+        viewport.setTM oldTM
+    )
+    completeRedraw()'''
             
             maxscript_code = f'''
-try (
+try ({switch_camera}
     local img = gw.getViewportDib()
     if img != undefined and img != null then (
         img.filename = "{ms_path}"
@@ -3359,12 +7394,11 @@ try (
         print "截图保存成功"
     ) else (
         print "获取视口图像失败"
-    )
+    ){restore_view}
 ) catch (
     print "截图过程中出现错误"
 )
 '''
-            print(f"📝 执行MaxScript代码: {maxscript_code}")
             rt.execute(maxscript_code)
             
             rt.viewport.activeViewport = old_vp  # 恢复原激活视口
@@ -3393,97 +7427,38 @@ try (
 '''
             rt.execute(restore_ui_code)
             
-            # 加载图片
-            if os.path.exists(temp_path):
-                print(f"✅ 临时文件存在: {temp_path}")
-                
-                # 检查文件大小
-                file_size = os.path.getsize(temp_path)
-                print(f"📏 文件大小: {file_size} 字节")
-                
-                if file_size == 0:
-                    print("❌ 文件大小为0，截图可能失败")
-                    self.viewImageLabel.setText("截图失败，文件为空")
-                    return None
-                
-                # 尝试加载图片
-                pixmap = QtGui.QPixmap(temp_path)
-                if not pixmap.isNull():
-                    print("✅ 图片加载成功")
-                    print(f"📐 图片尺寸: {pixmap.width()} x {pixmap.height()}")
-                    
-                    # 裁剪图片，去掉外围UI元素
-                    cropped_pixmap = self.crop_viewport_image(pixmap)
-                    if cropped_pixmap:
-                        print("✅ 图片裁剪成功")
-                        pixmap = cropped_pixmap
-                        
-                        # 保存裁剪后的图片到新文件
-                        cropped_temp_path = os.path.join(tempfile.gettempdir(), "cropped_viewport_capture.png")
-                        if pixmap.save(cropped_temp_path, "PNG"):
-                            print(f"✅ 裁剪后图片已保存: {cropped_temp_path}")
-                            # 更新返回路径为裁剪后的图片路径
-                            temp_path = cropped_temp_path
-                        else:
-                            print("⚠️ 裁剪后图片保存失败，使用原图")
-                    else:
-                        print("⚠️ 图片裁剪失败，使用原图")
-                    
-                    # 使用隐藏的主视角图片组件处理图片（不显示在界面上）
-                    self.viewImageWidget.setImagePath(temp_path, showOverlay=False)
-                    print("✅ 主视角视图获取成功（已隐藏）")
-                else:
-                    print("❌ 图片加载失败")
-                    # 尝试使用不同的方法加载
-                    try:
-                        from PIL import Image
-                        import io
-                        img = Image.open(temp_path)
-                        img_data = io.BytesIO()
-                        img.save(img_data, format='PNG')
-                        img_data.seek(0)
-                        pixmap = QtGui.QPixmap()
-                        pixmap.loadFromData(img_data.getvalue())
-                        if not pixmap.isNull():
-                            print("✅ 使用PIL加载图片成功")
-                            scaled = pixmap.scaled(self.viewImageLabel.width(), self.viewImageLabel.height(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-                            self.viewImageLabel.setPixmap(scaled)
-                            self.viewImageLabel.setText("")
-                        else:
-                            print("❌ PIL加载也失败")
-                            self.viewImageLabel.setText("图片格式不支持")
-                    except ImportError:
-                        print("❌ PIL模块不可用")
-                        self.viewImageLabel.setText("图片格式不支持")
-                    except Exception as e:
-                        print(f"❌ PIL加载失败: {str(e)}")
-                        self.viewImageLabel.setText("图片加载失败")
-            else:
-                print(f"❌ 临时文件不存在: {temp_path}")
+            # 读取截图到内存后立即删除临时文件
+            if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
+                print(f"❌ 截图文件不存在或为空: {temp_path}")
                 self.viewImageLabel.setText("未能获取视图")
                 return None
-            
-            # 如果成功获取图像，返回图像路径
-            if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
-                print(f"✅ 成功获取主视角视图: {temp_path}")
-                return temp_path
-            else:
-                print("❌ 主视角视图获取失败")
+            image = QtGui.QImage(temp_path)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            if image.isNull():
+                print("❌ 图片加载失败")
+                self.viewImageLabel.setText("图片格式不支持")
                 return None
+            print(f"📐 图片尺寸: {image.width()} x {image.height()}")
+            
+            # 裁剪图片，去掉外围UI元素
+            cropped = self.crop_viewport_image(image)
+            if cropped is None:
+                print("⚠️ 图片裁剪失败，使用原图")
+                cropped = image
+            
+            # 使用隐藏的主视角图片组件处理图片（不显示在界面上）
+            self.viewImageWidget.setImage(QtGui.QPixmap.fromImage(cropped), showOverlay=False)
+            print(f"✅ 成功获取主视角视图: {cropped.width()} x {cropped.height()}")
+            return cropped
         except Exception as e:
             # 捕获所有异常
             error_msg = f"获取视图时出错: {str(e)}"
             print(f"❌ {error_msg}")
             self.viewImageLabel.setText(error_msg)
             return None
-            
-        # 如果成功获取图像，返回图像路径
-        if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
-            print(f"✅ 成功获取主视角视图: {temp_path}")
-            return temp_path
-        else:
-            print("❌ 主视角视图获取失败")
-            return None
 
 # =========================
 # 登录窗口类
@@ -3659,8 +7634,9 @@ class LoginWindow(QtWidgets.QWidget):
         # 设置勾选时的文本
         self.autoLoginCheck.setProperty("checkedText", "✓")
         
-        # 自动登录文件路径
-        self.auto_login_file = "auto_login.json"
+        # 登录凭据缓存（auto_login.json位于插件数据目录）
+        self.credential_store = get_credential_store()
+        self.auto_login_file = self.credential_store.path
         
         # 状态消息
         self.statusLabel = QtWidgets.QLabel("")
@@ -3685,14 +7661,12 @@ class LoginWindow(QtWidgets.QWidget):
         self.passwordEdit.returnPressed.connect(self.login)
         
     def try_auto_login(self):
-        """尝试自动登录"""
+        """尝试自动登录（登录请求在后台线程执行）"""
         print(f"🔍 检查自动登录文件: {self.auto_login_file}")
-        if os.path.exists(self.auto_login_file):
+        if self.credential_store.exists():
             print("✅ 自动登录文件存在")
             try:
-                with open(self.auto_login_file, 'r', encoding='utf-8') as f:
-                    auto_login_data = json.load(f)
-                print(f"📄 自动登录数据: {auto_login_data}")
+                auto_login_data = self.credential_store.data()
                 
                 if auto_login_data.get("auto_login", False) and \
                    "username" in auto_login_data and "password" in auto_login_data:
@@ -3707,60 +7681,11 @@ class LoginWindow(QtWidgets.QWidget):
                     
                     # 直接尝试API登录
                     print("🔄 尝试自动API登录...")
-                    try:
-                        params = {
-                            "type": "10",  # 手机号+密码登录
-                            "userPhone": username,
-                            "password": password
-                        }
-                        
-                        headers = {
-                            "Content-Type": "application/x-www-form-urlencoded"
-                        }
-                        
-                        response = requests.post(
-                            f"{API_BASE_URL}{API_ENDPOINTS['login']}",
-                            data=params,
-                            headers=headers,
-                            timeout=10
-                        )
-                        
-                        print(f"📡 API响应状态码: {response.status_code}")
-                        print(f"📡 API响应内容: {response.text}")
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            if result.get("code") == 0:
-                                print("✅ 自动登录成功")
-                                # 保存token到auto_login.json
-                                try:
-                                    token = result.get("data", {}).get("token")
-                                    if token:
-                                        # 更新auto_login.json，添加token
-                                        auto_login_data["token"] = token
-                                        with open(self.auto_login_file, 'w', encoding='utf-8') as f:
-                                            json.dump(auto_login_data, f, ensure_ascii=False, indent=4)
-                                        print(f"✅ Token已保存到auto_login.json")
-                                except Exception as e:
-                                    print(f"❌ 保存token失败: {str(e)}")
-                                
-                                # 不显示自动登录成功信息，直接进入主界面
-                                self.loginSuccess.emit() # 发送登录成功信号
-                                self.close() # 确保在信号发出后关闭窗口
-                                return
-                            else:
-                                print(f"ℹ️ API登录失败: {result.get('msg', '未知错误')} - 静默失败，让用户手动登录")
-                                # 不清除自动登录信息，也不显示错误，让用户手动登录
-                                return
-                        else:
-                            print(f"ℹ️ API请求失败: {response.status_code} - 静默失败，让用户手动登录")
-                            # 不清除自动登录信息，也不显示错误，让用户手动登录
-                            return
-                            
-                    except Exception as e:
-                        print(f"ℹ️ 自动API登录异常: {str(e)} - 静默失败，让用户手动登录")
-                        # 不清除自动登录信息，也不显示错误，让用户手动登录
-                        return
+                    get_network_executor().submit(
+                        request_login, username, password, timeout=10,
+                        on_success=lambda response: self._on_auto_login_response(response, auto_login_data),
+                        on_error=lambda error: print(f"ℹ️ 自动API登录异常: {error} - 静默失败，让用户手动登录")
+                    )
                         
                 else:
                     print("❌ 自动登录数据格式不正确")
@@ -3774,35 +7699,64 @@ class LoginWindow(QtWidgets.QWidget):
         else:
             print("ℹ️ 自动登录文件不存在")
             # 静默处理，不显示错误信息
+
+    def _on_auto_login_response(self, response, auto_login_data):
+        """界面线程：处理自动登录响应"""
+        try:
+            print(f"📡 API响应状态码: {response.status_code}")
+            print(f"📡 API响应内容: {response.text}")
+            
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("code") == 0:
+                    print("✅ 自动登录成功")
+                    # 保存token到auto_login.json
+                    try:
+                        token = result.get("data", {}).get("token")
+                        if token:
+                            # 更新auto_login.json，添加token
+                            self.credential_store.update(token=token)
+                            print(f"✅ Token已保存到auto_login.json")
+                    except Exception as e:
+                        print(f"❌ 保存token失败: {str(e)}")
+                    
+                    # 不显示自动登录成功信息，直接进入主界面
+                    self.loginSuccess.emit() # 发送登录成功信号
+                    self.close() # 确保在信号发出后关闭窗口
+                    return
+                else:
+                    print(f"ℹ️ API登录失败: {result.get('msg', '未知错误')} - 静默失败，让用户手动登录")
+                    # 不清除自动登录信息，也不显示错误，让用户手动登录
+                    return
+            else:
+                print(f"ℹ️ API请求失败: {response.status_code} - 静默失败，让用户手动登录")
+                # 不清除自动登录信息，也不显示错误，让用户手动登录
+                return
+                
+        except Exception as e:
+            print(f"ℹ️ 自动API登录异常: {str(e)} - 静默失败，让用户手动登录")
+            # 不清除自动登录信息，也不显示错误，让用户手动登录
+            return
                 
     def save_auto_login_info(self, username, password):
         """保存自动登录信息"""
         try:
-            # 读取现有的auto_login.json，保留token
-            auto_login_data = {}
-            if os.path.exists(self.auto_login_file):
-                with open(self.auto_login_file, 'r', encoding='utf-8') as f:
-                    auto_login_data = json.load(f)
-            
             # 更新登录信息，但保留token
-            auto_login_data.update({
-                "auto_login": self.autoLoginCheck.isChecked(),
-                "username": username,
-                "password": password if self.autoLoginCheck.isChecked() else "",  # 只有勾选时才保存密码
-                "remember_checkbox": self.autoLoginCheck.isChecked()  # 记住复选框状态
-            })
-            
-            with open(self.auto_login_file, 'w', encoding='utf-8') as f:
-                json.dump(auto_login_data, f, ensure_ascii=False, indent=4)
-            print(f"✅ 自动登录信息已保存: {auto_login_data}")
+            self.credential_store.update(
+                auto_login=self.autoLoginCheck.isChecked(),
+                username=username,
+                password=password if self.autoLoginCheck.isChecked() else "",  # 只有勾选时才保存密码
+                remember_checkbox=self.autoLoginCheck.isChecked()  # 记住复选框状态
+            )
+            print(f"✅ 自动登录信息已保存: {username}")
         except Exception as e:
             print(f"❌ 保存自动登录信息失败: {str(e)}")
             
     def clear_auto_login_info(self):
         """清除自动登录信息"""
         try:
-            if os.path.exists(self.auto_login_file):
-                os.remove(self.auto_login_file)
+            if self.credential_store.exists():
+                self.credential_store.clear()
                 print(f"✅ 自动登录信息已清除: {self.auto_login_file}")
             else:
                 print(f"ℹ️ 自动登录文件不存在: {self.auto_login_file}")
@@ -3810,9 +7764,6 @@ class LoginWindow(QtWidgets.QWidget):
             print(f"❌ 清除自动登录信息失败: {str(e)}")
         
     def login(self):
-        # 在函数开始时声明所有global变量
-        global current_username, main_panel_instance
-        
         username = self.usernameEdit.text().strip()
         password = self.passwordEdit.text().strip()
         
@@ -3826,30 +7777,35 @@ class LoginWindow(QtWidgets.QWidget):
         print(f"密码: {password}")
         print(f"API地址: {API_BASE_URL}{API_ENDPOINTS['login']}")
         
+        # 登录请求在后台线程执行，期间禁用登录按钮避免重复提交
+        print("发送API请求...")
+        self.loginButton.setEnabled(False)
+        self.statusLabel.setText("正在登录...")
+        self.statusLabel.setStyleSheet("color: #ccc; font-size: 14px;")
+        get_network_executor().submit(
+            request_login, username, password, timeout=30,
+            on_success=lambda response: self._on_login_response(response, username, password),
+            on_error=self._on_login_error
+        )
+    
+    def _on_login_error(self, error):
+        """界面线程：登录请求异常"""
+        print(f"API登录调用失败: {error}")
+        self._on_login_response(None, None, None)
+    
+    def _on_login_response(self, response, username, password):
+        """界面线程：处理登录响应"""
+        # 在函数开始时声明所有global变量
+        global current_username, main_panel_instance
+        
+        self.loginButton.setEnabled(True)
         try:
-            params = {
-                "type": "10",  # 手机号+密码登录
-                "userPhone": username,
-                "password": password
-            }
-            
-            # 请求头
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-            
-            print("发送API请求...")
-            response = requests.post(
-                f"{API_BASE_URL}{API_ENDPOINTS['login']}", 
-                data=params,
-                headers=headers,
-                timeout=30
-            )
-            
-            print(f"HTTP状态码: {response.status_code}")
-            print(f"响应内容: {response.text}")
-            
-            if response.status_code == 200:
+            if response is None:
+                # 网络异常，已在_on_login_error中输出
+                pass
+            elif response.status_code == 200:
+                print(f"HTTP状态码: {response.status_code}")
+                print(f"响应内容: {response.text}")
                 result = response.json()
                 code = result.get("code")
                 msg = result.get("msg", "未知错误")
@@ -3866,22 +7822,14 @@ class LoginWindow(QtWidgets.QWidget):
                     try:
                         token = result.get("data", {}).get("token")
                         if token:
-                            # 读取现有的auto_login.json
-                            auto_login_data = {}
-                            if os.path.exists(self.auto_login_file):
-                                with open(self.auto_login_file, 'r', encoding='utf-8') as f:
-                                    auto_login_data = json.load(f)
-                            
-                            # 更新token
-                            auto_login_data["token"] = token
-                            auto_login_data["username"] = username
-                            auto_login_data["password"] = password if self.autoLoginCheck.isChecked() else ""
-                            auto_login_data["auto_login"] = self.autoLoginCheck.isChecked()
-                            auto_login_data["remember_checkbox"] = self.autoLoginCheck.isChecked()
-                            
-                            # 保存到文件
-                            with open(self.auto_login_file, 'w', encoding='utf-8') as f:
-                                json.dump(auto_login_data, f, ensure_ascii=False, indent=4)
+                            # 更新token并保存到文件
+                            self.credential_store.update(
+                                token=token,
+                                username=username,
+                                password=password if self.autoLoginCheck.isChecked() else "",
+                                auto_login=self.autoLoginCheck.isChecked(),
+                                remember_checkbox=self.autoLoginCheck.isChecked()
+                            )
                             print(f"✅ Token已保存到auto_login.json: {token[:20]}...")
                     except Exception as e:
                         print(f"❌ 保存token失败: {str(e)}")
@@ -4036,6 +7984,11 @@ class LoginWindow(QtWidgets.QWidget):
 class MaxStylePanelQt(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super(MaxStylePanelQt, self).__init__(parent)
+        self._initStarted = time.perf_counter()
+        self._firstTabReported = False
+        self._tabNames = []
+        self._tabContents = {}
+        self._tabPlaceholders = {}
         # 直接启用主面板，不再检查登录状态
         self.setEnabled(True)
         try:
@@ -4115,6 +8068,14 @@ class MaxStylePanelQt(QtWidgets.QWidget):
             userInfoButton.setCursor(QtCore.Qt.PointingHandCursor)
             userInfoButton.clicked.connect(self.show_user_info_from_button)
             
+            # 历史记录按钮
+            historyButton = QtWidgets.QPushButton("🕘")
+            historyButton.setFixedSize(28, 28)
+            historyButton.setToolTip("历史记录")
+            historyButton.setStyleSheet(userInfoButton.styleSheet())
+            historyButton.setCursor(QtCore.Qt.PointingHandCursor)
+            historyButton.clicked.connect(self.show_history_dialog)
+            
             # 退出按钮
             logoutButton = QtWidgets.QPushButton("退出登录")
             logoutButton.setStyleSheet("""
@@ -4138,6 +8099,7 @@ class MaxStylePanelQt(QtWidgets.QWidget):
             userInfoLayout.addWidget(self.usernameLabel)
             userInfoLayout.addWidget(self.pointsLabel)
             userInfoLayout.addWidget(userInfoButton)
+            userInfoLayout.addWidget(historyButton)
             userInfoLayout.addWidget(logoutButton)
             userInfoLayout.setSpacing(8)
             
@@ -4288,30 +8250,26 @@ QTabWidget::pane {
 }
 """)
         try:
+            # 先只创建占位页，Tab内容在第一次切换到该Tab时才创建，面板可以立即显示
             tabNames = ["室内设计", "建筑规划", "景观设计", "图像处理"]
             for name in tabNames:
-                try:
-                    tab = QtWidgets.QWidget()
-                    tabLayout = QtWidgets.QVBoxLayout(tab)
-                    tabLayout.setContentsMargins(0, 0, 0, 0)
-                    tabLayout.setSpacing(0)
-                    tabContent = TabContentWidget(name)
-                    tabLayout.addWidget(tabContent)
-                    tab.setLayout(tabLayout)
-                    self.tabWidget.addTab(tab, name)
-                except Exception as e:
-                    import traceback
-                    error_msg = f"添加Tab '{name}'时出错: {str(e)}\n{traceback.format_exc()}"
-                    print(error_msg)
-                    # 添加一个错误Tab
-                    errorTab = QtWidgets.QWidget()
-                    errorLayout = QtWidgets.QVBoxLayout(errorTab)
-                    errorLabel = QtWidgets.QLabel(f"Tab '{name}'加载失败: {str(e)}")
-                    errorLabel.setStyleSheet("color: red; font-size: 16px;")
-                    errorLayout.addWidget(errorLabel)
-                    self.tabWidget.addTab(errorTab, f"{name}(错误)")
+                tab = QtWidgets.QWidget()
+                tabLayout = QtWidgets.QVBoxLayout(tab)
+                tabLayout.setContentsMargins(0, 0, 0, 0)
+                tabLayout.setSpacing(0)
+                placeholder = QtWidgets.QLabel("加载中...")
+                placeholder.setAlignment(QtCore.Qt.AlignCenter)
+                placeholder.setStyleSheet("color: #888; font-size: 14px;")
+                tabLayout.addWidget(placeholder)
+                tab.setLayout(tabLayout)
+                index = self.tabWidget.addTab(tab, name)
+                self._tabNames.append(name)
+                self._tabPlaceholders[index] = placeholder
+            self.tabWidget.currentChanged.connect(self._ensure_tab_content)
             mainLayout.addWidget(self.tabWidget)
             self.setLayout(mainLayout)
+            # 当前Tab的内容在面板显示后的下一次事件循环中创建
+            QtCore.QTimer.singleShot(0, lambda: self._ensure_tab_content(self.tabWidget.currentIndex()))
         except Exception as e:
             import traceback
             error_msg = f"添加Tabs时出错: {str(e)}\n{traceback.format_exc()}"
@@ -4328,19 +8286,104 @@ QTabWidget::pane {
         
         # 请求用户信息但不显示弹窗，只更新积分显示
         self.request_user_info_silent()
+        # 先用本地缓存的工作流目录显示面板，再在后台向服务器确认是否有更新
+        get_network_executor().submit(refresh_workflow_catalog,
+                                      on_success=self._on_workflow_catalog_refreshed,
+                                      on_error=lambda message: print(f"⚠️ 刷新工作流目录失败: {message}"))
+        # 继续监控上次关闭面板或3ds Max退出时尚未完成的任务
+        get_task_manager().resume_unfinished(self._resume_jobs)
+        record_timing("panel_init", time.perf_counter() - self._initStarted)
+
+    def show_history_dialog(self):
+        """打开历史记录窗口（只创建一次，再次打开时保留滚动位置）"""
+        if not hasattr(self, 'historyDialog'):
+            self.historyDialog = HistoryDialog(self)
+        else:
+            self.historyDialog.sync()
+        self.historyDialog.show()
+        self.historyDialog.raise_()
+
+    def _resume_jobs(self, jobs):
+        """
+        把任务日志中未完成的任务交给提交它的Tab继续监控，完成后照常显示结果
+        
+        批量任务可能有很多个，不绑定到Tab（不逐个弹出提示），只在后台监控并把结果写入任务日志和历史记录
+        """
+        for job in jobs:
+            if job.get("batch"):
+                print(f"♻️ 恢复监控批量任务: {job['work_id']} ({job['tab']}-{job['option']})")
+                task = get_task_manager().track(job["work_id"], job["flow_id"])
+                task.finished.connect(self._record_resumed_batch_result)
+                task.failed.connect(lambda task_id, message: print(f"❌ 批量任务{task_id}: {message}"))
+                continue
+            index = self._tabNames.index(job["tab"]) if job["tab"] in self._tabNames else self.tabWidget.currentIndex()
+            self._ensure_tab_content(index)
+            tabContent = self._tabContents.get(index)
+            if isinstance(tabContent, TabContentWidget):
+                print(f"♻️ 恢复监控任务: {job['work_id']} ({job['tab']}-{job['option']})")
+                tabContent.monitor_task_progress(job["work_id"], job["flow_id"])
+
+    @staticmethod
+    def _record_resumed_batch_result(task_id, task_data, task_details):
+        """恢复监控的批量任务完成：任务管理器已写入任务日志，这里在后台把结果写入本地历史记录"""
+        item = dict(task_data or {})
+        item.update((task_details or {}).get("data") or {})
+        item.setdefault("id", task_id)
+        record = history_record_from_work(item)
+        print(f"✅ 批量任务{task_id}已完成，{len(record['result_urls'])}张结果图片已记录到历史记录")
+        get_network_executor().submit(
+            get_history_store().upsert, [record],
+            on_error=lambda error: print(f"⚠️ 写入历史记录失败: {error}")
+        )
+
+    def _on_workflow_catalog_refreshed(self, changed):
+        """工作流目录有更新时刷新已创建的Tab，尚未创建的Tab在创建时直接使用新目录"""
+        if not changed:
+            return
+        for tabContent in self._tabContents.values():
+            if isinstance(tabContent, TabContentWidget):
+                tabContent.reloadWorkflowOptions()
+
+    def _ensure_tab_content(self, index):
+        """第一次切换到某个Tab时创建它的内容，替换占位提示"""
+        if index < 0 or index >= len(self._tabNames) or index in self._tabContents:
+            return
+        name = self._tabNames[index]
+        tab = self.tabWidget.widget(index)
+        tabLayout = tab.layout()
+        started = time.perf_counter()
+        try:
+            tabContent = TabContentWidget(name)
+        except Exception as e:
+            import traceback
+            error_msg = f"添加Tab '{name}'时出错: {str(e)}\n{traceback.format_exc()}"
+            print(error_msg)
+            # 显示错误信息代替Tab内容
+            tabContent = QtWidgets.QLabel(f"Tab '{name}'加载失败: {str(e)}")
+            tabContent.setStyleSheet("color: red; font-size: 16px;")
+            self.tabWidget.setTabText(index, f"{name}(错误)")
+        placeholder = self._tabPlaceholders.pop(index, None)
+        if placeholder:
+            tabLayout.removeWidget(placeholder)
+            placeholder.deleteLater()
+        tabLayout.addWidget(tabContent)
+        self._tabContents[index] = tabContent
+        record_timing("tab_build", time.perf_counter() - started, tab=name)
+        if not self._firstTabReported:
+            self._firstTabReported = True
+            record_timing("panel_first_tab_ready", time.perf_counter() - self._initStarted)
 
     def request_user_info_silent(self):
         """静默请求用户信息，只更新积分显示，不显示弹窗"""
         try:
             print("🔍 静默请求用户信息...")
             
-            # 从auto_login.json获取token
+            # 从登录凭据缓存获取token
             try:
-                with open("auto_login.json", 'r', encoding='utf-8') as f:
-                    login_data = json.load(f)
-                    token = login_data.get("token", "")
-                    username = login_data.get("username", "admin")
-                    print(f"📋 获取到用户: {username}")
+                login_data = get_credential_store().data()
+                token = login_data.get("token", "")
+                username = login_data.get("username", "admin")
+                print(f"📋 获取到用户: {username}")
             except Exception as e:
                 print(f"❌ 读取登录信息失败: {str(e)}")
                 token = ""
@@ -4370,13 +8413,12 @@ QTabWidget::pane {
         try:
             print("🔍 请求用户信息...")
             
-            # 从auto_login.json获取token
+            # 从登录凭据缓存获取token
             try:
-                with open("auto_login.json", 'r', encoding='utf-8') as f:
-                    login_data = json.load(f)
-                    token = login_data.get("token", "")
-                    username = login_data.get("username", "admin")
-                    print(f"📋 获取到用户: {username}")
+                login_data = get_credential_store().data()
+                token = login_data.get("token", "")
+                username = login_data.get("username", "admin")
+                print(f"📋 获取到用户: {username}")
             except Exception as e:
                 print(f"❌ 读取登录信息失败: {str(e)}")
                 token = ""
@@ -4410,11 +8452,9 @@ QTabWidget::pane {
         try:
             print("🔍 从按钮点击显示用户信息...")
             
-            # 从auto_login.json获取用户信息
+            # 从登录凭据缓存获取用户信息
             try:
-                with open("auto_login.json", 'r', encoding='utf-8') as f:
-                    login_data = json.load(f)
-                    username = login_data.get("username", "admin")
+                username = get_credential_store().data().get("username", "admin")
             except Exception as e:
                 print(f"❌ 读取登录信息失败: {str(e)}")
                 username = "admin"
@@ -4655,6 +8695,7 @@ QTabWidget::pane {
     def show_task_progress(self, show=True):
         """显示或隐藏任务进度条"""
         self.taskProgressWidget.setVisible(show)
+        self.taskCancelButton.setEnabled(True)
         if not show:
             # 重置进度条
             self.taskProgressBar.setValue(0)
@@ -4668,10 +8709,18 @@ QTabWidget::pane {
         self.taskStatusLabel.setText(status_text)
 
     def cancel_task(self):
-        """取消当前任务"""
-        # TODO: 实现任务取消功能
-        self.show_task_progress(False)
-        print("用户取消了任务")
+        """取消所有Tab中进行的任务：停止监控、中止上传和下载，并请求服务器取消"""
+        pending = 0
+        for tabContent in self._tabContents.values():
+            if isinstance(tabContent, TabContentWidget):
+                pending += tabContent.cancel_tasks()
+        print(f"用户取消了任务（等待服务器确认: {pending}个）")
+        if pending:
+            # 进度条在服务器确认取消后由各Tab隐藏
+            self.update_task_progress(self.taskProgressBar.value(), "正在取消任务...")
+            self.taskCancelButton.setEnabled(False)
+        else:
+            self.show_task_progress(False)
 
 def create_main_panel():
     global current_username, main_panel_instance
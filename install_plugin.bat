@@ -8,6 +8,10 @@ if not exist "%TARGET_DIR%" mkdir "%TARGET_DIR%"
 :: 复制Python文件
 copy /Y "MaxStylePanelQt.py" "%TARGET_DIR%\"
 echo Python脚本已复制到: %TARGET_DIR%\MaxStylePanelQt.py
+copy /Y "workflow_registry.json" "%TARGET_DIR%\"
+echo 工作流配置已复制到: %TARGET_DIR%\workflow_registry.json
+copy /Y "maxstyle_batch.py" "%TARGET_DIR%\"
+echo 批处理脚本已复制到: %TARGET_DIR%\maxstyle_batch.py
 
 :: 复制启动器脚本
 set SCRIPTS_DIR=%LOCALAPPDATA%\Autodesk\3dsMax\2022 - 64bit\ENU\scripts\Startup
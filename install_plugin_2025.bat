@@ -17,6 +17,10 @@ if not exist "%USER_MACROS_DIR%" mkdir "%USER_MACROS_DIR%"
 :: 复制Python文件到用户宏目录
 copy /Y "MaxStylePanelQt.py" "%USER_MACROS_DIR%\"
 echo Python脚本已复制到: %USER_MACROS_DIR%\MaxStylePanelQt.py
+copy /Y "workflow_registry.json" "%USER_MACROS_DIR%\"
+echo 工作流配置已复制到: %USER_MACROS_DIR%\workflow_registry.json
+copy /Y "maxstyle_batch.py" "%USER_MACROS_DIR%\"
+echo 批处理脚本已复制到: %USER_MACROS_DIR%\maxstyle_batch.py
 
 :: 创建启动脚本目录
 set STARTUP_SCRIPTS_DIR=%LOCALAPPDATA%\Autodesk\3dsMax\2025 - 64bit\ENU\scripts\Startup
@@ -34,6 +38,8 @@ echo 自动启动脚本已复制到: %STARTUP_SCRIPTS_DIR%\auto_startup.ms
 set PLUGIN_DIR=%LOCALAPPDATA%\Autodesk\3dsMax\2025 - 64bit\ENU\scripts\MaxStylePanel
 if not exist "%PLUGIN_DIR%" mkdir "%PLUGIN_DIR%"
 copy /Y "MaxStylePanelQt.py" "%PLUGIN_DIR%\"
+copy /Y "workflow_registry.json" "%PLUGIN_DIR%\"
+copy /Y "maxstyle_batch.py" "%PLUGIN_DIR%\"
 
 :: 创建UI配置文件
 set UI_CONFIG_DIR=%LOCALAPPDATA%\Autodesk\3dsMax\2025 - 64bit\ENU\UI
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面批处理：按清单文件批量上传图片、提交工作流、等待完成并下载结果
+
+复用插件的上传缓存、工作流注册表、登录凭据和结果缓存，不创建任何Qt控件，
+可以在命令行中过夜运行，也可以在3ds Max的pymxs脚本或其它Python脚本中调用。
+
+命令行:
+    python maxstyle_batch.py jobs.json --workers 3
+    python maxstyle_batch.py jobs.json --output D:/renders/out --username 13800000000 --password ******
+
+Python / pymxs脚本（阻塞直到全部任务结束，在3ds Max中建议放到后台线程执行）:
+    import maxstyle_batch
+    summary = maxstyle_batch.run_manifest("D:/renders/jobs.json", workers=2)
+
+清单格式（JSON，图片路径相对于清单文件所在目录）:
+    {
+        "defaults": {"tab": "室内设计", "option": "彩平图", "advanced": {"控制强度": 0.6}},
+        "jobs": [
+            {"id": "living-01", "image": "living.png"},
+            {"id": "bed-01", "image": "bed.png", "reference": "style.jpg", "option": "风格转换",
+             "prompts": ["卧室，中式风格"]},
+            {"id": "plan-01", "image": "plan.png", "workType": 100, "params": {"workPixel": 1}}
+        ]
+    }
+每个任务用tab+option或workType在工作流注册表中查找工作流；prompts和advanced覆盖选项的默认值，
+params直接覆盖请求参数。
+
+运行进度保存在输出目录的state.json中：中断后重新运行同一命令时跳过已完成的任务，
+已提交但未完成的任务继续等待结果而不会重复提交；提交结果不明确（网络错误或超时）的任务不会自动重新提交，
+在插件的历史记录中确认后，从state.json中删除该任务的记录即可重新提交。结束后在输出目录写出summary.json汇总报告
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import MaxStylePanelQt as panel
+
+STATE_FILE_NAME = "state.json"
+SUMMARY_FILE_NAME = "summary.json"
+JOB_STATE_TEXT = {
+    "pending": "未开始",
+    "submitted": "已提交",
+    "finished": "已完成",
+    "failed": "失败",
+    "cancelled": "已取消",
+    "unfinished": "未完成"
+}
+
+
+# =========================
+# 清单解析
+# =========================
+def load_manifest(path):
+    """读取清单文件，返回按顺序排列的任务列表；清单格式错误时抛出ValueError"""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults") or {}
+    registry = panel.get_workflow_registry()
+    jobs = []
+    seen = set()
+    for index, entry in enumerate(manifest.get("jobs") or []):
+        try:
+            jobs.append(_resolve_job(index, entry, defaults, base_dir, registry))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"第{index + 1}个任务: {str(e)}")
+        if jobs[-1]["id"] in seen:
+            raise ValueError(f"第{index + 1}个任务: 任务ID重复: {jobs[-1]['id']}")
+        seen.add(jobs[-1]["id"])
+    if not jobs:
+        raise ValueError("清单中没有任务")
+    return jobs
+
+def _resolve_job(index, entry, defaults, base_dir, registry):
+    """合并默认值，按注册表生成请求参数，并检查图片文件"""
+    job = dict(defaults)
+    job.update(entry)
+    for key in ("advanced", "params"):
+        job[key] = dict(defaults.get(key) or {}, **(entry.get(key) or {}))
+
+    if job.get("tab") and job.get("option"):
+        workflow = registry.get(job["tab"], job["option"])
+        if workflow is None:
+            raise ValueError(f"工作流配置中没有该选项: {job['tab']}-{job['option']}")
+    elif job.get("workType") is not None:
+        workflow = registry.by_work_type(int(job["workType"]))
+        if workflow is None:
+            raise ValueError(f"工作流配置中没有workType={job['workType']}")
+    else:
+        raise ValueError("需要tab和option，或者workType")
+
+    image = os.path.join(base_dir, job["image"])
+    if not os.path.exists(image):
+        raise ValueError(f"图片不存在: {image}")
+    reference = os.path.join(base_dir, job["reference"]) if job.get("reference") else None
+    if reference and not os.path.exists(reference):
+        raise ValueError(f"参考图像不存在: {reference}")
+
+    params = panel.build_workflow_params(workflow, job.get("prompts"), job["advanced"])
+    if job.get("workType") is not None:
+        params["workType"] = int(job["workType"])
+    params.update(job["params"])
+    return {
+        "id": str(job.get("id") or f"{index + 1:03d}-{os.path.splitext(os.path.basename(image))[0]}"),
+        "image": image,
+        "reference": reference,
+        "tab": workflow.tab,
+        "option": workflow.name,
+        "params": params
+    }
+
+
+# =========================
+# 运行进度（断点续跑）
+# =========================
+class BatchRunState(object):
+    """每个任务的提交和完成情况，每次变化后立即写入state.json"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._jobs = json.load(f).get("jobs", {})
+                print(f"♻️ 读取运行进度: {path}（{len(self._jobs)}个任务）")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 运行进度文件损坏，重新开始: {str(e)}")
+
+    def get(self, job_id):
+        with self._lock:
+            return dict(self._jobs.get(job_id, {}))
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            record = self._jobs.setdefault(job_id, {})
+            record.update(fields)
+            record["updated"] = time.time()
+            panel.write_json_atomic(self.path, {"jobs": self._jobs})
+            return dict(record)
+
+
+# =========================
+# 批处理执行
+# =========================
+class BatchRunner(object):
+    """
+    用固定数量的工作线程并发处理清单中的任务：上传 → 立即生成 → 等待完成 → 下载结果
+
+    workers同时也是同时在服务器上进行的任务数，服务器明确拒绝提交时按Retry-After等待后重试
+    """
+
+    def __init__(self, jobs, output_dir, workers=panel.BATCH_MAX_ACTIVE_JOBS, download=True):
+        self.jobs = jobs
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.download = download
+        self.cancel_token = panel.CancelToken()
+        os.makedirs(output_dir, exist_ok=True)
+        self.state = BatchRunState(os.path.join(output_dir, STATE_FILE_NAME))
+        self._print_lock = threading.Lock()
+        self._last_progress = {}
+
+    def _log(self, job, message):
+        with self._print_lock:
+            print(f"[{job['id']}] {message}")
+
+    def run(self):
+        """处理所有任务（阻塞），返回汇总报告；cancel_token取消后尽快停止，已提交的任务下次运行时继续"""
+        started = time.time()
+        print(f"📦 批处理开始: {len(self.jobs)}个任务，{self.workers}个工作线程，输出目录: {self.output_dir}")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._run_job_safe, job) for job in self.jobs]
+            try:
+                # 主线程只等待，保证Ctrl+C能及时响应
+                while not all(future.done() for future in futures):
+                    time.sleep(0.2)
+            except KeyboardInterrupt:
+                print("🛑 收到中断，等待正在进行的请求结束（已提交的任务下次运行时继续等待结果）...")
+                self.cancel_token.cancel()
+                for future in futures:
+                    future.cancel()
+        summary = self.summary(started)
+        panel.write_json_atomic(os.path.join(self.output_dir, SUMMARY_FILE_NAME), summary)
+        return summary
+
+    def _run_job_safe(self, job):
+        try:
+            self._run_job(job)
+        except panel.TaskCancelled:
+            self._log(job, "🛑 已停止")
+        except Exception as e:
+            if self.state.get(job["id"]).get("work_id"):
+                # 已经提交到服务器（例如下载结果时出错），保持原状态，下次运行时继续等待而不重复提交
+                self._log(job, f"❌ 处理异常，下次运行时继续: {str(e)}")
+                self.state.update(job["id"], message=str(e))
+            else:
+                self._log(job, f"❌ 处理异常: {str(e)}")
+                self.state.update(job["id"], state="failed", message=str(e))
+
+    def _run_job(self, job):
+        if self.cancel_token.cancelled:
+            return
+        record = self.state.get(job["id"])
+        if record.get("state") == "finished" and all(os.path.exists(p) for p in record.get("outputs", [])):
+            self._log(job, "⏭️ 已完成，跳过")
+            return
+        if record.get("uncertain"):
+            # 服务器可能已经创建了任务，自动重新提交可能重复生成
+            self._log(job, f"⏭️ 上次提交结果不明确，跳过（确认后从{STATE_FILE_NAME}中删除该任务的记录即可重新提交）")
+            return
+
+        if record.get("work_id") and record.get("status") not in (30, 40):
+            # 已提交的任务只要服务器没有返回失败或取消就不重复提交；已完成但结果文件缺失时重新获取结果
+            self._log(job, f"♻️ 继续等待已提交的任务: {record['work_id']}")
+        else:
+            record = self._submit(job)
+            if record is None:
+                return
+
+        work_status, details = panel.wait_for_task(
+            record["work_id"], record.get("flow_id"),
+            progress_callback=lambda progress, text: self._on_progress(job, progress, text),
+            cancel_token=self.cancel_token
+        )
+        if work_status is None:
+            # 监控失败或超时，保持已提交状态，下次运行时继续等待
+            self.state.update(job["id"], message="任务监控失败或超时")
+            self._log(job, "⚠️ 任务监控失败或超时，下次运行时继续等待")
+            return
+        if work_status in (30, 40):
+            state = panel.JOB_FINAL_STATES[work_status]
+            self.state.update(job["id"], state=state, status=work_status,
+                              message=panel.TASK_STATUS_TEXT.get(work_status))
+            self._log(job, f"❌ 任务{panel.TASK_STATUS_TEXT.get(work_status)}")
+            return
+
+        urls = panel.parse_result_urls((details or {}).get("data"))
+        outputs = self._download(job, urls) if self.download else []
+        record = self.state.update(job["id"], state="finished", status=20, result_urls=urls, outputs=outputs,
+                                   finished=time.time(), message="")
+        self._log(job, f"✅ 完成，{len(urls)}张结果图片，用时{record['finished'] - record['submitted']:.0f}秒")
+
+    def _submit(self, job):
+        """上传图片并提交，服务器明确拒绝时等待后重试；成功后立即记录任务ID，返回运行记录"""
+        for attempt in range(panel.BATCH_SUBMIT_MAX_RETRIES + 1):
+            self.cancel_token.check()
+            params = dict(job["params"])
+            self._log(job, f"📤 上传并提交: {job['tab']}-{job['option']}")
+            response = panel.upload_and_submit_workflow(job["image"], job["reference"], params,
+                                                        cancel_token=self.cancel_token)
+            data = (response.get("data") or {}) if response and response.get("code") == 0 else {}
+            if data.get("workId"):
+                self._log(job, f"🆔 已提交: {data['workId']}")
+                return self.state.update(job["id"], state="submitted", work_id=str(data["workId"]),
+                                         flow_id=data.get("flowId"), status=None, submitted=time.time(),
+                                         tab=job["tab"], option=job["option"], message="")
+            if response is None:
+                # 没有收到明确的响应，服务器可能已经创建了任务，不重新提交
+                self.state.update(job["id"], state="failed", uncertain=True,
+                                  message=panel.WORKFLOW_SUBMIT_UNCERTAIN_MESSAGE)
+                self._log(job, f"❌ {panel.WORKFLOW_SUBMIT_UNCERTAIN_MESSAGE}")
+                return None
+            message = response.get("msg") or "未知错误"
+            if response.get("code") == 0:
+                # 服务器接受了请求但没有返回任务ID，重试可能重复生成
+                break
+            if attempt < panel.BATCH_SUBMIT_MAX_RETRIES:
+                delay = panel.get_http_client().retry_after_remaining() or panel.BATCH_SUBMIT_RETRY_DELAY
+                self._log(job, f"⏳ 提交失败（{message}），{delay:.0f}秒后重试")
+                if self.cancel_token.wait(delay):
+                    self.cancel_token.check()
+        self.state.update(job["id"], state="failed", message=f"提交失败: {message}")
+        self._log(job, f"❌ 提交失败: {message}")
+        return None
+
+    def _on_progress(self, job, progress, text):
+        """只在进度或状态变化时输出"""
+        if self._last_progress.get(job["id"]) != (progress, text):
+            self._last_progress[job["id"]] = (progress, text)
+            self._log(job, f"📈 {text} {progress}%")
+
+    def _download(self, job, urls):
+        """把结果图片（经结果缓存）复制到输出目录，文件名为 任务ID_序号.扩展名"""
+        outputs = []
+        for index, url in enumerate(urls):
+            path = panel.get_result_cache().fetch(url, cancel_token=self.cancel_token)
+            if not path:
+                self._log(job, f"⚠️ 结果图片下载失败: {url}")
+                continue
+            target = os.path.join(self.output_dir, f"{job['id']}_{index + 1}{os.path.splitext(path)[1]}")
+            shutil.copyfile(path, target)
+            outputs.append(target)
+        return outputs
+
+    def summary(self, started):
+        """汇总每个任务的最终状态"""
+        counts = OrderedDict((state, 0) for state in JOB_STATE_TEXT)
+        items = []
+        for job in self.jobs:
+            record = self.state.get(job["id"])
+            state = record.get("state", "pending")
+            if state == "submitted":
+                state = "unfinished"
+            counts[state] += 1
+            seconds = None
+            if record.get("finished") and record.get("submitted"):
+                seconds = round(record["finished"] - record["submitted"], 1)
+            items.append({
+                "id": job["id"],
+                "tab": job["tab"],
+                "option": job["option"],
+                "image": job["image"],
+                "state": state,
+                "work_id": record.get("work_id"),
+                "seconds": seconds,
+                "outputs": record.get("outputs", []),
+                "message": record.get("message", "")
+            })
+        return {
+            "started": started,
+            "elapsed": round(time.time() - started, 1),
+            "output_dir": self.output_dir,
+            "counts": dict((state, n) for state, n in counts.items() if n),
+            "jobs": items
+        }
+
+
+def run_manifest(path, output_dir=None, workers=panel.BATCH_MAX_ACTIVE_JOBS, download=True):
+    """读取清单并处理所有任务（阻塞），返回汇总报告；输出目录默认为清单旁边的 <清单名>_results"""
+    jobs = load_manifest(path)
+    if output_dir is None:
+        output_dir = os.path.splitext(os.path.abspath(path))[0] + "_results"
+    return BatchRunner(jobs, output_dir, workers, download).run()
+
+def print_summary(summary):
+    print("=" * 50)
+    for item in summary["jobs"]:
+        line = f"{JOB_STATE_TEXT[item['state']]:<4} {item['id']}  {item['tab']}-{item['option']}"
+        if item["seconds"] is not None:
+            line += f"  {item['seconds']:.0f}秒"
+        if item["message"]:
+            line += f"  {item['message']}"
+        print(line)
+    print("=" * 50)
+    counts = "，".join(f"{JOB_STATE_TEXT[state]} {n}" for state, n in summary["counts"].items())
+    print(f"共 {len(summary['jobs'])} 个任务：{counts}，用时 {summary['elapsed']:.0f} 秒")
+    print(f"汇总报告: {os.path.join(summary['output_dir'], SUMMARY_FILE_NAME)}")
+
+
+# =========================
+# 命令行入口
+# =========================
+def login(username, password):
+    """登录并把token保存到插件的登录凭据中（与面板登录相同）"""
+    response = panel.request_login(username, password)
+    result = response.json() if response.status_code == 200 else {}
+    token = (result.get("data") or {}).get("token") if result.get("code") == 0 else None
+    if not token:
+        raise ValueError(f"登录失败: {result.get('msg', f'HTTP {response.status_code}')}")
+    panel.get_credential_store().update(token=token, username=username)
+    print(f"✅ 登录成功: {username}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按清单文件批量提交3ds Max插件的工作流任务")
+    parser.add_argument("manifest", help="清单文件（JSON）")
+    parser.add_argument("-o", "--output", help="输出目录（默认为清单旁边的 <清单名>_results）")
+    parser.add_argument("-w", "--workers", type=int, default=panel.BATCH_MAX_ACTIVE_JOBS,
+                        help=f"同时处理的任务数（默认{panel.BATCH_MAX_ACTIVE_JOBS}）")
+    parser.add_argument("--base-url", help=f"服务器地址（默认{panel.API_BASE_URL}）")
+    parser.add_argument("--username", help="登录手机号（不填时使用面板保存的登录凭据）")
+    parser.add_argument("--password", help="登录密码")
+    parser.add_argument("--no-download", action="store_true", help="只记录结果图片URL，不下载")
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        panel.configure_http_client(base_url=args.base_url)
+    try:
+        if args.username:
+            login(args.username, args.password or "")
+        if not panel.get_credential_store().token():
+            print("❌ 没有登录凭据，请先在插件面板中登录，或使用--username/--password")
+            return 2
+        summary = run_manifest(args.manifest, args.output, args.workers, not args.no_download)
+    except (OSError, ValueError) as e:
+        print(f"❌ {str(e)}")
+        return 2
+    print_summary(summary)
+    return 0 if set(summary["counts"]) == {"finished"} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试任务状态查询间隔策略（PollingPolicy）和状态解释（interpret_task_status）
+
+使用假时钟代替time.monotonic，不访问网络
+"""
+
+import os
+import sys
+import json
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import MaxStylePanelQt as panel
+
+
+class FakeClock(object):
+    """替换time.monotonic的假时钟，advance()手动前进"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class PolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(panel.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 使用独立的HTTP客户端，Retry-After状态不受其它测试影响
+        self.client = panel.ApiHttpClient(base_url="http://127.0.0.1:9")
+        patcher = mock.patch.object(panel, "_http_client", self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.client.close)
+
+    def make_task(self, **policy_args):
+        policy_args.setdefault("jitter", 0)
+        return panel._PolledTask("1", panel.PollingPolicy(**policy_args))
+
+    @staticmethod
+    def running(work_number=10, work_current=0, **extra):
+        data = {"id": "1", "workStatus": 10, "workNumber": work_number, "workCurrent": work_current}
+        data.update(extra)
+        return data
+
+
+class PollingPolicyTest(PolicyTestCase):
+
+    def test_backoff_grows_by_factor_up_to_maximum(self):
+        task = self.make_task(initial=1.0, factor=2.0, maximum=5.0)
+        intervals = []
+        for level in range(5):
+            task.backoff_level = level
+            intervals.append(task.policy.next_interval(task, self.running(), 10))
+        self.assertEqual(intervals, [1.0, 2.0, 4.0, 5.0, 5.0])
+
+    def test_jitter_stays_within_ratio(self):
+        task = self.make_task(initial=10.0, maximum=10.0, jitter=0.2)
+        for factor, expected in ((0.8, 8.0), (1.2, 12.0)):
+            with mock.patch.object(panel.random, "uniform", return_value=factor) as uniform:
+                self.assertAlmostEqual(task.policy.next_interval(task, self.running(), 10), expected)
+            uniform.assert_called_once_with(0.8, 1.2)
+
+    def test_queue_position_slows_polling(self):
+        task = self.make_task(initial=1.0, maximum=15.0, queue_seconds=2.0)
+        queued = {"id": "1", "workStatus": 0, "workNumber": 0, "workCurrent": 4}
+        self.assertEqual(task.policy.next_interval(task, queued, 0), 8.0)
+        queued["workCurrent"] = 100
+        self.assertEqual(task.policy.next_interval(task, queued, 0), 15.0)
+
+    def test_near_done_caps_interval(self):
+        task = self.make_task(initial=1.0, factor=2.0, maximum=15.0, near_done_interval=2.0)
+        task.backoff_level = 3
+        self.assertEqual(task.policy.next_interval(task, self.running(85), 85), 2.0)
+
+    def test_server_hint_in_response_takes_precedence(self):
+        task = self.make_task(initial=1.0)
+        self.assertEqual(task.policy.next_interval(task, self.running(pollInterval="7"), 10), 7.0)
+        self.assertEqual(task.policy.next_interval(task, self.running(retryAfter=3), 10), 3.0)
+
+    def test_retry_after_header_delays_next_poll(self):
+        task = self.make_task(initial=1.0)
+        self.client._retry_after_until = self.clock.now + 12.0
+        self.assertEqual(task.policy.next_interval(task, self.running(), 10), 12.0)
+        self.assertEqual(task.policy.failure_interval(task), 12.0)
+        self.clock.advance(12.0)
+        self.assertEqual(task.policy.next_interval(task, self.running(), 10), 1.0)
+
+    def test_failure_interval_backs_off_with_consecutive_failures(self):
+        task = self.make_task(initial=1.0, factor=2.0, maximum=5.0)
+        task.consecutive_failures = 2
+        self.assertEqual(task.policy.failure_interval(task), 4.0)
+
+    def test_deadline_uses_elapsed_wall_clock(self):
+        task = self.make_task(deadline=60)
+        self.clock.advance(59)
+        self.assertFalse(task.policy.expired(task))
+        self.clock.advance(2)
+        self.assertTrue(task.policy.expired(task))
+        self.assertFalse(self.make_task(deadline=None).policy.expired(task))
+
+
+class InterpretTaskStatusTest(PolicyTestCase):
+
+    def test_backoff_level_resets_when_state_changes(self):
+        task = self.make_task()
+        for expected in (0, 1, 2):
+            panel.interpret_task_status(task, self.running(30))
+            self.assertEqual(task.backoff_level, expected)
+        panel.interpret_task_status(task, self.running(40))
+        self.assertEqual(task.backoff_level, 0)
+
+    def test_outcomes(self):
+        task = self.make_task()
+        update = panel.interpret_task_status(task, self.running(30))
+        self.assertEqual((update.outcome, update.progress), (None, 30))
+        update = panel.interpret_task_status(task, {"workStatus": 20, "workNumber": 100})
+        self.assertEqual((update.outcome, update.progress), ("finished", 100))
+        self.assertEqual(panel.interpret_task_status(task, {"workStatus": 30}).outcome, "failed")
+        self.assertEqual(panel.interpret_task_status(task, {"workStatus": 40}).outcome, "failed")
+
+    def test_high_progress_with_result_urls_counts_as_finished(self):
+        task = self.make_task()
+        self.assertTrue(panel.task_needs_details(self.running(85)))
+        self.assertFalse(panel.task_needs_details(self.running(50)))
+        empty = {"data": {"workUrl": "[]"}}
+        self.assertIsNone(panel.interpret_task_status(task, self.running(85), empty).outcome)
+        details = {"data": {"workUrl": json.dumps(["http://example.com/1.png"])}}
+        self.assertEqual(panel.interpret_task_status(task, self.running(85), details).outcome, "finished")
+
+    def test_expired_after_deadline(self):
+        task = self.make_task(deadline=60)
+        self.clock.advance(61)
+        self.assertEqual(panel.interpret_task_status(task, self.running()).outcome, "expired")
+
+    def test_query_failures_until_lost(self):
+        task = self.make_task()
+        outcomes = [panel.interpret_task_status(task, None).outcome
+                    for _ in range(panel.TASK_MONITOR_MAX_FAILURES)]
+        self.assertEqual(outcomes[-1], "lost")
+        self.assertEqual(set(outcomes[:-1]), {"retry"})
+        panel.interpret_task_status(task, self.running())
+        self.assertEqual(task.consecutive_failures, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1 +1,223 @@
- 
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试任务进度监控（推送通道 + 轮询兜底）
+
+使用本地替身服务器模拟任务接口，分别测试SSE推送、长轮询和服务器不支持推送时的轮询
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PySide6 import QtWidgets
+
+import MaxStylePanelQt as panel
+
+_temp_dir = None
+_saved_environ = {}
+_saved_cwd = None
+
+
+def setUpModule():
+    """登录凭据等数据写到临时目录，不影响本机的插件数据；测试结束后恢复环境变量和工作目录"""
+    global _temp_dir, _saved_environ, _saved_cwd
+    _temp_dir = tempfile.TemporaryDirectory(prefix="maxstylepanel_test_")
+    _saved_environ = {"LOCALAPPDATA": os.environ.get("LOCALAPPDATA")}
+    _saved_cwd = os.getcwd()
+    os.environ["LOCALAPPDATA"] = _temp_dir.name
+    os.chdir(_temp_dir.name)
+
+
+def tearDownModule():
+    os.chdir(_saved_cwd)
+    for key, value in _saved_environ.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+    _temp_dir.cleanup()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """替身服务器：任务在创建后job_duration秒完成"""
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, obj, code=200):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == panel.API_ENDPOINTS["work_status"]:
+            server.status_polls += 1
+            return self._json({"code": 0, "data": server.job_status(query["id"][0])})
+        if url.path == panel.API_ENDPOINTS["work_details"]:
+            status = server.job_status(query["id"][0])
+            if status["workStatus"] == 20:
+                status["workUrl"] = json.dumps([f"http://127.0.0.1:{server.server_port}/img/{status['id']}.png"])
+            return self._json({"code": 0, "data": status})
+        if url.path == panel.API_ENDPOINTS["work_events"] and server.push_mode == "sse":
+            return self._serve_events(query["ids"][0].split(","))
+        if url.path == panel.API_ENDPOINTS["work_wait"] and server.push_mode == "longpoll":
+            return self._serve_wait(query["ids"][0].split(","), float(query["timeout"][0]))
+        self._json({"code": 404, "msg": "not found"}, 404)
+
+    def _serve_events(self, task_ids):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sent = {}
+        while not self.server.stopping:
+            for task_id in task_ids:
+                status = self.server.job_status(task_id)
+                if sent.get(task_id) != status["workStatus"]:
+                    sent[task_id] = status["workStatus"]
+                    self.wfile.write(f"event: progress\ndata: {json.dumps(status)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+            if all(v == 20 for v in sent.values()):
+                break
+            time.sleep(0.01)
+
+    def _serve_wait(self, task_ids, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline and not self.server.stopping:
+            changed = []
+            for task_id in task_ids:
+                status = self.server.job_status(task_id)
+                if self.server.last_sent.get(task_id) != status["workStatus"]:
+                    self.server.last_sent[task_id] = status["workStatus"]
+                    changed.append(status)
+            if changed:
+                return self._json({"code": 0, "data": changed})
+            time.sleep(0.01)
+        self._json({"code": 0, "data": []})
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, push_mode=None, job_duration=0.6):
+        ThreadingHTTPServer.__init__(self, ("127.0.0.1", 0), StandInHandler)
+        self.push_mode = push_mode
+        self.job_duration = job_duration
+        self.created = {}
+        self.last_sent = {}
+        self.status_polls = 0
+        self.stopping = False
+
+    def add_job(self, task_id):
+        self.created[task_id] = time.time()
+
+    def completed_at(self, task_id):
+        return self.created[task_id] + self.job_duration
+
+    def job_status(self, task_id):
+        if time.time() >= self.completed_at(task_id):
+            return {"id": task_id, "workStatus": 20, "workNumber": 100, "workCurrent": 0}
+        return {"id": task_id, "workStatus": 10, "workNumber": 10, "workCurrent": 0}
+
+
+class TaskMonitorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    def start_server(self, push_mode):
+        server = StandInServer(push_mode)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        panel.configure_http_client(base_url=f"http://127.0.0.1:{server.server_port}")
+        self.addCleanup(self.stop_server, server)
+        return server
+
+    def stop_server(self, server):
+        server.stopping = True
+        server.shutdown()
+        server.server_close()
+
+    def process_until(self, condition, timeout=10.0):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.005)
+
+    def run_task(self, server, task_id="1", timeout=10.0):
+        """提交并监控一个任务，返回(任务管理器, 结果)"""
+        server.add_job(task_id)
+        manager = panel.TaskManager()
+        result = {}
+        task = manager.track(task_id, "flow-1")
+        task.finished.connect(lambda tid, data, details: result.update(
+            finished_at=time.time(), data=data, details=details))
+        task.failed.connect(lambda tid, message: result.update(failed=message))
+        self.process_until(lambda: result, timeout)
+        self.addCleanup(manager.deleteLater)
+        return manager, result
+
+    def test_sse_push_reports_completion_immediately(self):
+        server = self.start_server("sse")
+        manager, result = self.run_task(server)
+        self.assertIn("finished_at", result)
+        self.assertLess(result["finished_at"] - server.completed_at("1"), 0.5)
+        self.assertIn("1.png", result["details"]["data"]["workUrl"])
+        self.assertLessEqual(server.status_polls, 2)
+
+    def test_sse_push_subscribes_tasks_added_later(self):
+        server = self.start_server("sse")
+        server.job_duration = 1.0
+        manager = panel.TaskManager()
+        self.addCleanup(manager.deleteLater)
+        finished = {}
+
+        def track(task_id):
+            server.add_job(task_id)
+            task = manager.track(task_id, "flow-1")
+            task.finished.connect(lambda tid, data, details: finished.setdefault(tid, time.time()))
+
+        track("1")
+        self.process_until(lambda: manager._push.is_subscribed("1"))
+        track("2")
+        self.process_until(lambda: len(finished) == 2)
+        for task_id in ("1", "2"):
+            self.assertIn(task_id, finished)
+            self.assertLess(finished[task_id] - server.completed_at(task_id), 0.5)
+        self.assertLessEqual(server.status_polls, 4)
+
+    def test_longpoll_push_when_sse_is_missing(self):
+        server = self.start_server("longpoll")
+        manager, result = self.run_task(server)
+        self.assertIn("finished_at", result)
+        self.assertLess(result["finished_at"] - server.completed_at("1"), 0.5)
+        self.assertEqual(manager._push.transport, "longpoll")
+
+    def test_polling_fallback_without_push(self):
+        server = self.start_server(None)
+        manager, result = self.run_task(server)
+        self.assertIn("finished_at", result)
+        self.assertGreaterEqual(server.status_polls, 1)
+        self.assertTrue(manager._push.unavailable)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,14 @@ if exist "%USER_MACROS_DIR%\MaxStylePanelQt.py" (
     del /Q "%USER_MACROS_DIR%\MaxStylePanelQt.py"
     echo 已删除: %USER_MACROS_DIR%\MaxStylePanelQt.py
 )
+if exist "%USER_MACROS_DIR%\workflow_registry.json" (
+    del /Q "%USER_MACROS_DIR%\workflow_registry.json"
+    echo 已删除: %USER_MACROS_DIR%\workflow_registry.json
+)
+if exist "%USER_MACROS_DIR%\maxstyle_batch.py" (
+    del /Q "%USER_MACROS_DIR%\maxstyle_batch.py"
+    echo 已删除: %USER_MACROS_DIR%\maxstyle_batch.py
+)
 
 :: 启动脚本目录
 set STARTUP_SCRIPTS_DIR=%LOCALAPPDATA%\Autodesk\3dsMax\2025 - 64bit\ENU\scripts\Startup